@@ -1,17 +1,30 @@
 """
 管理后台API接口
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, undefer
 from sqlalchemy import func, desc, and_, or_
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 
-from ..database import get_db
-from ..core.deps import get_current_admin_user
+from ..database import get_db, get_read_db
+from ..core.deps import get_current_admin_user, invalidate_user_principals, revoke_user_tokens, Principal
 from ..models.user import User
 from ..models.game import GameRecord
 from ..models.admin import AdminLog
+from ..models.credit import CreditLedger
+from ..services.ledger import adjust_credits, balance_at, InsufficientCreditsError
+from ..services.admin_log import record_admin_action
+from ..services.passwords import password_pool
+from ..services.daily_stats import day_bounds, period_totals, stats_today
+from ..services.hourly_stats import popular_games
+from ..services.big_wins import big_wins
+from ..services.activity import activity_metrics
+from ..services.payout_monitor import payout_monitor
+from ..services.response_cache import ADMIN_SCOPE, cached_response, invalidate_responses
+from ..services.export import ExportFilter, stream_game_records
+from ..utils.partitions import fetch_newest_first, fetch_first, count_across_partitions
 from ..schemas.game import (
     GameAnalysisResponse,
     GameConfigRequest,
@@ -29,7 +42,7 @@ async def get_all_users(
     limit: int = Query(100, ge=1, le=1000),
     search: Optional[str] = None,
     is_active: Optional[bool] = None,
-    current_admin: User = Depends(get_current_admin_user),
+    current_admin: Principal = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     """获取所有用户列表"""
@@ -66,7 +79,7 @@ async def get_all_users(
 @router.get("/users/{user_id}", response_model=UserResponse)
 async def get_user_detail(
     user_id: int,
-    current_admin: User = Depends(get_current_admin_user),
+    current_admin: Principal = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     """获取用户详细信息"""
@@ -94,7 +107,7 @@ async def update_user_credits(
     user_id: int,
     credits: int,
     reason: str,
-    current_admin: User = Depends(get_current_admin_user),
+    current_admin: Principal = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     """更新用户金额"""
@@ -106,28 +119,42 @@ async def update_user_credits(
         )
     
     old_credits = user.credits
-    user.credits = credits
-    
-    # 记录管理员操作日志
-    admin_log = AdminLog(
-        admin_id=current_admin.id,
-        action="update_user_credits",
+    admin_log = record_admin_action(
+        db,
+        current_admin,
+        action_type="update_user_credits",
+        description=f"将用户 {user.username} 的金额设置为 {credits}，原因: {reason}",
         target_type="user",
         target_id=user_id,
-        details={
-            "old_credits": old_credits,
-            "new_credits": credits,
-            "reason": reason
-        }
+        old_data={"credits": old_credits}
     )
-    db.add(admin_log)
+    
+    # 以差额记账，余额和流水在同一事务中写入
+    try:
+        new_credits = adjust_credits(
+            db,
+            user_id,
+            credits - old_credits,
+            ref_type="admin_log",
+            ref_id=admin_log.id,
+            description=reason
+        )
+    except InsufficientCreditsError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="金额不能为负数"
+        )
+    
+    admin_log.new_data = {"credits": new_credits, "reason": reason}
     db.commit()
+    invalidate_responses(user_id)
     
     return {
         "success": True,
-        "message": f"用户 {user.username} 的积分已更新为 {credits}",
+        "message": f"用户 {user.username} 的积分已更新为 {new_credits}",
         "old_credits": old_credits,
-        "new_credits": credits
+        "new_credits": new_credits
     }
 
 
@@ -136,7 +163,7 @@ async def update_user_status(
     user_id: int,
     is_active: bool,
     reason: str,
-    current_admin: User = Depends(get_current_admin_user),
+    current_admin: Principal = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     """更新用户状态（启用/禁用）"""
@@ -149,23 +176,25 @@ async def update_user_status(
     
     old_status = user.is_active
     user.is_active = is_active
+    revoke_user_tokens(db, user)
+    
+    status_text = "启用" if is_active else "禁用"
     
     # 记录管理员操作日志
-    admin_log = AdminLog(
-        admin_id=current_admin.id,
-        action="update_user_status",
+    record_admin_action(
+        db,
+        current_admin,
+        action_type="update_user_status",
+        description=f"{status_text}用户 {user.username}，原因: {reason}",
         target_type="user",
         target_id=user_id,
-        details={
-            "old_status": old_status,
-            "new_status": is_active,
-            "reason": reason
-        }
+        old_data={"is_active": old_status},
+        new_data={"is_active": is_active, "reason": reason}
     )
-    db.add(admin_log)
     db.commit()
+    invalidate_user_principals(user_id)
+    invalidate_responses(user_id)
     
-    status_text = "启用" if is_active else "禁用"
     return {
         "success": True,
         "message": f"用户 {user.username} 已{status_text}",
@@ -174,6 +203,23 @@ async def update_user_status(
     }
 
 
+def _game_record_item(record, username: str, include_result: bool) -> Dict[str, Any]:
+    item = {
+        "id": record.id,
+        "user_id": record.user_id,
+        "username": username,
+        "game_type": record.game_type,
+        "template_id": record.template_id,
+        "bet_amount": record.game_cost,
+        "win_amount": record.prize_credits,
+        "net_result": record.prize_credits - record.game_cost,
+        "created_at": record.created_at
+    }
+    if include_result:
+        item["result_data"] = record.game_result
+    return item
+
+
 @router.get("/games/records")
 async def get_game_records(
     skip: int = Query(0, ge=0),
@@ -182,121 +228,140 @@ async def get_game_records(
     user_id: Optional[int] = None,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
-    current_admin: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    include_result: bool = False,
+    current_admin: Principal = Depends(get_current_admin_user),
+    db: Session = Depends(get_read_db)
 ):
-    """获取游戏记录"""
-    query = db.query(GameRecord).join(User)
-    
-    if game_type:
-        query = query.filter(GameRecord.game_type == game_type)
-    
-    if user_id:
-        query = query.filter(GameRecord.user_id == user_id)
-    
-    if start_date:
-        query = query.filter(GameRecord.created_at >= start_date)
-    
-    if end_date:
-        query = query.filter(GameRecord.created_at <= end_date)
-    
-    records = query.order_by(desc(GameRecord.created_at)).offset(skip).limit(limit).all()
-    
-    result = []
-    for record in records:
-        user = db.query(User).filter(User.id == record.user_id).first()
-        result.append({
-            "id": record.id,
-            "user_id": record.user_id,
-            "username": user.username if user else "未知用户",
-            "game_type": record.game_type,
-            "template_id": record.template_id,
-            "bet_amount": record.game_cost,
-            "win_amount": record.prize_credits,
-            "net_result": record.prize_credits - record.game_cost,
-            "created_at": record.created_at,
-            "result_data": record.result_data
-        })
+    """获取游戏记录
+
+    默认只返回金额和时间等字段，需要游戏结果详情时传 include_result=true，
+    或通过 /games/records/{record_id} 获取单条记录。
+    """
+    def build_query(source):
+        columns = [
+            source.id, source.user_id, source.game_type, source.template_id,
+            source.game_cost, source.prize_credits, source.created_at
+        ]
+        if include_result:
+            columns.append(source.game_result)
+        query = db.query(*columns)
+        if game_type:
+            query = query.filter(source.game_type == game_type)
+        if user_id:
+            query = query.filter(source.user_id == user_id)
+        if start_date:
+            query = query.filter(source.created_at >= start_date)
+        if end_date:
+            query = query.filter(source.created_at <= end_date)
+        return query
+    
+    # 只访问与时间范围有交集的分区
+    records = fetch_newest_first(db, build_query, skip, limit, start_date, end_date)
+    
+    user_ids = {record.user_id for record in records}
+    usernames = dict(
+        db.query(User.id, User.username).filter(User.id.in_(user_ids)).all()
+    ) if user_ids else {}
     
     return {
-        "records": result,
-        "total": query.count()
+        "records": [
+            _game_record_item(record, usernames.get(record.user_id, "未知用户"), include_result)
+            for record in records
+        ],
+        "total": count_across_partitions(db, build_query, start_date, end_date)
     }
 
 
-@router.get("/dashboard/overview")
-async def get_dashboard_overview(
-    current_admin: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+@router.get("/games/export")
+async def export_game_records(
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    gzip: bool = False,
+    game_type: Optional[str] = None,
+    user_id: Optional[int] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    include_result: bool = False,
+    current_admin: Principal = Depends(get_current_admin_user)
 ):
-    """获取管理后台概览数据"""
+    """流式导出游戏记录（NDJSON 或 CSV，可选 gzip），过滤条件与 /games/records 相同"""
+    filters = ExportFilter(
+        game_type=game_type,
+        user_id=user_id,
+        start_date=start_date,
+        end_date=end_date,
+        include_result=include_result
+    )
+    filename = f"game_records_{datetime.now().strftime('%Y%m%d%H%M%S')}.{export_format}"
+    media_type = "application/x-ndjson" if export_format == "ndjson" else "text/csv; charset=utf-8"
+    if gzip:
+        filename += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(
+        stream_game_records(filters, export_format, compress=gzip),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.get("/games/records/{record_id}")
+async def get_game_record_detail(
+    record_id: int,
+    current_admin: Principal = Depends(get_current_admin_user),
+    db: Session = Depends(get_read_db)
+):
+    """获取单条游戏记录详情（包含游戏结果）"""
+    record = fetch_first(
+        db,
+        lambda source: db.query(source).options(undefer(source.game_result)).filter(source.id == record_id)
+    )
+    if not record:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="游戏记录不存在"
+        )
+    
+    user = db.query(User.username).filter(User.id == record.user_id).first()
+    return _game_record_item(record, user.username if user else "未知用户", include_result=True)
+
+
+@router.get("/games/payout-monitor")
+async def get_payout_monitor(
+    game_type: Optional[str] = None,
+    current_admin: Principal = Depends(get_current_admin_user)
+):
+    """各模板的实际派奖分布与配置概率的对比：RTP、派奖均值/标准差/分位数和偏离告警"""
+    return payout_monitor.report(game_type)
+
+
+def _dashboard_overview(db: Session) -> Dict[str, Any]:
+    """计算管理后台概览数据"""
     # 基本统计
     total_users = db.query(User).count()
     active_users = db.query(User).filter(User.is_active == True).count()
-    total_games = db.query(GameRecord).count()
-    
-    # 今日统计
-    today = datetime.now().date()
-    today_start = datetime.combine(today, datetime.min.time())
-    today_end = datetime.combine(today, datetime.max.time())
-    
-    today_games = db.query(GameRecord).filter(
-        GameRecord.created_at >= today_start,
-        GameRecord.created_at <= today_end
-    ).count()
-    
-    today_revenue = db.query(func.sum(GameRecord.game_cost)).filter(
-        GameRecord.created_at >= today_start,
-        GameRecord.created_at <= today_end
-    ).scalar() or 0
-
-    today_payout = db.query(func.sum(GameRecord.prize_credits)).filter(
-        GameRecord.created_at >= today_start,
-        GameRecord.created_at <= today_end
-    ).scalar() or 0
     
-    # 本周统计
-    week_start = today - timedelta(days=today.weekday())
-    week_start_dt = datetime.combine(week_start, datetime.min.time())
-    
-    week_games = db.query(GameRecord).filter(
-        GameRecord.created_at >= week_start_dt
-    ).count()
-    
-    week_revenue = db.query(func.sum(GameRecord.game_cost)).filter(
-        GameRecord.created_at >= week_start_dt
-    ).scalar() or 0
-
-    week_payout = db.query(func.sum(GameRecord.prize_credits)).filter(
-        GameRecord.created_at >= week_start_dt
-    ).scalar() or 0
-    
-    # 热门游戏
-    popular_games = db.query(
-        GameRecord.game_type,
-        GameRecord.template_id,
-        func.count(GameRecord.id).label('play_count'),
-        func.sum(GameRecord.game_cost).label('revenue')
-    ).filter(
-        GameRecord.created_at >= week_start_dt
-    ).group_by(GameRecord.game_type, GameRecord.template_id)\
-     .order_by(desc('play_count')).limit(5).all()
-    
-    # 最近大奖
-    recent_big_wins = db.query(GameRecord).join(User).filter(
-        GameRecord.prize_credits >= 1000
-    ).order_by(desc(GameRecord.created_at)).limit(10).all()
-    
-    big_wins_data = []
-    for record in recent_big_wins:
-        user = db.query(User).filter(User.id == record.user_id).first()
-        big_wins_data.append({
-            "username": user.username if user else "未知用户",
-            "game_type": record.game_type,
-            "template_id": record.template_id,
-            "win_amount": record.prize_credits,
-            "created_at": record.created_at
-        })
+    # 总数、今日和本周统计读取每日汇总：已定稿的日期每天一行，今天读实时计数
+    today = stats_today()
+    today_start = day_bounds(today)[0]
+    week_start_dt = today_start - timedelta(days=today.weekday())
+    
+    total_games = period_totals(db).games
+    today_totals = period_totals(db, today_start)
+    week_totals = period_totals(db, week_start_dt)
+    
+    # 本周热门游戏，由小时汇总求和
+    week_popular = popular_games(db, week_start_dt, datetime.utcnow(), limit=5)
+    
+    # 最近大奖，读取内存缓存
+    big_wins_data = [
+        {
+            "username": win.username,
+            "game_type": win.game_type,
+            "template_id": win.template_id,
+            "win_amount": win.win_amount,
+            "created_at": win.created_at
+        }
+        for win in big_wins.recent(10)
+    ]
     
     return {
         "basic_stats": {
@@ -305,16 +370,16 @@ async def get_dashboard_overview(
             "total_games": total_games
         },
         "today_stats": {
-            "games": today_games,
-            "revenue": today_revenue,
-            "payout": today_payout,
-            "profit": today_revenue - today_payout
+            "games": today_totals.games,
+            "revenue": today_totals.revenue,
+            "payout": today_totals.payout,
+            "profit": today_totals.revenue - today_totals.payout
         },
         "week_stats": {
-            "games": week_games,
-            "revenue": week_revenue,
-            "payout": week_payout,
-            "profit": week_revenue - week_payout
+            "games": week_totals.games,
+            "revenue": week_totals.revenue,
+            "payout": week_totals.payout,
+            "profit": week_totals.revenue - week_totals.payout
         },
         "popular_games": [
             {
@@ -322,12 +387,45 @@ async def get_dashboard_overview(
                 "play_count": play_count,
                 "revenue": revenue
             }
-            for game_type, template_id, play_count, revenue in popular_games
+            for game_type, template_id, play_count, revenue in week_popular
         ],
         "recent_big_wins": big_wins_data
     }
 
 
+@router.get("/dashboard/overview")
+async def get_dashboard_overview(
+    response: Response,
+    current_admin: Principal = Depends(get_current_admin_user)
+):
+    """获取管理后台概览数据"""
+    return await cached_response(response, "dashboard_overview", ADMIN_SCOPE, None, _dashboard_overview)
+
+
+@router.get("/dashboard/activity")
+async def get_dashboard_activity(
+    current_admin: Principal = Depends(get_current_admin_user)
+):
+    """最近 1 分钟 / 10 分钟 / 1 小时 / 24 小时的对局数、收支和去重玩家数（内存实时统计）"""
+    return {
+        window: {
+            "games": totals.plays,
+            "revenue": totals.revenue,
+            "payout": totals.payout,
+            "players": totals.players
+        }
+        for window, totals in activity_metrics.snapshot().items()
+    }
+
+
+@router.get("/system/password-pool")
+async def get_password_pool_stats(
+    current_admin: Principal = Depends(get_current_admin_user)
+):
+    """密码哈希进程池状态：排队数量、各操作耗时和拒绝次数"""
+    return password_pool.stats()
+
+
 @router.get("/logs")
 async def get_admin_logs(
     skip: int = Query(0, ge=0),
@@ -336,17 +434,17 @@ async def get_admin_logs(
     admin_id: Optional[int] = None,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
-    current_admin: User = Depends(get_current_admin_user),
+    current_admin: Principal = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     """获取管理员操作日志"""
-    query = db.query(AdminLog).join(User, AdminLog.admin_id == User.id)
+    query = db.query(AdminLog)
     
     if action:
-        query = query.filter(AdminLog.action == action)
+        query = query.filter(AdminLog.action_type == action)
     
     if admin_id:
-        query = query.filter(AdminLog.admin_id == admin_id)
+        query = query.filter(AdminLog.admin_user_id == admin_id)
     
     if start_date:
         query = query.filter(AdminLog.created_at >= start_date)
@@ -358,15 +456,18 @@ async def get_admin_logs(
     
     result = []
     for log in logs:
-        admin_user = db.query(User).filter(User.id == log.admin_id).first()
         result.append({
             "id": log.id,
-            "admin_id": log.admin_id,
-            "admin_username": admin_user.username if admin_user else "未知管理员",
-            "action": log.action,
+            "admin_id": log.admin_user_id,
+            "admin_username": log.admin_username,
+            "action": log.action_type,
+            "description": log.action_description,
             "target_type": log.target_type,
             "target_id": log.target_id,
-            "details": log.details,
+            "details": {
+                "old_data": log.old_data,
+                "new_data": log.new_data
+            },
             "created_at": log.created_at
         })
     
@@ -374,3 +475,53 @@ async def get_admin_logs(
         "logs": result,
         "total": query.count()
     }
+
+
+@router.get("/users/{user_id}/credit-ledger")
+async def get_user_credit_ledger(
+    user_id: int,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    current_admin: Principal = Depends(get_current_admin_user),
+    db: Session = Depends(get_read_db)
+):
+    """获取用户金额流水（按时间倒序）"""
+    query = db.query(CreditLedger).filter(CreditLedger.user_id == user_id)
+    entries = query.order_by(desc(CreditLedger.id)).offset(skip).limit(limit).all()
+    
+    return {
+        "entries": [
+            {
+                "id": entry.id,
+                "delta": entry.delta,
+                "reason": entry.reason,
+                "ref_type": entry.ref_type,
+                "ref_id": entry.ref_id,
+                "description": entry.description,
+                "created_at": entry.created_at
+            }
+            for entry in entries
+        ],
+        "total": query.count()
+    }
+
+
+@router.get("/users/{user_id}/balance-at")
+async def get_user_balance_at(
+    user_id: int,
+    at: datetime,
+    current_admin: Principal = Depends(get_current_admin_user),
+    db: Session = Depends(get_read_db)
+):
+    """查询用户在某一时刻的余额"""
+    if not db.query(User.id).filter(User.id == user_id).first():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="用户不存在"
+        )
+    
+    return {
+        "user_id": user_id,
+        "at": at,
+        "balance": balance_at(db, user_id, at)
+    }
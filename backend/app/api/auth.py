@@ -2,23 +2,55 @@
 认证相关API路由
 """
 from datetime import datetime, timedelta
-from typing import Any
+from typing import Any, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordRequestForm
+from fastapi.security import HTTPAuthorizationCredentials, OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
-from ..core.deps import get_db, get_current_active_user, get_current_user
-from ..core.security import verify_password, get_password_hash, create_access_token
+from ..core.deps import (
+    get_db, get_current_active_user, get_current_active_principal, optional_security,
+    invalidate_user_principals, revoke_access_token, revoke_user_tokens, Principal
+)
+from ..core.security import create_access_token, user_token_claims
 from ..models.user import User
 from ..schemas.auth import (
-    UserCreate, UserResponse, UserLogin, Token, PasswordChange, UserUpdate, UserStats
+    UserCreate, UserResponse, UserLogin, Token, PasswordChange, UserUpdate, UserStats,
+    RefreshTokenRequest
 )
 from ..config import settings
+from ..services.ledger import record_opening_credits
+from ..services.passwords import password_pool
+from ..services.sessions import (
+    create_session, delete_user_sessions, rotate_session, revoke_session, InvalidRefreshToken
+)
+from ..services.user_stats import get_user_game_stats
 
 router = APIRouter()
 
 
+def _issue_tokens(db: Session, user: User, refresh_token: Optional[str] = None) -> dict:
+    """签发访问令牌，未传入刷新令牌时新建登录会话，提交事务"""
+    if refresh_token is None:
+        refresh_token = create_session(db, user)
+    db.commit()
+    
+    # 创建访问令牌
+    access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
+    access_token = create_access_token(
+        data=user_token_claims(user), expires_delta=access_token_expires
+    )
+    
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "expires_in": settings.access_token_expire_minutes * 60,
+        "refresh_token": refresh_token,
+        "refresh_expires_in": settings.refresh_token_expire_days * 86400,
+        "user": user
+    }
+
+
 @router.post("/register", response_model=UserResponse, summary="用户注册")
-def register(
+async def register(
     user_data: UserCreate,
     db: Session = Depends(get_db)
 ) -> Any:
@@ -43,12 +75,14 @@ def register(
     user = User(
         username=user_data.username,
         email=user_data.email,
-        hashed_password=get_password_hash(user_data.password),
+        hashed_password=await password_pool.hash(user_data.password),
         full_name=user_data.full_name,
         credits=settings.default_user_credits
     )
     
     db.add(user)
+    db.flush()
+    record_opening_credits(db, user)
     db.commit()
     db.refresh(user)
     
@@ -56,7 +90,7 @@ def register(
 
 
 @router.post("/login", response_model=Token, summary="用户登录")
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db)
 ) -> Any:
@@ -68,7 +102,10 @@ def login(
         (User.username == form_data.username) | (User.email == form_data.username)
     ).first()
     
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    verified, new_hash = (
+        await password_pool.verify(form_data.password, user.hashed_password) if user else (False, None)
+    )
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="用户名或密码错误",
@@ -81,26 +118,16 @@ def login(
             detail="用户账户已被禁用"
         )
     
-    # 更新最后登录时间
+    # 更新最后登录时间，bcrypt 成本调整后顺带按新成本保存密码哈希
     user.last_login = datetime.utcnow()
-    db.commit()
-    
-    # 创建访问令牌
-    access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
-    access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
-    )
+    if new_hash:
+        user.hashed_password = new_hash
     
-    return {
-        "access_token": access_token,
-        "token_type": "bearer",
-        "expires_in": settings.access_token_expire_minutes * 60,
-        "user": user
-    }
+    return _issue_tokens(db, user)
 
 
 @router.post("/login-json", response_model=Token, summary="JSON格式登录")
-def login_json(
+async def login_json(
     login_data: UserLogin,
     db: Session = Depends(get_db)
 ) -> Any:
@@ -112,7 +139,10 @@ def login_json(
         (User.username == login_data.username) | (User.email == login_data.username)
     ).first()
     
-    if not user or not verify_password(login_data.password, user.hashed_password):
+    verified, new_hash = (
+        await password_pool.verify(login_data.password, user.hashed_password) if user else (False, None)
+    )
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="用户名或密码错误"
@@ -124,22 +154,49 @@ def login_json(
             detail="用户账户已被禁用"
         )
     
-    # 更新最后登录时间
+    # 更新最后登录时间，bcrypt 成本调整后顺带按新成本保存密码哈希
     user.last_login = datetime.utcnow()
-    db.commit()
+    if new_hash:
+        user.hashed_password = new_hash
     
-    # 创建访问令牌
-    access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
-    access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
-    )
+    return _issue_tokens(db, user)
+
+
+@router.post("/refresh", response_model=Token, summary="刷新访问令牌")
+def refresh_access_token(
+    refresh_data: RefreshTokenRequest,
+    db: Session = Depends(get_db)
+) -> Any:
+    """
+    用刷新令牌换取新的访问令牌和刷新令牌，原刷新令牌随即失效
+    """
+    try:
+        user, refresh_token = rotate_session(db, refresh_data.refresh_token)
+    except InvalidRefreshToken:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="刷新令牌无效或已过期",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     
-    return {
-        "access_token": access_token,
-        "token_type": "bearer",
-        "expires_in": settings.access_token_expire_minutes * 60,
-        "user": user
-    }
+    return _issue_tokens(db, user, refresh_token)
+
+
+@router.post("/logout", summary="退出登录")
+def logout(
+    refresh_data: RefreshTokenRequest,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    db: Session = Depends(get_db)
+) -> Any:
+    """
+    吊销刷新令牌所在的登录会话，请求携带访问令牌时一并吊销
+    """
+    revoke_session(db, refresh_data.refresh_token)
+    if credentials is not None:
+        revoke_access_token(db, credentials.credentials)
+    db.commit()
+    
+    return {"message": "已退出登录"}
 
 
 @router.get("/me", response_model=UserResponse, summary="获取当前用户信息")
@@ -175,7 +232,7 @@ def update_current_user(
 
 
 @router.post("/change-password", summary="修改密码")
-def change_password(
+async def change_password(
     password_data: PasswordChange,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
@@ -184,57 +241,48 @@ def change_password(
     修改密码
     """
     # 验证旧密码
-    if not verify_password(password_data.old_password, current_user.hashed_password):
+    verified, _ = await password_pool.verify(password_data.old_password, current_user.hashed_password)
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="旧密码错误"
         )
     
-    # 更新密码
-    current_user.hashed_password = get_password_hash(password_data.new_password)
-    db.commit()
+    # 更新密码，并吊销已签发的访问令牌和全部登录会话，防止泄露的令牌继续可用
+    current_user.hashed_password = await password_pool.hash(password_data.new_password)
+    revoke_user_tokens(db, current_user)
+    delete_user_sessions(db, current_user.id)
+    
+    # 为当前客户端签发新的令牌（随会话一起提交）
+    tokens = _issue_tokens(db, current_user)
+    invalidate_user_principals(current_user.id)
+    tokens.pop("user")
     
-    return {"message": "密码修改成功"}
+    return {"message": "密码修改成功", **tokens}
 
 
 @router.get("/stats", response_model=UserStats, summary="获取用户游戏统计")
 def get_user_stats(
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_active_principal),
     db: Session = Depends(get_db)
 ) -> Any:
     """
     获取用户游戏统计信息
     """
-    from ..models.game import GameRecord
-    from sqlalchemy import func
+    # 读取统计汇总表，每种游戏类型一行
+    type_stats = get_user_game_stats(db, current_user.id)
     
-    # 查询用户游戏记录统计
-    total_games = db.query(GameRecord).filter(GameRecord.user_id == current_user.id).count()
-    games_won = db.query(GameRecord).filter(
-        GameRecord.user_id == current_user.id,
-        GameRecord.is_winner == True
-    ).count()
+    total_games = sum(stats.game_count for stats in type_stats)
+    games_won = sum(stats.winning_games for stats in type_stats)
     
     win_rate = (games_won / total_games * 100) if total_games > 0 else 0
     
     # 金额统计
-    total_spent = db.query(func.sum(GameRecord.game_cost)).filter(
-        GameRecord.user_id == current_user.id
-    ).scalar() or 0
-
-    total_won = db.query(func.sum(GameRecord.prize_credits)).filter(
-        GameRecord.user_id == current_user.id
-    ).scalar() or 0
+    total_spent = sum(stats.total_bet for stats in type_stats)
+    total_won = sum(stats.total_win for stats in type_stats)
     
     # 最喜欢的游戏
-    favorite_game_result = db.query(
-        GameRecord.game_type,
-        func.count(GameRecord.id).label('count')
-    ).filter(
-        GameRecord.user_id == current_user.id
-    ).group_by(GameRecord.game_type).order_by(func.count(GameRecord.id).desc()).first()
-    
-    favorite_game = favorite_game_result.game_type if favorite_game_result else None
+    favorite_game = max(type_stats, key=lambda stats: stats.game_count).game_type if type_stats else None
     
     return UserStats(
         total_games=total_games,
@@ -2,13 +2,15 @@
 游戏相关API接口
 """
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, load_only, undefer
 from typing import List, Dict, Any
 
-from ..database import get_db
-from ..core.deps import get_current_user
+from ..database import get_db, get_read_db
+from ..core.deps import get_current_user, get_current_principal, Principal
 from ..models.user import User
-from ..models.game import GameRecord
+from ..utils.partitions import fetch_newest_first, fetch_first
+from ..services.settlement import settle_play, InsufficientCreditsError
+from ..services.inventory import prize_inventory
 from ..games import (
     scratch_card_game, 
     slot_machine_game, 
@@ -74,54 +76,44 @@ async def play_scratch_card(
                 detail="积分不足"
             )
         
-        # 创建刮刮乐卡片
-        card_data = scratch_card_game.create_card(request.template_id, current_user.id)
+        # 创建刮刮乐卡片并结算，结算失败时退回领取的限量奖品
+        with prize_inventory.draw("scratch_card") as stock:
+            card_data = scratch_card_game.create_card(request.template_id, current_user.id, stock=stock)
 
-        # 添加调试信息
-        print(f"=== 后端生成的卡片数据 ===")
-        print(f"is_winner: {card_data.get('is_winner')}")
-        print(f"prize_info: {card_data.get('prize_info')}")
-        print(f"完整card_data: {card_data}")
-        
-        # 记录游戏前的金额
-        credits_before = current_user.credits
-
-        # 计算游戏后的金额
-        credits_after = current_user.credits - template_info["cost"]
-        if card_data["is_winner"]:
-            credits_after += card_data["prize_info"]["credits"]
-
-        # 更新用户金额
-        db.query(User).filter(User.id == current_user.id).update({
-            "credits": credits_after
-        })
-
-        # 记录游戏结果
-        game_record = GameRecord(
-            user_id=current_user.id,
-            game_type="scratch_card",
-            template_id=request.template_id,
-            game_cost=template_info["cost"],
-            game_result=card_data,
-            prize_name=card_data["prize_info"]["name"] if card_data["is_winner"] else "谢谢参与",
-            prize_credits=card_data["prize_info"]["credits"] if card_data["is_winner"] else 0,
-            is_winner=card_data["is_winner"],
-            credits_before=credits_before,
-            credits_after=credits_after
-        )
-        db.add(game_record)
-        db.commit()
-
-        # 更新当前用户对象的积分
-        current_user.credits = credits_after
+            # 添加调试信息
+            print(f"=== 后端生成的卡片数据 ===")
+            print(f"is_winner: {card_data.get('is_winner')}")
+            print(f"prize_info: {card_data.get('prize_info')}")
+            print(f"完整card_data: {card_data}")
+            
+            is_winner = card_data["is_winner"]
+            settlement = settle_play(
+                db,
+                current_user,
+                game_type="scratch_card",
+                template_id=request.template_id,
+                cost=template_info["cost"],
+                prize_credits=card_data["prize_info"]["credits"] if is_winner else 0,
+                prize_name=card_data["prize_info"]["name"] if is_winner else "谢谢参与",
+                is_winner=is_winner,
+                game_result=card_data
+            )
         
         return ScratchCardPlayResponse(
             success=True,
             card_data=card_data,
-            user_credits=current_user.credits,
-            game_record_id=game_record.id
+            user_credits=settlement.credits_after,
+            game_record_id=settlement.record_id
         )
         
+    except HTTPException:
+        raise
+    except InsufficientCreditsError as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         db.rollback()
         raise HTTPException(
@@ -134,7 +126,7 @@ async def play_scratch_card(
 async def scratch_area(
     card_data: Dict[str, Any],
     area_id: int,
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """刮开指定区域"""
     try:
@@ -200,35 +192,33 @@ async def play_slot_machine(
         # 转动老虎机
         result = slot_machine_game.spin(request.template_id, current_user.id, bet_lines)
         
-        # 更新用户积分
-        current_user.credits -= total_cost
-        if result["total_win"] > 0:
-            current_user.credits += result["total_win"]
-        
-        # 记录游戏结果
-        game_record = GameRecord(
-            user_id=current_user.id,
+        settlement = settle_play(
+            db,
+            current_user,
             game_type="slot_machine",
             template_id=request.template_id,
-            game_cost=total_cost,
-            game_result=result,
-            prize_name=f"老虎机奖励" if result["is_winner"] else "未中奖",
+            cost=total_cost,
             prize_credits=result["total_win"],
+            prize_name="老虎机奖励" if result["is_winner"] else "未中奖",
             is_winner=result["is_winner"],
-            credits_before=current_user.credits + total_cost,
-            credits_after=current_user.credits
+            game_result=result
         )
-        db.add(game_record)
-        db.commit()
-        db.refresh(current_user)
         
         return SlotMachinePlayResponse(
             success=True,
             result=result,
-            user_credits=current_user.credits,
-            game_record_id=game_record.id
+            user_credits=settlement.credits_after,
+            game_record_id=settlement.record_id
         )
         
+    except HTTPException:
+        raise
+    except InsufficientCreditsError as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         db.rollback()
         raise HTTPException(
@@ -280,51 +270,50 @@ async def play_wheel_fortune(
                 detail="积分不足"
             )
         
-        # 转动转盘
-        result = wheel_fortune_game.spin(request.template_id, current_user.id)
-        
-        # 处理特殊效果
-        final_credits = result["winning_segment"]["credits"]
-        if result["special_effects"].get("double_reward"):
-            final_credits *= 2
-        if result["special_effects"].get("lucky_multiplier"):
-            final_credits *= result["special_effects"]["lucky_multiplier"]
-        if result["special_effects"].get("bankruptcy_protection") and final_credits < 0:
-            final_credits = 0
-        
-        # 更新用户金额
-        current_user.credits -= template_info["cost"]
-        if final_credits > 0:
-            current_user.credits += final_credits
-        
-        # 更新结果中的最终奖励
-        result["final_credits"] = final_credits
-        result["net_win"] = final_credits - template_info["cost"]
-        
-        # 记录游戏结果
-        game_record = GameRecord(
-            user_id=current_user.id,
-            game_type="wheel_fortune",
-            template_id=request.template_id,
-            game_cost=template_info["cost"],
-            game_result=result,
-            prize_name=result["winning_segment"]["name"] if result["is_winner"] else "未中奖",
-            prize_credits=final_credits,
-            is_winner=result["is_winner"],
-            credits_before=current_user.credits + template_info["cost"],
-            credits_after=current_user.credits
-        )
-        db.add(game_record)
-        db.commit()
-        db.refresh(current_user)
+        # 转动转盘并结算，结算失败时退回领取的限量奖品
+        with prize_inventory.draw("wheel_fortune") as stock:
+            result = wheel_fortune_game.spin(request.template_id, current_user.id, stock=stock)
+            
+            # 处理特殊效果
+            final_credits = result["winning_segment"]["credits"]
+            if result["special_effects"].get("double_reward"):
+                final_credits *= 2
+            if result["special_effects"].get("lucky_multiplier"):
+                final_credits *= result["special_effects"]["lucky_multiplier"]
+            if result["special_effects"].get("bankruptcy_protection") and final_credits < 0:
+                final_credits = 0
+            
+            # 更新结果中的最终奖励
+            result["final_credits"] = final_credits
+            result["net_win"] = final_credits - template_info["cost"]
+            
+            settlement = settle_play(
+                db,
+                current_user,
+                game_type="wheel_fortune",
+                template_id=request.template_id,
+                cost=template_info["cost"],
+                prize_credits=final_credits,
+                prize_name=result["winning_segment"]["name"] if result["is_winner"] else "未中奖",
+                is_winner=result["is_winner"],
+                game_result=result
+            )
         
         return WheelFortunePlayResponse(
             success=True,
             result=result,
-            user_credits=current_user.credits,
-            game_record_id=game_record.id
+            user_credits=settlement.credits_after,
+            game_record_id=settlement.record_id
         )
         
+    except HTTPException:
+        raise
+    except InsufficientCreditsError as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         db.rollback()
         raise HTTPException(
@@ -333,32 +322,69 @@ async def play_wheel_fortune(
         )
 
 
+def _history_response(record, include_result: bool) -> GameHistoryResponse:
+    return GameHistoryResponse(
+        id=record.id,
+        game_type=record.game_type,
+        template_id=record.template_id,
+        bet_amount=record.game_cost,
+        win_amount=record.prize_credits,
+        net_win=record.prize_credits - record.game_cost,
+        created_at=record.created_at,
+        result_data=record.game_result if include_result else None
+    )
+
+
 @router.get("/history", response_model=List[GameHistoryResponse])
 async def get_game_history(
     limit: int = 20,
     offset: int = 0,
     game_type: str = None,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    include_result: bool = False,
+    current_user: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_read_db)
 ):
-    """获取游戏历史记录"""
-    query = db.query(GameRecord).filter(GameRecord.user_id == current_user.id)
-    
-    if game_type:
-        query = query.filter(GameRecord.game_type == game_type)
+    """获取游戏历史记录
+
+    默认不返回游戏结果详情（result_data），需要时传 include_result=true，
+    或通过 /history/{record_id} 获取单条记录详情。
+    """
+    def build_query(source):
+        options = [load_only(
+            source.id, source.game_type, source.template_id,
+            source.game_cost, source.prize_credits, source.created_at
+        )]
+        if include_result:
+            options.append(undefer(source.game_result))
+        query = db.query(source).options(*options).filter(source.user_id == current_user.id)
+        if game_type:
+            query = query.filter(source.game_type == game_type)
+        return query
     
-    records = query.order_by(GameRecord.created_at.desc()).offset(offset).limit(limit).all()
+    # 先读热表，不够时再按月份从新到旧读取归档库
+    records = fetch_newest_first(db, build_query, offset, limit)
     
-    return [
-        GameHistoryResponse(
-            id=record.id,
-            game_type=record.game_type,
-            template_id=record.template_id,
-            bet_amount=record.game_cost,
-            win_amount=record.prize_credits,
-            net_win=record.prize_credits - record.game_cost,
-            created_at=record.created_at,
-            result_data=record.game_result
+    return [_history_response(record, include_result) for record in records]
+
+
+@router.get("/history/{record_id}", response_model=GameHistoryResponse)
+async def get_game_history_detail(
+    record_id: int,
+    current_user: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_read_db)
+):
+    """获取单条游戏记录详情（包含游戏结果）"""
+    record = fetch_first(
+        db,
+        lambda source: db.query(source).options(undefer(source.game_result)).filter(
+            source.id == record_id,
+            source.user_id == current_user.id
         )
-        for record in records
-    ]
+    )
+    if not record:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="游戏记录不存在"
+        )
+    
+    return _history_response(record, include_result=True)
@@ -1,21 +1,31 @@
 """
 数据统计相关API接口
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc, and_
+from sqlalchemy import func, desc
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
+import asyncio
+import json
 
-from ..database import get_db
-from ..core.deps import get_current_user
+from ..config import settings
+from ..database import get_read_db
+from ..core.deps import get_current_principal, Principal
 from ..models.user import User
-from ..models.game import GameRecord
+from ..models.stats import UserGameStats
+from ..services.user_stats import get_user_game_stats
+from ..services.analysis import AnalysisFilter, analyze_games
+from ..services.live import LiveCapacityExceeded, LiveSubscriber, compute_live_status, live_broadcaster
+from ..services.leaderboard import Leaderboards, WindowLeaderboards, leaderboards, window_leaderboards
+from ..services.response_cache import cached_response, role_scope, user_scope
 from ..schemas.game import (
     GameStatsResponse,
     UserGameStatsResponse,
     LeaderboardEntry,
     LeaderboardResponse,
+    LeaderboardWindow,
     GameAnalysisRequest,
     GameAnalysisResponse,
     LiveGameStatus,
@@ -26,16 +36,12 @@ from ..schemas.game import (
 router = APIRouter()
 
 
-@router.get("/user/stats", response_model=UserGameStatsResponse)
-async def get_user_stats(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """获取用户游戏统计"""
-    # 获取用户所有游戏记录
-    records = db.query(GameRecord).filter(GameRecord.user_id == current_user.id).all()
+def _user_stats_response(db: Session, current_user: Principal) -> UserGameStatsResponse:
+    """按游戏类型汇总用户的游戏统计"""
+    # 读取汇总表，每种游戏类型一行
+    type_stats = get_user_game_stats(db, current_user.id)
 
-    if not records:
+    if not type_stats:
         return UserGameStatsResponse(
             user_id=current_user.id,
             username=current_user.username,
@@ -51,18 +57,15 @@ async def get_user_stats(
         )
 
     # 计算总体统计
-    total_games = len(records)
-    total_bet = sum(record.game_cost for record in records)
-    total_win = sum(record.prize_credits for record in records)
+    total_games = sum(stats.game_count for stats in type_stats)
+    total_bet = sum(stats.total_bet for stats in type_stats)
+    total_win = sum(stats.total_win for stats in type_stats)
     net_result = total_win - total_bet
-    winning_games = len([r for r in records if r.prize_credits > r.game_cost])
+    winning_games = sum(stats.profitable_games for stats in type_stats)
     win_rate = winning_games / total_games if total_games > 0 else 0.0
     
     # 找出最喜欢的游戏
-    game_counts = {}
-    for record in records:
-        game_counts[record.game_type] = game_counts.get(record.game_type, 0) + 1
-    favorite_game = max(game_counts, key=game_counts.get) if game_counts else None
+    favorite_game = max(type_stats, key=lambda stats: stats.game_count).game_type
     
     overall_stats = GameStatsResponse(
         total_games=total_games,
@@ -75,22 +78,16 @@ async def get_user_stats(
     
     # 按游戏类型分组统计
     game_type_stats = {}
-    for game_type in set(record.game_type for record in records):
-        type_records = [r for r in records if r.game_type == game_type]
-        type_total_games = len(type_records)
-        type_total_bet = sum(r.game_cost for r in type_records)
-        type_total_win = sum(r.prize_credits for r in type_records)
-        type_net_result = type_total_win - type_total_bet
-        type_winning_games = len([r for r in type_records if r.prize_credits > r.game_cost])
-        type_win_rate = type_winning_games / type_total_games if type_total_games > 0 else 0.0
+    for stats in type_stats:
+        type_win_rate = stats.profitable_games / stats.game_count if stats.game_count > 0 else 0.0
         
-        game_type_stats[game_type] = GameStatsResponse(
-            total_games=type_total_games,
-            total_bet=type_total_bet,
-            total_win=type_total_win,
-            net_result=type_net_result,
+        game_type_stats[stats.game_type] = GameStatsResponse(
+            total_games=stats.game_count,
+            total_bet=stats.total_bet,
+            total_win=stats.total_win,
+            net_result=stats.total_win - stats.total_bet,
             win_rate=type_win_rate,
-            favorite_game=game_type
+            favorite_game=stats.game_type
         )
     
     return UserGameStatsResponse(
@@ -101,132 +98,96 @@ async def get_user_stats(
     )
 
 
+@router.get("/user/stats", response_model=UserGameStatsResponse)
+async def get_user_stats(
+    response: Response,
+    current_user: Principal = Depends(get_current_principal)
+):
+    """获取用户游戏统计"""
+    return await cached_response(
+        response, "user_stats", user_scope(current_user.id), None,
+        lambda db: _user_stats_response(db, current_user)
+    )
+
+
+def _board_response(leaderboard_type: str, limit: int, user_id: int) -> LeaderboardResponse:
+    """从内存排行榜读取前几名和当前用户的名次"""
+    standing = leaderboards.standing(leaderboard_type, user_id, limit)
+    return LeaderboardResponse(
+        leaderboard_type=leaderboard_type,
+        entries=[
+            LeaderboardEntry(
+                rank=rank,
+                user_id=entry_user_id,
+                username=username,
+                value=int(value),
+                game_count=game_count
+            )
+            for rank, (entry_user_id, username, value, game_count) in enumerate(standing.entries, 1)
+        ],
+        user_rank=standing.user_rank,
+        user_value=int(standing.user_value)
+    )
+
+
 @router.get("/leaderboard/credits", response_model=LeaderboardResponse)
 async def get_credits_leaderboard(
     limit: int = Query(10, ge=1, le=100),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """获取金额排行榜"""
-    # 获取排行榜数据
-    top_users = db.query(User).order_by(desc(User.credits)).limit(limit).all()
-    
-    entries = []
-    for rank, user in enumerate(top_users, 1):
-        # 获取用户游戏次数
-        game_count = db.query(GameRecord).filter(GameRecord.user_id == user.id).count()
-        
-        entries.append(LeaderboardEntry(
-            rank=rank,
-            user_id=user.id,
-            username=user.username,
-            value=user.credits,
-            game_count=game_count
-        ))
-    
-    # 获取当前用户排名
-    user_rank = None
-    user_value = current_user.credits
-    
-    higher_users = db.query(User).filter(User.credits > current_user.credits).count()
-    user_rank = higher_users + 1
-    
-    return LeaderboardResponse(
-        leaderboard_type="credits",
-        entries=entries,
-        user_rank=user_rank,
-        user_value=user_value
-    )
+    return _board_response(Leaderboards.CREDITS, limit, current_user.id)
 
 
 @router.get("/leaderboard/total-win", response_model=LeaderboardResponse)
 async def get_total_win_leaderboard(
     limit: int = Query(10, ge=1, le=100),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """获取总赢取排行榜"""
-    # 计算每个用户的总赢取
-    user_wins = db.query(
-        GameRecord.user_id,
-        User.username,
-        func.sum(GameRecord.prize_credits).label('total_win'),
-        func.count(GameRecord.id).label('game_count')
-    ).join(User).group_by(GameRecord.user_id, User.username)\
-     .order_by(desc('total_win')).limit(limit).all()
-    
-    entries = []
-    for rank, (user_id, username, total_win, game_count) in enumerate(user_wins, 1):
-        entries.append(LeaderboardEntry(
-            rank=rank,
-            user_id=user_id,
-            username=username,
-            value=total_win or 0,
-            game_count=game_count or 0
-        ))
-    
-    # 获取当前用户的总赢取和排名
-    current_user_win = db.query(func.sum(GameRecord.prize_credits))\
-                        .filter(GameRecord.user_id == current_user.id).scalar() or 0
-    
-    higher_users = db.query(func.count(func.distinct(GameRecord.user_id)))\
-                    .filter(func.sum(GameRecord.prize_credits) > current_user_win)\
-                    .group_by(GameRecord.user_id).count()
-    
-    user_rank = higher_users + 1 if higher_users is not None else 1
-    
-    return LeaderboardResponse(
-        leaderboard_type="total_win",
-        entries=entries,
-        user_rank=user_rank,
-        user_value=current_user_win
-    )
+    return _board_response(Leaderboards.TOTAL_WIN, limit, current_user.id)
 
 
-@router.get("/leaderboard/win-rate", response_model=LeaderboardResponse)
-async def get_win_rate_leaderboard(
-    limit: int = Query(10, ge=1, le=100),
-    min_games: int = Query(10, ge=1),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """获取胜率排行榜（需要最少游戏次数）"""
-    # 计算每个用户的胜率
+def _win_rate_response(db: Session, limit: int, min_games: int, current_user_id: int) -> LeaderboardResponse:
+    """在SQL中计算任意门槛的胜率排行榜"""
+    # 按用户汇总各游戏类型的统计，胜率在SQL中计算和排序
+    total_games = func.sum(UserGameStats.game_count)
+    win_rate = func.sum(UserGameStats.profitable_games) * 100.0 / total_games
     user_stats = db.query(
-        GameRecord.user_id,
+        UserGameStats.user_id,
+        win_rate.label('win_rate'),
+        total_games.label('total_games')
+    ).group_by(UserGameStats.user_id)\
+     .having(total_games >= min_games).subquery()
+    
+    top_users = db.query(
+        user_stats.c.user_id,
         User.username,
-        func.count(GameRecord.id).label('total_games'),
-        func.sum(func.case([(GameRecord.prize_credits > GameRecord.game_cost, 1)], else_=0)).label('winning_games')
-    ).join(User).group_by(GameRecord.user_id, User.username)\
-     .having(func.count(GameRecord.id) >= min_games).all()
-    
-    # 计算胜率并排序
-    user_win_rates = []
-    for user_id, username, total_games, winning_games in user_stats:
-        win_rate = (winning_games / total_games * 100) if total_games > 0 else 0
-        user_win_rates.append((user_id, username, win_rate, total_games))
-    
-    user_win_rates.sort(key=lambda x: x[2], reverse=True)
+        user_stats.c.win_rate,
+        user_stats.c.total_games
+    ).join(User, User.id == user_stats.c.user_id)\
+     .order_by(desc(user_stats.c.win_rate)).limit(limit).all()
     
     entries = []
-    for rank, (user_id, username, win_rate, game_count) in enumerate(user_win_rates[:limit], 1):
+    for rank, (user_id, username, user_win_rate, game_count) in enumerate(top_users, 1):
         entries.append(LeaderboardEntry(
             rank=rank,
             user_id=user_id,
             username=username,
-            value=int(win_rate),
+            value=int(user_win_rate),
             game_count=game_count
         ))
     
     # 计算当前用户胜率和排名
-    current_user_records = db.query(GameRecord).filter(GameRecord.user_id == current_user.id).all()
-    current_user_total = len(current_user_records)
-    current_user_wins = len([r for r in current_user_records if r.prize_credits > r.game_cost])
-    current_user_win_rate = (current_user_wins / current_user_total * 100) if current_user_total >= min_games else 0
+    current_user_stats = get_user_game_stats(db, current_user_id)
+    current_user_total = sum(stats.game_count for stats in current_user_stats)
+    current_user_wins = sum(stats.profitable_games for stats in current_user_stats)
+    current_user_win_rate = (current_user_wins * 100.0 / current_user_total) if current_user_total >= min_games else 0
     
     user_rank = None
     if current_user_total >= min_games:
-        higher_users = len([x for x in user_win_rates if x[2] > current_user_win_rate])
+        higher_users = db.query(func.count()).select_from(user_stats)\
+                        .filter(user_stats.c.win_rate > current_user_win_rate).scalar()
         user_rank = higher_users + 1
     
     return LeaderboardResponse(
@@ -237,145 +198,238 @@ async def get_win_rate_leaderboard(
     )
 
 
+@router.get("/leaderboard/win-rate", response_model=LeaderboardResponse)
+async def get_win_rate_leaderboard(
+    response: Response,
+    limit: int = Query(10, ge=1, le=100),
+    min_games: int = Query(10, ge=1),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """获取胜率排行榜（需要最少游戏次数）"""
+    # 内存排行榜只包含达到配置次数的用户，其他门槛在SQL中计算
+    if min_games == settings.leaderboard_win_rate_min_games:
+        return _board_response(Leaderboards.WIN_RATE, limit, current_user.id)
+
+    return await cached_response(
+        response, "leaderboard", user_scope(current_user.id),
+        {"board": "win_rate", "limit": limit, "min_games": min_games},
+        lambda db: _win_rate_response(db, limit, min_games, current_user.id)
+    )
+
+
+def _window_response(
+    db: Session, leaderboard_type: str, window: LeaderboardWindow, limit: int, user_id: int
+) -> LeaderboardResponse:
+    """从小时分桶排行榜读取窗口内的前几名和当前用户的名次"""
+    standing = window_leaderboards.standing(leaderboard_type, window, user_id, limit)
+    top_ids = [entry_user_id for entry_user_id, _, _ in standing.entries]
+    usernames = dict(
+        db.query(User.id, User.username).filter(User.id.in_(top_ids)).all()
+    ) if top_ids else {}
+    return LeaderboardResponse(
+        leaderboard_type=leaderboard_type,
+        window=window,
+        entries=[
+            LeaderboardEntry(
+                rank=rank,
+                user_id=entry_user_id,
+                username=usernames.get(entry_user_id, "未知用户"),
+                value=value,
+                game_count=game_count
+            )
+            for rank, (entry_user_id, value, game_count) in enumerate(standing.entries, 1)
+        ],
+        user_rank=standing.user_rank,
+        user_value=standing.user_value
+    )
+
+
+@router.get("/leaderboard/net-win", response_model=LeaderboardResponse)
+async def get_net_win_leaderboard(
+    response: Response,
+    window: LeaderboardWindow = Query(LeaderboardWindow.TODAY),
+    limit: int = Query(10, ge=1, le=100),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """获取时间窗口内的净赢取排行榜（奖励减消耗）"""
+    return await cached_response(
+        response, "leaderboard", user_scope(current_user.id),
+        {"board": WindowLeaderboards.NET_WIN, "window": window, "limit": limit},
+        lambda db: _window_response(db, WindowLeaderboards.NET_WIN, window, limit, current_user.id)
+    )
+
+
+@router.get("/leaderboard/biggest-win", response_model=LeaderboardResponse)
+async def get_biggest_win_leaderboard(
+    response: Response,
+    window: LeaderboardWindow = Query(LeaderboardWindow.TODAY),
+    limit: int = Query(10, ge=1, le=100),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """获取时间窗口内的单局最大奖励排行榜"""
+    return await cached_response(
+        response, "leaderboard", user_scope(current_user.id),
+        {"board": WindowLeaderboards.BIGGEST_WIN, "window": window, "limit": limit},
+        lambda db: _window_response(db, WindowLeaderboards.BIGGEST_WIN, window, limit, current_user.id)
+    )
+
+
 @router.get("/analysis", response_model=GameAnalysisResponse)
 async def get_game_analysis(
+    response: Response,
     game_type: Optional[str] = None,
     template_id: Optional[str] = None,
     days: int = Query(7, ge=1, le=365),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """获取游戏分析数据（需要管理员权限或自己的数据）"""
     end_date = datetime.now()
     start_date = end_date - timedelta(days=days)
     
-    # 构建查询条件
-    query = db.query(GameRecord).filter(
-        GameRecord.created_at >= start_date,
-        GameRecord.created_at <= end_date
+    filters = AnalysisFilter(
+        start=start_date,
+        end=end_date,
+        game_types=[game_type] if game_type else None,
+        template_ids=[template_id] if template_id else None
     )
-    
     # 如果不是管理员，只能查看自己的数据
     if not current_user.is_admin:
-        query = query.filter(GameRecord.user_id == current_user.id)
-    
-    if game_type:
-        query = query.filter(GameRecord.game_type == game_type)
-    
-    if template_id:
-        query = query.filter(GameRecord.template_id == template_id)
+        filters.user_ids = [current_user.id]
     
-    records = query.all()
-    
-    if not records:
-        return GameAnalysisResponse(
-            period=f"{days}天",
-            total_players=0,
-            total_games=0,
-            total_revenue=0,
-            total_payout=0,
-            profit_margin=0.0,
-            popular_games=[],
-            hourly_distribution={},
-            daily_distribution={}
+    return await cached_response(
+        response, "analysis", role_scope(current_user),
+        {"game_type": game_type, "template_id": template_id, "days": days},
+        lambda db: GameAnalysisResponse(period=f"{days}天", **analyze_games(db, filters))
+    )
+
+
+@router.post("/analysis", response_model=GameAnalysisResponse)
+async def query_game_analysis(
+    request: GameAnalysisRequest,
+    response: Response,
+    current_user: Principal = Depends(get_current_principal)
+):
+    """按任意条件获取游戏分析数据（非管理员只能查看自己的数据）"""
+    end_date = request.end_date or datetime.now()
+    start_date = request.start_date or end_date - timedelta(days=7)
+    if start_date > end_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="开始时间不能晚于结束时间"
         )
     
-    # 计算基本统计
-    total_players = len(set(record.user_id for record in records))
-    total_games = len(records)
-    total_revenue = sum(record.game_cost for record in records)
-    total_payout = sum(record.prize_credits for record in records)
-    profit_margin = ((total_revenue - total_payout) / total_revenue * 100) if total_revenue > 0 else 0
-    
-    # 统计热门游戏
-    game_popularity = {}
-    for record in records:
-        key = f"{record.game_type}:{record.template_id}"
-        if key not in game_popularity:
-            game_popularity[key] = {"count": 0, "revenue": 0}
-        game_popularity[key]["count"] += 1
-        game_popularity[key]["revenue"] += record.game_cost
-    
-    popular_games = [
-        {
-            "game": key,
-            "play_count": data["count"],
-            "revenue": data["revenue"]
-        }
-        for key, data in sorted(game_popularity.items(), key=lambda x: x[1]["count"], reverse=True)[:5]
-    ]
-    
-    # 按小时分布
-    hourly_distribution = {}
-    for record in records:
-        hour = record.created_at.hour
-        hourly_distribution[str(hour)] = hourly_distribution.get(str(hour), 0) + 1
-    
-    # 按日期分布
-    daily_distribution = {}
-    for record in records:
-        date_str = record.created_at.strftime("%Y-%m-%d")
-        daily_distribution[date_str] = daily_distribution.get(date_str, 0) + 1
-    
-    return GameAnalysisResponse(
-        period=f"{days}天",
-        total_players=total_players,
-        total_games=total_games,
-        total_revenue=total_revenue,
-        total_payout=total_payout,
-        profit_margin=profit_margin,
-        popular_games=popular_games,
-        hourly_distribution=hourly_distribution,
-        daily_distribution=daily_distribution
+    game_types = list(request.game_types or [])
+    if request.game_type:
+        game_types.append(request.game_type)
+    template_ids = list(request.template_ids or [])
+    if request.template_id:
+        template_ids.append(request.template_id)
+    
+    filters = AnalysisFilter(
+        start=start_date,
+        end=end_date,
+        user_ids=request.user_ids if current_user.is_admin else [current_user.id],
+        game_types=game_types,
+        template_ids=template_ids,
+        min_cost=request.min_cost,
+        max_cost=request.max_cost,
+        is_winner=request.is_winner,
+        top_games=request.top_games
+    )
+    period = f"{start_date.strftime('%Y-%m-%d %H:%M')} ~ {end_date.strftime('%Y-%m-%d %H:%M')}"
+    return await cached_response(
+        response, "analysis", role_scope(current_user), {"query": request},
+        lambda db: GameAnalysisResponse(period=period, **analyze_games(db, filters))
     )
 
 
 @router.get("/live-status", response_model=LiveGameStatus)
 async def get_live_game_status(
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
-    """获取实时游戏状态"""
-    # 获取最近1小时的活跃用户数（简化实现）
-    one_hour_ago = datetime.now() - timedelta(hours=1)
-    online_players = db.query(func.count(func.distinct(GameRecord.user_id)))\
-                      .filter(GameRecord.created_at >= one_hour_ago).scalar() or 0
-    
-    # 获取最近10分钟的游戏数
-    ten_minutes_ago = datetime.now() - timedelta(minutes=10)
-    active_games = db.query(GameRecord)\
-                    .filter(GameRecord.created_at >= ten_minutes_ago).count()
-    
-    # 获取最近的大奖记录
-    recent_big_wins = db.query(GameRecord)\
-                       .filter(GameRecord.prize_credits >= 1000)\
-                       .order_by(desc(GameRecord.created_at))\
-                       .limit(5).all()
-    
-    big_wins_data = []
-    for record in recent_big_wins:
-        user = db.query(User).filter(User.id == record.user_id).first()
-        big_wins_data.append({
-            "username": user.username if user else "未知用户",
-            "game_type": record.game_type,
-            "win_amount": record.prize_credits,
-            "timestamp": record.created_at
-        })
-    
-    # 获取热门游戏（最近24小时）
-    twenty_four_hours_ago = datetime.now() - timedelta(hours=24)
-    hot_games_query = db.query(
-        GameRecord.game_type,
-        GameRecord.template_id,
-        func.count(GameRecord.id).label('play_count')
-    ).filter(GameRecord.created_at >= twenty_four_hours_ago)\
-     .group_by(GameRecord.game_type, GameRecord.template_id)\
-     .order_by(desc('play_count')).limit(3).all()
-    
-    hot_games = [f"{game_type}:{template_id}" for game_type, template_id, _ in hot_games_query]
-    
-    return LiveGameStatus(
-        online_players=online_players,
-        active_games=active_games,
-        recent_big_wins=big_wins_data,
-        hot_games=hot_games
+    """获取实时游戏状态（读取推送服务最近一次计算的结果）"""
+    live_status = live_broadcaster.latest_status() or compute_live_status(db)
+    return LiveGameStatus(**live_status)
+
+
+def _subscribe_live() -> LiveSubscriber:
+    try:
+        return live_broadcaster.subscribe()
+    except LiveCapacityExceeded:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="实时推送连接数已满，请稍后重试",
+            headers={"Retry-After": str(settings.live_heartbeat_seconds)}
+        )
+
+
+@router.get("/live")
+async def stream_live_status(request: Request):
+    """实时游戏状态推送（SSE）
+
+    连接后先收到完整状态（event: status），之后只推送变化的字段；大奖结算时推送
+    big_win / jackpot 事件。积压过多时收到带 resync 标记的完整状态。
+    """
+    subscriber = _subscribe_live()
+
+    async def event_stream():
+        try:
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscriber.queue.get(), timeout=settings.live_heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": ping\n\n"
+                    continue
+                data = dict(message["data"], resync=True) if message.get("resync") else message["data"]
+                yield f"event: {message['event']}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+        finally:
+            live_broadcaster.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
+
+
+async def _wait_closed(websocket: WebSocket):
+    """等待客户端断开，忽略客户端发来的消息"""
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            return
+
+
+@router.websocket("/live")
+async def live_status_socket(websocket: WebSocket):
+    """实时游戏状态推送（WebSocket），消息格式为 {"event": 事件名, "data": 内容}"""
+    try:
+        subscriber = live_broadcaster.subscribe()
+    except LiveCapacityExceeded:
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+        return
+
+    await websocket.accept()
+    closed = asyncio.create_task(_wait_closed(websocket))
+    try:
+        while True:
+            getter = asyncio.create_task(subscriber.queue.get())
+            done, _ = await asyncio.wait(
+                {getter, closed}, timeout=settings.live_heartbeat_seconds, return_when=asyncio.FIRST_COMPLETED
+            )
+            if closed in done:
+                getter.cancel()
+                break
+            if getter in done:
+                message = getter.result()
+            else:
+                getter.cancel()
+                message = {"event": "ping", "data": {}}
+            await websocket.send_json(message)
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        closed.cancel()
+        live_broadcaster.unsubscribe(subscriber)
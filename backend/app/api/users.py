@@ -5,10 +5,15 @@ from typing import Any, List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import or_
-from ..core.deps import get_db, get_current_admin_user
+from ..core.deps import get_db, get_current_admin_user, invalidate_user_principals, revoke_user_tokens, Principal
 from ..models.user import User
 from ..schemas.auth import UserResponse, UserCreate, UserUpdate
-from ..core.security import get_password_hash
+from ..services.ledger import adjust_credits, record_opening_credits, InsufficientCreditsError
+from ..services.admin_log import record_admin_action
+from ..services.passwords import password_pool
+from ..services.sessions import delete_user_sessions
+from ..services.leaderboard import leaderboards
+from ..services.response_cache import invalidate_responses
 
 router = APIRouter()
 
@@ -21,7 +26,7 @@ def get_users(
     is_active: Optional[bool] = Query(None, description="是否激活"),
     is_admin: Optional[bool] = Query(None, description="是否管理员"),
     db: Session = Depends(get_db),
-    current_admin: User = Depends(get_current_admin_user)
+    current_admin: Principal = Depends(get_current_admin_user)
 ) -> Any:
     """
     获取用户列表（管理员权限）
@@ -55,7 +60,7 @@ def get_users(
 def get_user(
     user_id: int,
     db: Session = Depends(get_db),
-    current_admin: User = Depends(get_current_admin_user)
+    current_admin: Principal = Depends(get_current_admin_user)
 ) -> Any:
     """
     获取指定用户详情（管理员权限）
@@ -71,10 +76,10 @@ def get_user(
 
 
 @router.post("/", response_model=UserResponse, summary="创建用户")
-def create_user(
+async def create_user(
     user_data: UserCreate,
     db: Session = Depends(get_db),
-    current_admin: User = Depends(get_current_admin_user)
+    current_admin: Principal = Depends(get_current_admin_user)
 ) -> Any:
     """
     创建新用户（管理员权限）
@@ -97,13 +102,16 @@ def create_user(
     user = User(
         username=user_data.username,
         email=user_data.email,
-        hashed_password=get_password_hash(user_data.password),
+        hashed_password=await password_pool.hash(user_data.password),
         full_name=user_data.full_name,
         credits=1000  # 默认金额
     )
     
     db.add(user)
+    db.flush()
+    record_opening_credits(db, user)
     db.commit()
+    invalidate_responses()
     db.refresh(user)
     
     return user
@@ -114,7 +122,7 @@ def update_user(
     user_id: int,
     user_update: UserUpdate,
     db: Session = Depends(get_db),
-    current_admin: User = Depends(get_current_admin_user)
+    current_admin: Principal = Depends(get_current_admin_user)
 ) -> Any:
     """
     更新用户信息（管理员权限）
@@ -135,6 +143,7 @@ def update_user(
         user.bio = user_update.bio
     
     db.commit()
+    invalidate_responses(user.id)
     db.refresh(user)
     
     return user
@@ -145,7 +154,7 @@ def update_user_status(
     user_id: int,
     is_active: bool,
     db: Session = Depends(get_db),
-    current_admin: User = Depends(get_current_admin_user)
+    current_admin: Principal = Depends(get_current_admin_user)
 ) -> Any:
     """
     更新用户激活状态（管理员权限）
@@ -165,7 +174,10 @@ def update_user_status(
         )
     
     user.is_active = is_active
+    revoke_user_tokens(db, user)
     db.commit()
+    invalidate_user_principals(user.id)
+    invalidate_responses(user.id)
     db.refresh(user)
     
     return user
@@ -176,7 +188,7 @@ def update_user_admin_status(
     user_id: int,
     is_admin: bool,
     db: Session = Depends(get_db),
-    current_admin: User = Depends(get_current_admin_user)
+    current_admin: Principal = Depends(get_current_admin_user)
 ) -> Any:
     """
     更新用户管理员权限（管理员权限）
@@ -196,7 +208,10 @@ def update_user_admin_status(
         )
     
     user.is_admin = is_admin
+    revoke_user_tokens(db, user)
     db.commit()
+    invalidate_user_principals(user.id)
+    invalidate_responses(user.id)
     db.refresh(user)
     
     return user
@@ -208,7 +223,7 @@ def adjust_user_credits(
     credits_change: int,
     reason: str = "管理员调整",
     db: Session = Depends(get_db),
-    current_admin: User = Depends(get_current_admin_user)
+    current_admin: Principal = Depends(get_current_admin_user)
 ) -> Any:
     """
     调整用户金额（管理员权限）
@@ -220,20 +235,39 @@ def adjust_user_credits(
             detail="用户不存在"
         )
     
-    # 检查金额调整后是否为负数
-    new_credits = user.credits + credits_change
-    if new_credits < 0:
+    old_credits = user.credits
+    admin_log = record_admin_action(
+        db,
+        current_admin,
+        action_type="adjust_user_credits",
+        description=f"调整用户 {user.username} 的金额 {credits_change:+d}，原因: {reason}",
+        target_type="user",
+        target_id=user.id,
+        old_data={"credits": old_credits}
+    )
+    
+    # 金额变动和流水在同一事务中写入，调整后为负数时拒绝
+    try:
+        new_credits = adjust_credits(
+            db,
+            user.id,
+            credits_change,
+            ref_type="admin_log",
+            ref_id=admin_log.id,
+            description=reason
+        )
+    except InsufficientCreditsError:
+        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="金额不足，无法扣除"
         )
     
-    user.credits = new_credits
+    admin_log.new_data = {"credits": new_credits, "reason": reason}
     db.commit()
+    invalidate_responses(user.id)
     db.refresh(user)
     
-    # TODO: 记录金额变动日志
-    
     return user
 
 
@@ -241,7 +275,7 @@ def adjust_user_credits(
 def delete_user(
     user_id: int,
     db: Session = Depends(get_db),
-    current_admin: User = Depends(get_current_admin_user)
+    current_admin: Principal = Depends(get_current_admin_user)
 ) -> Any:
     """
     删除用户（管理员权限）
@@ -260,7 +294,12 @@ def delete_user(
             detail="不能删除自己的账户"
         )
     
+    revoke_user_tokens(db, user)
+    delete_user_sessions(db, user.id)
     db.delete(user)
     db.commit()
+    invalidate_user_principals(user_id)
+    invalidate_responses(user_id)
+    leaderboards.remove(user_id)
     
     return {"message": "用户删除成功"}
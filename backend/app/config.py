@@ -20,11 +20,91 @@ class Settings(BaseSettings):
     
     # 数据库配置 - 使用项目根目录的database文件夹
     database_url: str = "sqlite:///./database/entertainment.db"
+    database_busy_timeout: int = 15  # 写库等待锁的超时时间（秒）
+    
+    # 只读连接池配置（统计分析查询使用）
+    read_pool_size: int = 5
+    read_max_overflow: int = 5
+    read_pool_timeout: int = 10  # 等待空闲连接的超时时间（秒）
+    read_busy_timeout: int = 5  # 等待数据库锁的超时时间（秒）
+    
+    # 金额流水配置
+    credit_snapshot_interval: int = 200  # 用户新增多少条流水后生成一次余额快照
+    credit_snapshot_check_minutes: int = 10  # 后台快照任务检查间隔
+    
+    # 每日系统统计配置
+    daily_stats_rollup_minutes: int = 10  # 定稿已结束日期、重算当天统计的间隔
+    
+    # 排行榜配置
+    leaderboard_sync_seconds: int = 2  # 同步其他进程余额变动的间隔
+    leaderboard_rebuild_minutes: int = 10  # 从数据库整体重建排行榜的间隔
+    leaderboard_win_rate_min_games: int = 10  # 胜率排行榜常驻内存部分的最少游戏次数
+    
+    # 最近大奖缓存配置
+    big_win_buffer_size: int = 50  # 每种游戏类型缓存的最近大奖数量
+    big_win_sync_seconds: int = 2  # 同步其他进程大奖的间隔
+    
+    # 实时活跃度配置
+    activity_sync_seconds: int = 2  # 同步其他进程对局的间隔
+    
+    # 接口响应缓存配置
+    response_cache_size: int = 10000  # 最多缓存的响应数量
+    response_cache_ttls: dict = {  # 各路由的新鲜期（秒），0 表示不缓存
+        "user_stats": 5,
+        "leaderboard": 5,
+        "analysis": 30,
+        "dashboard_overview": 10
+    }
+    response_cache_stale_seconds: int = 30  # 过期后继续返回旧结果、后台刷新的时长
+    
+    # 派奖监控配置
+    payout_monitor_days: int = 30  # 启动时加载的游戏记录天数
+    payout_monitor_min_plays: int = 200  # 判定偏离所需的最少对局数
+    payout_monitor_z: float = 3.0  # 偏离阈值（z 值，约 99.7% 置信度）
+    payout_monitor_sync_seconds: int = 2  # 同步其他进程对局的间隔
+    
+    # 实时推送配置
+    live_status_interval_seconds: int = 2  # 计算并推送实时状态的间隔
+    live_queue_size: int = 100  # 每个订阅者最多积压的消息数，超出后改推完整状态
+    live_max_subscribers: int = 10000  # 单个进程的订阅者上限
+    live_heartbeat_seconds: int = 15  # 没有消息时发送心跳的间隔
+    
+    # 游戏结果压缩配置
+    game_result_compression: str = "zlib"  # none / zlib / zstd（需安装 zstandard）
+    game_result_compression_level: int = 6
+    game_result_dictionary_dir: str = "./database/dictionaries"
+    game_result_dictionary: Optional[str] = None  # 字典文件名，为空则不使用字典
     
     # JWT 认证配置
     secret_key: str = "your-secret-key-change-in-production"
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
+    principal_cache_size: int = 10000  # 已认证身份缓存的最大条目数
+    principal_cache_ttl_seconds: int = 60  # 已认证身份缓存的有效期
+    refresh_token_expire_days: int = 14  # 刷新令牌有效期，每次刷新后重新计算
+    session_cache_size: int = 10000  # 登录会话缓存的最大条目数
+    session_cleanup_check_minutes: int = 60  # 后台清理过期会话的间隔
+    token_revocation_capacity: int = 100000  # 令牌吊销布隆过滤器的预估条目数
+    token_revocation_error_rate: float = 0.001  # 布隆过滤器误判率，误判时多查一次数据库
+    token_revocation_sync_seconds: int = 2  # 同步其他进程吊销记录的间隔
+    
+    # 密码哈希配置
+    bcrypt_rounds: int = 12  # bcrypt 成本，修改后用户下次登录时按新成本重新哈希
+    password_pool_workers: int = 2  # 密码哈希进程数
+    password_pool_queue_size: int = 32  # 进程池繁忙时最多排队的请求数，超出直接拒绝
+    
+    # 游戏记录归档配置
+    archive_enabled: bool = True
+    archive_dir: str = "./database/archive"  # 按月归档库所在目录
+    archive_hot_months: int = 3  # 热表保留的月份数（含当月）
+    archive_check_interval_hours: int = 6  # 后台归档任务检查间隔
+    
+    # 游戏记录导出配置
+    export_batch_size: int = 1000  # 导出时每批读取的记录数
+    
+    # 限量奖品库存配置
+    prize_lease_block_size: int = 20  # 每次从数据库租借的库存数量
+    prize_inventory_sync_seconds: int = 5  # 批量结算已发出奖品、刷新库存的间隔
     
     # 游戏配置
     default_user_credits: int = 1000  # 新用户默认金额
@@ -0,0 +1,154 @@
+"""
+进程内缓存
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+V = TypeVar("V")
+
+
+class TTLCache(Generic[V]):
+    """容量有限、带过期时间的 LRU 缓存（线程安全）
+
+    超出容量时淘汰最久未使用的条目；过期条目在读取时删除。
+    """
+
+    def __init__(self, maxsize: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[Hashable, Tuple[float, V]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[V]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at <= self._clock():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: V, ttl: Optional[float] = None):
+        """写入缓存，ttl 不超过默认过期时间"""
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (self._clock() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> Optional[V]:
+        with self._lock:
+            item = self._data.pop(key, None)
+            return item[1] if item else None
+
+    def pop_where(self, predicate: Callable[[V], bool]) -> int:
+        """删除所有满足条件的条目，返回删除数量"""
+        with self._lock:
+            keys = [key for key, (_, value) in self._data.items() if predicate(value)]
+            for key in keys:
+                del self._data[key]
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SingleFlightCache(Generic[V]):
+    """异步缓存：并发的相同请求只计算一次，过期后一段时间内先返回旧值再后台刷新
+
+    条目在 ttl 秒内直接返回；之后的 stale 秒内返回旧值并在后台重新计算
+    （stale-while-revalidate）；再之后等待重新计算。同一个键同时只有一个计算在进行，
+    其余请求等待它的结果。计算出错时不缓存，错误传给所有等待的请求。
+    除 invalidate 外只能在同一个事件循环中调用。
+    """
+
+    HIT = "HIT"
+    STALE = "STALE"
+    MISS = "MISS"
+
+    def __init__(self, maxsize: int, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self._clock = clock
+        # 键 -> (写入时间, 新鲜期, 过期后可继续使用的时长, 值)
+        self._data: "OrderedDict[Hashable, Tuple[float, float, float, V]]" = OrderedDict()
+        self._inflight: Dict[Hashable, "asyncio.Task[V]"] = {}
+        # 每次失效加一，失效前开始的计算结果不再写入
+        self._generation = 0
+
+    async def _load(
+        self, key: Hashable, loader: Callable[[], Awaitable[V]], ttl: float, stale: float, generation: int
+    ) -> V:
+        try:
+            value = await loader()
+            if generation == self._generation:
+                self._data[key] = (self._clock(), ttl, stale, value)
+                self._data.move_to_end(key)
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+            return value
+        finally:
+            if self._inflight.get(key) is asyncio.current_task():
+                del self._inflight[key]
+
+    def _start(self, key: Hashable, loader: Callable[[], Awaitable[V]], ttl: float, stale: float) -> "asyncio.Task[V]":
+        task = self._inflight.get(key)
+        if task is None:
+            # 在创建任务时记下代数：任务开始执行前发生的失效同样要丢弃其结果
+            task = self._inflight[key] = asyncio.ensure_future(
+                self._load(key, loader, ttl, stale, self._generation)
+            )
+            # 后台刷新无人等待时也要取走异常，避免未处理异常的警告
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        return task
+
+    async def get(
+        self, key: Hashable, loader: Callable[[], Awaitable[V]], ttl: float, stale: float = 0
+    ) -> Tuple[V, float, str]:
+        """返回 (值, 已缓存秒数, HIT/STALE/MISS)"""
+        item = self._data.get(key)
+        if item is not None:
+            stored_at, item_ttl, item_stale, value = item
+            age = self._clock() - stored_at
+            if age < item_ttl:
+                self._data.move_to_end(key)
+                return value, age, self.HIT
+            if age < item_ttl + item_stale:
+                self._start(key, loader, ttl, stale)
+                return value, age, self.STALE
+            del self._data[key]
+        # shield：某个等待的请求被取消时不影响计算和其他请求
+        value = await asyncio.shield(self._start(key, loader, ttl, stale))
+        return value, 0.0, self.MISS
+
+    def invalidate(self, predicate: Callable[[Hashable], bool]) -> int:
+        """删除键满足条件的条目，进行中的计算结果不再写入，之后的请求重新计算；返回删除数量
+
+        可在任意线程调用（如同步接口的线程池中）。
+        """
+        self._generation += 1
+        for key in [key for key in list(self._inflight) if predicate(key)]:
+            self._inflight.pop(key, None)
+        keys = [key for key in list(self._data) if predicate(key)]
+        for key in keys:
+            self._data.pop(key, None)
+        return len(keys)
+
+    def clear(self):
+        self.invalidate(lambda key: True)
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -1,49 +1,140 @@
 """
 依赖注入
 """
-from typing import Generator, Optional
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
-from ..database import SessionLocal
+# 与接口使用同一个 get_db 依赖，同一请求内共用一个会话，
+# 当前用户对象才能在接口的会话中直接修改和刷新
+from ..database import get_db
+from ..config import settings
 from ..models.user import User
-from ..core.security import decode_access_token
+from ..core.cache import TTLCache
+from ..core.security import verify_token, ROLE_ADMIN
+from ..core.revocation import revocation_list, revoke_token_claims, revoke_user_version
 
 # HTTP Bearer 认证
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 
-def get_db() -> Generator:
-    """获取数据库会话"""
-    try:
-        db = SessionLocal()
-        yield db
-    finally:
-        db.close()
+@dataclass(frozen=True)
+class Principal:
+    """已认证的身份：令牌声明加用户的轻量快照
 
+    不包含余额等易变数据，需要余额的接口仍通过 get_current_user 从数据库读取。
+    """
+    id: int
+    username: str
+    is_active: bool
+    is_admin: bool
+    claims: Dict[str, Any] = field(default_factory=dict, compare=False)
 
-def get_current_user(
+
+# 按令牌签名缓存已认证的身份，命中时跳过 JWT 解码和用户查询。
+# 用户状态、管理员权限变更或被删除时需调用 invalidate_user_principals。
+principal_cache: TTLCache[Tuple[str, Principal]] = TTLCache(
+    settings.principal_cache_size, settings.principal_cache_ttl_seconds
+)
+
+
+def revoke_user_tokens(db: Session, user: User):
+    """吊销用户当前版本的全部访问令牌并递增令牌版本（随调用方的事务提交）
+
+    提交后需调用 invalidate_user_principals。
+    """
+    revoke_user_version(db, user.id, user.token_version or 0)
+    user.token_version = (user.token_version or 0) + 1
+
+
+def revoke_access_token(db: Session, token: str):
+    """吊销单个访问令牌（随调用方的事务提交），无效令牌忽略"""
+    claims = verify_token(token)
+    if claims:
+        revoke_token_claims(db, claims)
+        principal_cache.pop(token.rpartition(".")[2])
+
+
+def invalidate_user_principals(user_id: int) -> int:
+    """清除某个用户的全部缓存身份，返回清除数量"""
+    return principal_cache.pop_where(lambda item: item[1].id == user_id)
+
+
+def authenticate_token(token: str, db: Session) -> Optional[Principal]:
+    """验证令牌并返回身份，无效时返回 None"""
+    signing_input, _, signature = token.rpartition(".")
+    cached = principal_cache.get(signature)
+    # 签名相同但头部或载荷被篡改的令牌不能命中缓存
+    if cached is not None and cached[0] == signing_input:
+        # 其他进程吊销的令牌同步到布隆过滤器后，缓存的身份也随之失效
+        if revocation_list.is_revoked(db, cached[1].claims):
+            principal_cache.pop(signature)
+            return None
+        return cached[1]
+
+    claims = verify_token(token)
+    # 令牌需携带用户ID和令牌版本，不含这些声明的旧令牌需要重新登录
+    if not claims or claims.get("uid") is None or claims.get("ver") is None:
+        return None
+
+    # 禁用、权限变更和删除用户时吊销旧版本令牌，未吊销即为有效，不再按主键查询用户
+    if revocation_list.is_revoked(db, claims):
+        return None
+
+    principal = Principal(
+        id=claims["uid"],
+        username=claims.get("sub"),
+        is_active=True,
+        is_admin=claims.get("role") == ROLE_ADMIN,
+        claims=claims
+    )
+    # 缓存不会比令牌本身更晚过期
+    expires_in = claims["exp"] - time.time() if "exp" in claims else None
+    principal_cache.set(signature, (signing_input, principal), expires_in)
+    return principal
+
+
+def get_current_principal(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
-) -> User:
-    """获取当前用户"""
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="无法验证凭据",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+) -> Principal:
+    """获取当前身份（只需要用户ID、用户名和权限的接口使用）"""
+    principal = authenticate_token(credentials.credentials, db)
+    if principal is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="无法验证凭据",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return principal
+
+
+def get_current_active_principal(principal: Principal = Depends(get_current_principal)) -> Principal:
+    """获取当前活跃身份"""
+    if not principal.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="用户账户已被禁用"
+        )
+    return principal
 
-    try:
-        token = credentials.credentials
-        username = decode_access_token(token)
-        if username is None:
-            raise credentials_exception
-    except Exception:
-        raise credentials_exception
 
-    user = db.query(User).filter(User.username == username).first()
+def get_current_user(
+    principal: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_db)
+) -> User:
+    """获取当前用户（需要余额或修改用户数据的接口使用）"""
+    user = db.get(User, principal.id)
     if user is None:
-        raise credentials_exception
+        invalidate_user_principals(principal.id)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="无法验证凭据",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
 
     return user
 
@@ -58,31 +149,25 @@ def get_current_active_user(current_user: User = Depends(get_current_user)) -> U
     return current_user
 
 
-def get_current_admin_user(current_user: User = Depends(get_current_active_user)) -> User:
-    """获取当前管理员用户"""
-    if not current_user.is_admin:
+def get_current_admin_user(principal: Principal = Depends(get_current_active_principal)) -> Principal:
+    """获取当前管理员身份"""
+    if not principal.is_admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="权限不足，需要管理员权限"
         )
-    return current_user
+    return principal
 
 
 def get_optional_current_user(
-    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
     db: Session = Depends(get_db)
 ) -> Optional[User]:
     """获取可选的当前用户（用于可选认证的接口）"""
     if credentials is None:
         return None
     
-    try:
-        token = credentials.credentials
-        username = decode_access_token(token)
-        if username is None:
-            return None
-        
-        user = db.query(User).filter(User.username == username).first()
-        return user if user and user.is_active else None
-    except Exception:
+    principal = authenticate_token(credentials.credentials, db)
+    if principal is None or not principal.is_active:
         return None
+    return db.get(User, principal.id)
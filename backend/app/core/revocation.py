@@ -0,0 +1,171 @@
+"""
+访问令牌吊销列表
+
+吊销记录持久化在 token_revocations，每个进程在内存中维护对应的布隆过滤器。
+验证令牌时先查布隆过滤器，未吊销的令牌（绝大多数）不访问数据库；命中后再按
+精确键查表排除误判。启动时从表中重建，其他进程写入的吊销由后台任务按自增 id
+增量同步，同步间隔内其他进程吊销的令牌可能仍被本进程接受。
+"""
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from ..config import settings
+from ..database import SessionLocal
+from ..models.session import TokenRevocation
+from .bloom import BloomFilter
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 过期吊销记录的清理间隔（秒）
+PURGE_INTERVAL = 3600
+
+
+def jti_key(jti: str) -> str:
+    """单个令牌的吊销键"""
+    return f"jti:{jti}"
+
+
+def user_version_key(user_id: int, token_version: int) -> str:
+    """用户某个令牌版本的吊销键"""
+    return f"user:{user_id}:{token_version}"
+
+
+class RevocationList:
+    """布隆过滤器 + 数据库精确集合的吊销列表"""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        capacity: Optional[int] = None,
+        error_rate: Optional[float] = None
+    ):
+        self._session_factory = session_factory
+        self._capacity = capacity or settings.token_revocation_capacity
+        self._error_rate = error_rate or settings.token_revocation_error_rate
+        self._lock = threading.Lock()
+        self._bloom = BloomFilter(self._capacity, self._error_rate)
+        self._last_id = 0
+
+    @staticmethod
+    def _keys(claims: Dict[str, Any]) -> List[str]:
+        keys = []
+        if claims.get("jti"):
+            keys.append(jti_key(claims["jti"]))
+        if claims.get("uid") is not None and claims.get("ver") is not None:
+            keys.append(user_version_key(claims["uid"], claims["ver"]))
+        return keys
+
+    def is_revoked(self, db: Session, claims: Dict[str, Any]) -> bool:
+        """令牌是否已被吊销，只有布隆过滤器命中时才查询数据库"""
+        bloom = self._bloom
+        candidates = [key for key in self._keys(claims) if key in bloom]
+        if not candidates:
+            return False
+        return db.execute(
+            select(TokenRevocation.id).where(TokenRevocation.token_key.in_(candidates)).limit(1)
+        ).first() is not None
+
+    def revoke(self, db: Session, key: str, expires_at: datetime, user_id: Optional[int] = None):
+        """写入吊销记录（随调用方的事务提交），并立即加入本进程的布隆过滤器
+
+        事务回滚时过滤器中多出的键只会造成一次误判查询。
+        """
+        db.execute(
+            insert(TokenRevocation)
+            .values(token_key=key, user_id=user_id, expires_at=expires_at)
+            .on_conflict_do_nothing(index_elements=["token_key"])
+        )
+        with self._lock:
+            self._bloom.add(key)
+
+    def rebuild(self):
+        """从数据库重建布隆过滤器（启动时和清理过期记录后）"""
+        with self._session_factory() as db:
+            # 先取最大 id，之后写入的记录由增量同步补上
+            last_id = db.execute(select(func.max(TokenRevocation.id))).scalar() or 0
+            keys = db.execute(
+                select(TokenRevocation.token_key).where(
+                    TokenRevocation.id <= last_id,
+                    TokenRevocation.expires_at > datetime.utcnow()
+                )
+            ).scalars().all()
+
+        bloom = BloomFilter(max(self._capacity, len(keys) * 2), self._error_rate)
+        for key in keys:
+            bloom.add(key)
+        with self._lock:
+            self._bloom = bloom
+            self._last_id = last_id
+
+    def sync(self) -> int:
+        """增量加载其他进程写入的吊销记录，返回新增数量"""
+        with self._session_factory() as db:
+            rows = db.execute(
+                select(TokenRevocation.id, TokenRevocation.token_key)
+                .where(TokenRevocation.id > self._last_id)
+                .order_by(TokenRevocation.id)
+            ).all()
+        if not rows:
+            return 0
+
+        with self._lock:
+            for row in rows:
+                self._bloom.add(row.token_key)
+            self._last_id = rows[-1].id
+            oversized = self._bloom.count > self._bloom.capacity
+        # 超出容量后误判率上升，按实际条目数重建
+        if oversized:
+            self.rebuild()
+        return len(rows)
+
+    def purge(self) -> int:
+        """删除被吊销令牌都已过期的记录并重建过滤器，返回删除数量"""
+        with self._session_factory() as db:
+            deleted = db.execute(
+                delete(TokenRevocation).where(TokenRevocation.expires_at <= datetime.utcnow())
+            ).rowcount
+            db.commit()
+        self.rebuild()
+        return deleted
+
+
+revocation_list = RevocationList()
+
+
+def revoke_user_version(db: Session, user_id: int, token_version: int):
+    """吊销用户某个令牌版本的全部访问令牌（随调用方的事务提交）"""
+    expires_at = datetime.utcnow() + timedelta(minutes=settings.access_token_expire_minutes)
+    revocation_list.revoke(db, user_version_key(user_id, token_version), expires_at, user_id=user_id)
+
+
+def revoke_token_claims(db: Session, claims: Dict[str, Any]):
+    """吊销单个访问令牌（随调用方的事务提交）"""
+    if not claims.get("jti") or "exp" not in claims:
+        return
+    revocation_list.revoke(
+        db, jti_key(claims["jti"]), datetime.utcfromtimestamp(claims["exp"]), user_id=claims.get("uid")
+    )
+
+
+async def run_revocation_sync():
+    """后台任务：增量同步吊销记录，定期清理过期记录"""
+    interval = settings.token_revocation_sync_seconds
+    last_purge = time.monotonic()
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            if time.monotonic() - last_purge >= PURGE_INTERVAL:
+                last_purge = time.monotonic()
+                deleted = await run_in_threadpool(revocation_list.purge)
+                if deleted:
+                    logger.info(f"已清理 {deleted} 条过期的令牌吊销记录")
+            await run_in_threadpool(revocation_list.sync)
+        except Exception as e:
+            logger.error(f"令牌吊销列表同步失败: {e}")
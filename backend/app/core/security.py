@@ -1,14 +1,28 @@
 """
 安全认证相关功能
 """
+import secrets
 from datetime import datetime, timedelta
-from typing import Optional, Union
+from functools import lru_cache
+from typing import Optional, Tuple, Union
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from ..config import settings
 
+@lru_cache(maxsize=None)
+def bcrypt_context(rounds: int) -> CryptContext:
+    """指定 bcrypt 成本的加密上下文，成本不同的已有哈希视为需要更新"""
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__rounds=rounds,
+        bcrypt__min_rounds=rounds,
+        bcrypt__max_rounds=rounds,
+    )
+
+
 # 密码加密上下文
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = bcrypt_context(settings.bcrypt_rounds)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -21,6 +35,31 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def hash_password_with_rounds(password: str, rounds: int) -> str:
+    """按指定成本生成密码哈希（在密码进程池中执行）"""
+    return bcrypt_context(rounds).hash(password)
+
+
+def verify_and_rehash(plain_password: str, hashed_password: str, rounds: int) -> Tuple[bool, Optional[str]]:
+    """验证密码，哈希成本与 rounds 不一致时同时返回按新成本生成的哈希（在密码进程池中执行）"""
+    return bcrypt_context(rounds).verify_and_update(plain_password, hashed_password)
+
+
+# 令牌中的角色声明
+ROLE_ADMIN = "admin"
+ROLE_USER = "user"
+
+
+def user_token_claims(user) -> dict:
+    """用户访问令牌的声明：用户名、用户ID、角色和令牌版本"""
+    return {
+        "sub": user.username,
+        "uid": user.id,
+        "role": ROLE_ADMIN if user.is_admin else ROLE_USER,
+        "ver": user.token_version or 0,
+    }
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """创建访问令牌"""
     to_encode = data.copy()
@@ -29,7 +68,8 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.access_token_expire_minutes)
     
-    to_encode.update({"exp": expire})
+    # 令牌ID，用于单独吊销某个令牌
+    to_encode.update({"exp": expire, "jti": secrets.token_hex(8)})
     encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
     return encoded_jwt
 
@@ -0,0 +1,128 @@
+"""
+可按名次访问的跳表
+"""
+import random
+from typing import Any, Iterator, List, Optional
+
+
+class _Node:
+    __slots__ = ("key", "forward", "width")
+
+    def __init__(self, key: Any, level: int):
+        self.key = key
+        self.forward: List[Optional["_Node"]] = [None] * level
+        # width[i]：第 i 层从本节点跳到下一个节点越过的元素个数
+        self.width: List[int] = [1] * level
+
+
+class IndexableSkipList:
+    """有序集合，每层指针记录跨越的元素数（order-statistic）
+
+    插入、删除、查询名次（比某个键小的元素数）和按名次取值的期望复杂度均为 O(log n)。
+    键需要可比较且互不相同（如排行榜使用 (-分数, 用户ID)）。非线程安全，由调用方加锁。
+    """
+
+    MAX_LEVEL = 32
+    P = 0.25
+
+    def __init__(self):
+        self._head = _Node(None, self.MAX_LEVEL)
+        self._head.width = [0] * self.MAX_LEVEL
+        self._level = 1
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _random_level(self) -> int:
+        level = 1
+        while level < self.MAX_LEVEL and random.random() < self.P:
+            level += 1
+        return level
+
+    def insert(self, key: Any):
+        update: List[_Node] = [self._head] * self.MAX_LEVEL
+        # position[i]：update[i] 的名次（头节点为 0，第一个元素为 1）
+        position = [0] * self.MAX_LEVEL
+        node = self._head
+        for i in range(self._level - 1, -1, -1):
+            position[i] = position[i + 1] if i + 1 < self._level else 0
+            while node.forward[i] is not None and node.forward[i].key < key:
+                position[i] += node.width[i]
+                node = node.forward[i]
+            update[i] = node
+
+        level = self._random_level()
+        if level > self._level:
+            for i in range(self._level, level):
+                update[i] = self._head
+                position[i] = 0
+                self._head.width[i] = self._size
+            self._level = level
+
+        new_node = _Node(key, level)
+        for i in range(level):
+            new_node.forward[i] = update[i].forward[i]
+            update[i].forward[i] = new_node
+            # 前驱原来跨越的元素被新节点一分为二
+            new_node.width[i] = update[i].width[i] - (position[0] - position[i])
+            update[i].width[i] = position[0] - position[i] + 1
+        for i in range(level, self._level):
+            update[i].width[i] += 1
+        self._size += 1
+
+    def remove(self, key: Any) -> bool:
+        """删除键，不存在时返回 False"""
+        update: List[_Node] = [self._head] * self.MAX_LEVEL
+        node = self._head
+        for i in range(self._level - 1, -1, -1):
+            while node.forward[i] is not None and node.forward[i].key < key:
+                node = node.forward[i]
+            update[i] = node
+
+        target = node.forward[0]
+        if target is None or target.key != key:
+            return False
+
+        for i in range(self._level):
+            if update[i].forward[i] is target:
+                update[i].width[i] += target.width[i] - 1
+                update[i].forward[i] = target.forward[i]
+            else:
+                update[i].width[i] -= 1
+        while self._level > 1 and self._head.forward[self._level - 1] is None:
+            self._head.width[self._level - 1] = 0
+            self._level -= 1
+        self._size -= 1
+        return True
+
+    def count_less(self, key: Any) -> int:
+        """小于 key 的元素个数"""
+        count = 0
+        node = self._head
+        for i in range(self._level - 1, -1, -1):
+            while node.forward[i] is not None and node.forward[i].key < key:
+                count += node.width[i]
+                node = node.forward[i]
+        return count
+
+    def iter_from(self, index: int) -> Iterator[Any]:
+        """从第 index 个元素（从 0 开始）起按顺序遍历"""
+        if index >= self._size:
+            return
+        remaining = index + 1
+        node = self._head
+        for i in range(self._level - 1, -1, -1):
+            while node.forward[i] is not None and node.width[i] <= remaining:
+                remaining -= node.width[i]
+                node = node.forward[i]
+        while node is not None:
+            yield node.key
+            node = node.forward[0]
+
+    def __getitem__(self, index: int) -> Any:
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError(index)
+        return next(self.iter_from(index))
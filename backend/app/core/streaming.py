@@ -0,0 +1,124 @@
+"""
+流式统计
+
+逐个（或带权重）加入观测值，不保存原始数据：
+
+- RunningMoments：Welford 算法累计均值和方差，数值稳定
+- TDigest：合并式 t-digest，按分位数估算分布，两端（如 P99.9）误差最小
+"""
+import math
+from typing import List, Optional, Tuple
+
+
+class RunningMoments:
+    """均值和方差（Welford），支持带权重的观测值"""
+
+    __slots__ = ("count", "mean", "_m2")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def add(self, value: float, weight: int = 1):
+        """加入 weight 个相同的观测值"""
+        if weight <= 0:
+            return
+        self.count += weight
+        delta = value - self.mean
+        self.mean += delta * weight / self.count
+        self._m2 += weight * delta * (value - self.mean)
+
+    @property
+    def variance(self) -> float:
+        """样本方差"""
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+
+class TDigest:
+    """合并式 t-digest（k1 尺度函数）
+
+    新观测值先放入缓冲区，缓冲区满时与已有质心一起排序合并，加入的均摊复杂度为
+    O(1)。质心数量不超过约 compression 个，与观测值数量无关。
+    """
+
+    def __init__(self, compression: int = 100):
+        self.compression = compression
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self._means: List[float] = []
+        self._weights: List[float] = []
+        self._buffer: List[Tuple[float, float]] = []
+        self._buffer_limit = compression * 5
+
+    def add(self, value: float, weight: int = 1):
+        if weight <= 0:
+            return
+        self._buffer.append((value, weight))
+        self.count += weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if len(self._buffer) >= self._buffer_limit:
+            self._compress()
+
+    def _k(self, q: float) -> float:
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def _q_limit(self, q: float) -> float:
+        """从分位数 q 开始的质心最多覆盖到的分位数（k 值增加 1）"""
+        k = min(self._k(q) + 1, self.compression / 4)
+        return (math.sin(k * 2 * math.pi / self.compression) + 1) / 2
+
+    def _compress(self):
+        if not self._buffer:
+            return
+        items = sorted(list(zip(self._means, self._weights)) + self._buffer)
+        self._buffer = []
+        means: List[float] = []
+        weights: List[float] = []
+        cumulative = 0.0
+        mean, weight = items[0]
+        q_limit = self._q_limit(0)
+        for value, value_weight in items[1:]:
+            if (cumulative + weight + value_weight) / self.count <= q_limit:
+                weight += value_weight
+                mean += (value - mean) * value_weight / weight
+            else:
+                means.append(mean)
+                weights.append(weight)
+                cumulative += weight
+                q_limit = self._q_limit(cumulative / self.count)
+                mean, weight = value, value_weight
+        means.append(mean)
+        weights.append(weight)
+        self._means, self._weights = means, weights
+
+    def quantile(self, q: float) -> Optional[float]:
+        """分位数 q（0-1）的估计值，没有观测值时返回 None"""
+        self._compress()
+        if not self._means:
+            return None
+        if len(self._means) == 1:
+            return self._means[0]
+        target = min(max(q, 0.0), 1.0) * self.count
+
+        # 质心的观测值视为分布在质心两侧，按相邻质心中心之间线性插值
+        first, last = self._weights[0], self._weights[-1]
+        if target < first / 2:
+            return self.min + (self._means[0] - self.min) * target / (first / 2)
+        if target > self.count - last / 2:
+            return self._means[-1] + (self.max - self._means[-1]) * (target - self.count + last / 2) / (last / 2)
+        cumulative = 0.0
+        for i in range(len(self._means) - 1):
+            center = cumulative + self._weights[i] / 2
+            next_center = cumulative + self._weights[i] + self._weights[i + 1] / 2
+            if target <= next_center:
+                ratio = (target - center) / (next_center - center)
+                return self._means[i] + ratio * (self._means[i + 1] - self._means[i])
+            cumulative += self._weights[i]
+        return self._means[-1]
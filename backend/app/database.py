@@ -1,11 +1,14 @@
 """
 数据库连接和会话管理
 """
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from .config import settings
+from .core.sketches import register_sqlite_functions
 import os
+from urllib.parse import quote
 
 # 确保数据库目录存在
 os.makedirs("database", exist_ok=True)
@@ -13,11 +16,68 @@ os.makedirs("database", exist_ok=True)
 # 创建数据库引擎
 engine = create_engine(
     settings.database_url,
-    connect_args={"check_same_thread": False}  # SQLite 特定配置
+    connect_args={
+        "check_same_thread": False,  # SQLite 特定配置
+        "timeout": settings.database_busy_timeout
+    }
 )
 
+
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragma(dbapi_connection, connection_record):
+    """写库使用 WAL 模式，读写互不阻塞；注册草图函数（见 core.sketches）"""
+    if engine.dialect.name != "sqlite":
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.close()
+    register_sqlite_functions(dbapi_connection)
+
+
+def _create_read_engine():
+    """创建分析查询专用的只读引擎
+
+    SQLite 以只读 URI（mode=ro）打开并开启 query_only，使用独立的连接池，
+    统计查询不会占用写库连接。内存数据库无法共享，直接复用写库引擎。
+    """
+    url = make_url(settings.database_url)
+    pool_options = {
+        "pool_size": settings.read_pool_size,
+        "max_overflow": settings.read_max_overflow,
+        "pool_timeout": settings.read_pool_timeout,
+    }
+
+    if url.get_backend_name() != "sqlite":
+        return create_engine(url, **pool_options)
+
+    if not url.database or url.database == ":memory:":
+        return engine
+
+    path = quote(os.path.abspath(url.database))
+    read_engine = create_engine(
+        f"sqlite:///file:{path}?mode=ro&uri=true",
+        connect_args={
+            "check_same_thread": False,
+            "timeout": settings.read_busy_timeout
+        },
+        **pool_options
+    )
+
+    @event.listens_for(read_engine, "connect")
+    def _set_query_only(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA query_only = ON")
+        cursor.close()
+        register_sqlite_functions(dbapi_connection)
+
+    return read_engine
+
+
+read_engine = _create_read_engine()
+
 # 创建会话工厂
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 
 # 创建基础模型类
 Base = declarative_base()
@@ -32,6 +92,18 @@ def get_db():
         db.close()
 
 
+def get_read_db():
+    """获取只读数据库会话（统计、管理后台看板、历史记录等查询使用）
+
+    请求结束即关闭会话，不会长时间持有读事务而拖延 WAL 检查点。
+    """
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
 def create_tables():
     """创建所有数据库表"""
     Base.metadata.create_all(bind=engine)
@@ -0,0 +1,89 @@
+"""
+奖品抽样模块
+
+模板加载时把各奖品的概率预编译为累积权重表，抽奖只需一次二分查找。
+限量奖品售罄后，从剩余奖品按原有权重重新归一化抽取。
+"""
+import bisect
+import itertools
+import random
+from typing import Callable, Dict, FrozenSet, List, Optional, Protocol, Sequence
+
+
+class PrizeStock(Protocol):
+    """限量奖品库存（由调用方提供，见 services.inventory）"""
+
+    def sold_out(self, template_id: str) -> FrozenSet[str]:
+        """模板中已售罄的奖品名称"""
+
+    def take(self, template_id: str, name: str) -> bool:
+        """领取一件奖品，库存不足时返回 False（此后该奖品须计入 sold_out）"""
+
+
+class PrizeSampler:
+    """按权重抽样：累积权重表 + 二分查找"""
+
+    def __init__(self, weights: Sequence[float]):
+        self.weights = list(weights)
+        self._cumulative = list(itertools.accumulate(self.weights))
+        self.total = self._cumulative[-1] if self._cumulative else 0.0
+        # 末尾权重为 0 的项不可能被抽中，浮点舍入越界时落到最后一个有效项
+        self._last = max((i for i, weight in enumerate(self.weights) if weight > 0), default=-1)
+        self._excluding: Dict[FrozenSet[int], "PrizeSampler"] = {}
+
+    @classmethod
+    def from_probabilities(cls, probabilities: Sequence[float]) -> "PrizeSampler":
+        """按原先逐项累加概率的取法换算权重
+
+        累加超过 1 的部分永远抽不到，不足 1 的部分归最后一项。
+        """
+        weights = []
+        previous = 0.0
+        for cumulative in itertools.accumulate(probabilities):
+            cumulative = min(cumulative, 1.0)
+            weights.append(max(cumulative - previous, 0.0))
+            previous = max(previous, cumulative)
+        if weights:
+            weights[-1] += max(1.0 - previous, 0.0)
+        return cls(weights)
+
+    def sample(self, rand: Callable[[], float] = random.random) -> int:
+        """抽取一项，返回下标"""
+        if self.total <= 0:
+            raise ValueError("没有可抽取的奖品")
+        index = bisect.bisect_right(self._cumulative, rand() * self.total)
+        return min(index, self._last)
+
+    def excluding(self, indices: FrozenSet[int]) -> "PrizeSampler":
+        """排除部分项后的抽样器，其余项按原权重重新归一化（结果会缓存）"""
+        if not indices:
+            return self
+        sampler = self._excluding.get(indices)
+        if sampler is None:
+            sampler = PrizeSampler([
+                0.0 if i in indices else weight for i, weight in enumerate(self.weights)
+            ])
+            self._excluding[indices] = sampler
+        return sampler
+
+
+def draw(
+    sampler: PrizeSampler,
+    names: List[str],
+    template_id: str,
+    stock: Optional[PrizeStock] = None
+) -> int:
+    """抽取一项并扣减限量库存，返回下标
+
+    抽中的奖品刚好售罄时将其排除后重新抽取，每次失败都会多排除一项，循环有限。
+    """
+    while True:
+        excluded: FrozenSet[int] = frozenset()
+        if stock is not None:
+            sold_out = stock.sold_out(template_id)
+            if sold_out:
+                excluded = frozenset(i for i, name in enumerate(names) if name in sold_out)
+
+        index = sampler.excluding(excluded).sample()
+        if stock is None or stock.take(template_id, names[index]):
+            return index
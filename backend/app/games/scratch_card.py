@@ -7,6 +7,7 @@ from typing import Dict, List, Any, Optional, Tuple
 from enum import Enum
 from dataclasses import dataclass
 from ..config import settings
+from .sampler import PrizeSampler, PrizeStock, draw
 
 
 class ScratchCardType(Enum):
@@ -44,6 +45,11 @@ class ScratchCardGame:
     
     def __init__(self):
         self.templates = self._load_templates()
+        # 预编译各模板的奖品抽样器
+        self.samplers = {
+            template_id: PrizeSampler.from_probabilities([prize["probability"] for prize in template.prizes])
+            for template_id, template in self.templates.items()
+        }
     
     def _load_templates(self) -> Dict[str, ScratchCardTemplate]:
         """加载刮刮乐模板"""
@@ -139,8 +145,11 @@ class ScratchCardGame:
         
         return templates
     
-    def create_card(self, template_id: str, user_id: int) -> Dict[str, Any]:
-        """创建刮刮乐卡片"""
+    def create_card(self, template_id: str, user_id: int, stock: Optional[PrizeStock] = None) -> Dict[str, Any]:
+        """创建刮刮乐卡片
+
+        stock 为限量奖品库存，售罄的奖品不会再被抽中。
+        """
         if template_id not in self.templates:
             raise ValueError(f"未知的模板ID: {template_id}")
         
@@ -148,11 +157,11 @@ class ScratchCardGame:
         
         # 根据不同玩法生成卡片内容
         if template.card_type == ScratchCardType.DIRECT_PRIZE:
-            areas = self._generate_direct_prize_areas(template)
+            areas = self._generate_direct_prize_areas(template, stock)
         elif template.card_type == ScratchCardType.SYMBOL_MATCH:
-            areas = self._generate_symbol_match_areas(template)
+            areas = self._generate_symbol_match_areas(template, stock)
         elif template.card_type == ScratchCardType.LUCKY_SYMBOL:
-            areas = self._generate_lucky_symbol_areas(template)
+            areas = self._generate_lucky_symbol_areas(template, stock)
         else:
             raise ValueError(f"不支持的卡片类型: {template.card_type}")
         
@@ -183,12 +192,12 @@ class ScratchCardGame:
         
         return card_data
     
-    def _generate_direct_prize_areas(self, template: ScratchCardTemplate) -> List[ScratchArea]:
+    def _generate_direct_prize_areas(self, template: ScratchCardTemplate, stock: Optional[PrizeStock] = None) -> List[ScratchArea]:
         """生成直接奖金玩法的区域"""
         areas = []
         
         # 随机选择一个奖品
-        prize = self._select_prize_by_probability(template.prizes)
+        prize = self._select_prize(template, stock)
         
         # 随机选择一个区域放置奖品
         winner_area_id = random.randint(0, template.areas_count - 1)
@@ -212,13 +221,13 @@ class ScratchCardGame:
         
         return areas
     
-    def _generate_symbol_match_areas(self, template: ScratchCardTemplate) -> List[ScratchArea]:
+    def _generate_symbol_match_areas(self, template: ScratchCardTemplate, stock: Optional[PrizeStock] = None) -> List[ScratchArea]:
         """生成符号匹配玩法的区域"""
         areas = []
         symbols = template.rules["symbols"]
         
         # 随机决定是否中奖
-        prize = self._select_prize_by_probability(template.prizes)
+        prize = self._select_prize(template, stock)
         
         if prize["credits"] > 0 and prize["symbol"]:
             # 中奖情况：放置3个相同符号
@@ -256,14 +265,14 @@ class ScratchCardGame:
         
         return areas
     
-    def _generate_lucky_symbol_areas(self, template: ScratchCardTemplate) -> List[ScratchArea]:
+    def _generate_lucky_symbol_areas(self, template: ScratchCardTemplate, stock: Optional[PrizeStock] = None) -> List[ScratchArea]:
         """生成幸运符号玩法的区域"""
         areas = []
         lucky_symbol = template.rules["lucky_symbol"]
         normal_symbols = template.rules["normal_symbols"]
         
         # 随机决定是否中奖
-        prize = self._select_prize_by_probability(template.prizes)
+        prize = self._select_prize(template, stock)
         
         if prize["credits"] > 0:
             # 中奖情况：随机放置一个幸运符号
@@ -295,18 +304,11 @@ class ScratchCardGame:
         
         return areas
     
-    def _select_prize_by_probability(self, prizes: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _select_prize(self, template: ScratchCardTemplate, stock: Optional[PrizeStock] = None) -> Dict[str, Any]:
         """根据概率选择奖品"""
-        rand = random.random()
-        cumulative_prob = 0
-        
-        for prize in prizes:
-            cumulative_prob += prize["probability"]
-            if rand <= cumulative_prob:
-                return prize
-        
-        # 如果没有选中任何奖品，返回最后一个（通常是谢谢参与）
-        return prizes[-1]
+        names = [prize["name"] for prize in template.prizes]
+        index = draw(self.samplers[template.id], names, template.id, stock)
+        return template.prizes[index]
     
     def _ensure_no_three_match(self, areas: List[ScratchArea], symbols: List[str]):
         """确保没有3个相同符号（用于符号匹配玩法的不中奖情况）"""
@@ -400,6 +402,12 @@ class ScratchCardGame:
             for template in self.templates.values()
         ]
 
+    def expected_payout(self, template_id: str) -> float:
+        """每张卡的期望奖励（按抽样器的实际权重，不考虑限量奖品售罄）"""
+        prizes = self.templates[template_id].prizes
+        sampler = self.samplers[template_id]
+        return sum(prize["credits"] * weight for prize, weight in zip(prizes, sampler.weights)) / sampler.total
+
 
 # 全局游戏实例
 scratch_card_game = ScratchCardGame()
@@ -3,6 +3,8 @@
 """
 import random
 import json
+from functools import lru_cache
+from itertools import product
 from typing import Dict, List, Any, Optional, Tuple
 from enum import Enum
 from dataclasses import dataclass
@@ -458,6 +460,39 @@ class SlotMachineGame:
 
         return None
 
+    @lru_cache(maxsize=None)
+    def _expected_line_win(self, template_id: str, length: int) -> float:
+        """一条有 length 个符号的支付线的期望奖励，枚举所有符号组合按中奖规则计算"""
+        template = self.templates[template_id]
+        weights = [1.0 / symbol.rarity for symbol in template.symbols]
+        total_weight = sum(weights)
+        probabilities = {symbol.id: weight / total_weight for symbol, weight in zip(template.symbols, weights)}
+
+        expected = 0.0
+        for line_symbols in product(probabilities, repeat=length):
+            win_amount = self._check_line_win(template, list(line_symbols))["win_amount"]
+            if win_amount:
+                probability = 1.0
+                for symbol_id in line_symbols:
+                    probability *= probabilities[symbol_id]
+                expected += win_amount * probability
+        return expected
+
+    def expected_payout(self, template_id: str, bet_lines: Optional[int] = None) -> float:
+        """押注前 bet_lines 条支付线时每局的期望奖励（按符号稀有度）"""
+        template = self.templates[template_id]
+        if bet_lines is None or bet_lines > len(template.paylines):
+            bet_lines = len(template.paylines)
+        expected = 0.0
+        for payline in template.paylines[:bet_lines]:
+            # 与 _check_winning_lines 一致，超出转轮范围的位置不计入
+            length = sum(
+                1 for reel_idx, position_idx in payline.positions
+                if reel_idx < template.reels_count and position_idx < template.positions_per_reel
+            )
+            expected += self._expected_line_win(template_id, length)
+        return expected
+
 
 # 全局游戏实例
 slot_machine_game = SlotMachineGame()
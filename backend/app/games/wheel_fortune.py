@@ -7,6 +7,7 @@ from typing import Dict, List, Any, Optional, Tuple
 from enum import Enum
 from dataclasses import dataclass
 from ..config import settings
+from .sampler import PrizeSampler, PrizeStock, draw
 
 
 class WheelType(Enum):
@@ -48,9 +49,20 @@ class WheelTemplate:
 
 class WheelFortuneGame:
     """幸运大转盘游戏核心类"""
+
+    # 特殊效果的触发概率
+    DOUBLE_CHANCE_RATE = 0.1  # 特殊扇形双倍奖励
+    BANKRUPTCY_PROTECTION_RATE = 0.3  # 负积分扇形免除扣分
+    LUCKY_MULTIPLIER_RATE = 0.05  # 特殊扇形随机倍数
+    LUCKY_MULTIPLIERS = (2, 3, 5)
     
     def __init__(self):
         self.templates = self._load_templates()
+        # 预编译各模板的扇形抽样器
+        self.samplers = {
+            template_id: PrizeSampler.from_probabilities([segment.probability for segment in template.segments])
+            for template_id, template in self.templates.items()
+        }
     
     def _load_templates(self) -> Dict[str, WheelTemplate]:
         """加载转盘模板"""
@@ -178,15 +190,18 @@ class WheelFortuneGame:
         
         return templates
     
-    def spin(self, template_id: str, user_id: int) -> Dict[str, Any]:
-        """转动转盘"""
+    def spin(self, template_id: str, user_id: int, stock: Optional[PrizeStock] = None) -> Dict[str, Any]:
+        """转动转盘
+
+        stock 为限量奖品库存，售罄的扇形不会再被抽中。
+        """
         if template_id not in self.templates:
             raise ValueError(f"未知的模板ID: {template_id}")
         
         template = self.templates[template_id]
         
         # 根据概率选择中奖扇形
-        winning_segment = self._select_segment_by_probability(template.segments)
+        winning_segment = self._select_segment(template, stock)
         
         # 计算转盘停止角度
         stop_angle = self._calculate_stop_angle(winning_segment)
@@ -224,18 +239,11 @@ class WheelFortuneGame:
         
         return result
     
-    def _select_segment_by_probability(self, segments: List[WheelSegment]) -> WheelSegment:
+    def _select_segment(self, template: WheelTemplate, stock: Optional[PrizeStock] = None) -> WheelSegment:
         """根据概率选择扇形"""
-        rand = random.random()
-        cumulative_prob = 0
-        
-        for segment in segments:
-            cumulative_prob += segment.probability
-            if rand <= cumulative_prob:
-                return segment
-        
-        # 如果没有选中任何扇形，返回最后一个
-        return segments[-1]
+        names = [segment.name for segment in template.segments]
+        index = draw(self.samplers[template.id], names, template.id, stock)
+        return template.segments[index]
     
     def _calculate_stop_angle(self, segment: WheelSegment) -> float:
         """计算转盘停止角度"""
@@ -255,7 +263,7 @@ class WheelFortuneGame:
         
         # 双倍机会
         if template.special_features.get("double_chance") and segment.is_special:
-            if random.random() < 0.1:  # 10%概率触发双倍
+            if random.random() < self.DOUBLE_CHANCE_RATE:
                 effects["double_reward"] = True
         
         # 再来一次
@@ -264,13 +272,13 @@ class WheelFortuneGame:
         
         # 破产保护
         if template.special_features.get("bankruptcy_protection") and segment.credits < 0:
-            if random.random() < 0.3:  # 30%概率触发保护
+            if random.random() < self.BANKRUPTCY_PROTECTION_RATE:
                 effects["bankruptcy_protection"] = True
         
         # 幸运倍数
         if template.special_features.get("lucky_multiplier") and segment.is_special:
-            multiplier = random.choice([2, 3, 5])
-            if random.random() < 0.05:  # 5%概率触发倍数
+            multiplier = random.choice(self.LUCKY_MULTIPLIERS)
+            if random.random() < self.LUCKY_MULTIPLIER_RATE:
                 effects["lucky_multiplier"] = multiplier
         
         return effects
@@ -326,6 +334,30 @@ class WheelFortuneGame:
 
         return None
 
+    def expected_payout(self, template_id: str) -> float:
+        """每局实际派发的期望奖励（按抽样器的实际权重，含特殊效果，不考虑限量奖品售罄）
+
+        负积分扇形结算时不扣减余额（见 settle_play），按 0 计，破产保护因此不影响派奖。
+        """
+        template = self.templates[template_id]
+        sampler = self.samplers[template_id]
+        features = template.special_features
+        lucky_factor = 1 + self.LUCKY_MULTIPLIER_RATE * (
+            sum(self.LUCKY_MULTIPLIERS) / len(self.LUCKY_MULTIPLIERS) - 1
+        )
+
+        expected = 0.0
+        for segment, weight in zip(template.segments, sampler.weights):
+            if segment.credits <= 0:
+                continue
+            credits = float(segment.credits)
+            if segment.is_special and features.get("double_chance"):
+                credits *= 1 + self.DOUBLE_CHANCE_RATE
+            if segment.is_special and features.get("lucky_multiplier"):
+                credits *= lucky_factor
+            expected += credits * weight
+        return expected / sampler.total
+
     def calculate_expected_value(self, template_id: str) -> float:
         """计算期望值"""
         if template_id not in self.templates:
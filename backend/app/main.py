@@ -6,7 +6,8 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from .config import settings
 from .api import auth, users, games, stats, admin
-from .database import create_tables
+from .services.passwords import PasswordPoolBusy, password_pool
+import asyncio
 import logging
 
 # 配置日志
@@ -43,20 +44,70 @@ app.add_middleware(
 async def startup_event():
     """应用启动事件"""
     try:
-        # 创建数据库表
-        create_tables()
-        logger.info("数据库表创建成功")
-        
-        # 初始化数据库数据
+        # 迁移表结构并初始化数据库数据
         from .utils.init_db import init_database
         init_database()
         logger.info("数据库初始化完成")
         
+        # 启动后台任务
+        from .services.ledger import run_snapshot_scheduler
+        from .services.user_stats import run_stats_backfill
+        from .services.hourly_stats import run_hourly_stats_backfill
+        from .services.daily_stats import run_daily_stats_rollup
+        from .services.inventory import prize_inventory, run_inventory_sync
+        from .services.sessions import run_session_cleanup
+        from .core.revocation import revocation_list, run_revocation_sync
+        from .services.leaderboard import leaderboards, window_leaderboards, run_leaderboard_sync
+        from .services.big_wins import big_wins, run_big_win_sync
+        from .services.activity import activity_metrics, run_activity_sync
+        from .services.payout_monitor import payout_monitor, run_payout_monitor_sync
+        from .services.live import live_broadcaster
+        prize_inventory.refresh()
+        revocation_list.rebuild()
+        leaderboards.rebuild()
+        window_leaderboards.load()
+        big_wins.warm()
+        activity_metrics.load()
+        payout_monitor.load()
+        app.state.background_tasks = [
+            asyncio.create_task(run_snapshot_scheduler()),
+            asyncio.create_task(run_stats_backfill()),
+            asyncio.create_task(run_hourly_stats_backfill()),
+            asyncio.create_task(run_daily_stats_rollup()),
+            asyncio.create_task(run_inventory_sync()),
+            asyncio.create_task(run_session_cleanup()),
+            asyncio.create_task(run_revocation_sync()),
+            asyncio.create_task(run_leaderboard_sync()),
+            asyncio.create_task(run_big_win_sync()),
+            asyncio.create_task(run_activity_sync()),
+            asyncio.create_task(run_payout_monitor_sync()),
+            asyncio.create_task(live_broadcaster.run())
+        ]
+        if settings.archive_enabled:
+            from .utils.partitions import run_archive_scheduler
+            app.state.background_tasks.append(asyncio.create_task(run_archive_scheduler()))
+        
     except Exception as e:
         logger.error(f"应用启动失败: {e}")
         raise
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """应用关闭事件"""
+    for task in getattr(app.state, "background_tasks", []):
+        task.cancel()
+    
+    password_pool.close()
+    
+    # 结算已发出的限量奖品并归还未发出的租借
+    from .services.inventory import prize_inventory
+    try:
+        prize_inventory.close()
+    except Exception as e:
+        logger.error(f"奖品库存结算失败: {e}")
+
+
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
     """HTTP异常处理器"""
@@ -70,6 +121,20 @@ async def http_exception_handler(request, exc):
     )
 
 
+@app.exception_handler(PasswordPoolBusy)
+async def password_pool_busy_handler(request, exc):
+    """密码进程池排队已满"""
+    return JSONResponse(
+        status_code=503,
+        content={
+            "error": True,
+            "message": "服务繁忙，请稍后重试",
+            "status_code": 503
+        },
+        headers={"Retry-After": "1"}
+    )
+
+
 @app.exception_handler(Exception)
 async def general_exception_handler(request, exc):
     """通用异常处理器"""
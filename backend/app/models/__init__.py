@@ -3,6 +3,9 @@ from .user import User
 from .game import GameRecord, GameConfig
 from .prize import Prize, PrizeHistory
 from .admin import AdminLog, SystemStats
+from .credit import CreditLedger, CreditSnapshot, LedgerReason
+from .stats import UserGameStats, BackfillCheckpoint, GameStatsHourly
+from .session import UserSession, TokenRevocation
 
 __all__ = [
     "User",
@@ -11,5 +14,13 @@ __all__ = [
     "Prize",
     "PrizeHistory",
     "AdminLog",
-    "SystemStats"
+    "SystemStats",
+    "CreditLedger",
+    "CreditSnapshot",
+    "LedgerReason",
+    "UserGameStats",
+    "BackfillCheckpoint",
+    "GameStatsHourly",
+    "UserSession",
+    "TokenRevocation"
 ]
@@ -36,7 +36,10 @@ class AdminLog(Base):
 
 
 class SystemStats(Base):
-    """系统统计表"""
+    """系统统计表
+
+    每天一行，当天的数据随结算实时累加，日期结束后由后台任务按游戏记录重算并定稿。
+    """
     __tablename__ = "system_stats"
     
     id = Column(Integer, primary_key=True, index=True)
@@ -61,6 +64,9 @@ class SystemStats(Base):
     total_prizes_awarded = Column(Integer, default=0)  # 总发放奖品数
     total_winners = Column(Integer, default=0)  # 总中奖人数
     
+    # 是否已定稿：日期结束后按游戏记录重算，之后不再修改
+    is_final = Column(Boolean, nullable=False, default=False)
+    
     # 时间戳
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
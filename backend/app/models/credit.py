@@ -0,0 +1,69 @@
+"""
+金额流水模型
+"""
+from enum import Enum
+from sqlalchemy import Column, Integer, String, DateTime, BigInteger, ForeignKey, Index
+from sqlalchemy.sql import func
+from ..database import Base
+
+
+class LedgerReason(str, Enum):
+    """金额变动原因"""
+    OPENING_BALANCE = "opening_balance"  # 引入流水前的期初余额
+    REGISTER = "register"                # 注册赠送
+    GAME_COST = "game_cost"              # 游戏消耗
+    GAME_WIN = "game_win"                # 游戏奖励
+    JACKPOT = "jackpot"                  # 大奖奖励
+    ADMIN_ADJUST = "admin_adjust"        # 管理员调整
+
+
+class CreditLedger(Base):
+    """金额流水表（只追加，不修改、不删除）"""
+    __tablename__ = "credit_ledger"
+    __table_args__ = (
+        # 按用户顺序读取流水，以及快照之后的流水求和
+        Index("ix_credit_ledger_user_id_id", "user_id", "id"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    
+    # 变动信息
+    delta = Column(Integer, nullable=False)  # 变动金额，正数为增加，负数为减少
+    reason = Column(String(30), nullable=False)  # 变动原因，见 LedgerReason
+    
+    # 关联对象，如 game_record / admin_log
+    ref_type = Column(String(30), nullable=True)
+    ref_id = Column(Integer, nullable=True)
+    description = Column(String(255), nullable=True)
+    
+    # 时间戳
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    def __repr__(self):
+        return f"<CreditLedger(id={self.id}, user_id={self.user_id}, delta={self.delta}, reason='{self.reason}')>"
+
+
+class CreditSnapshot(Base):
+    """用户余额快照表
+
+    balance 为截至 ledger_id（含）为止该用户全部流水的累计余额，
+    还原某一时刻的余额只需读取一条快照和其后有限的流水。
+    """
+    __tablename__ = "credit_snapshots"
+    __table_args__ = (
+        Index("ix_credit_snapshots_user_ledger", "user_id", "ledger_id"),
+        Index("ix_credit_snapshots_user_ledger_at", "user_id", "ledger_created_at"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    balance = Column(BigInteger, nullable=False)  # 快照时的余额
+    ledger_id = Column(Integer, nullable=False)  # 快照包含的最后一条流水
+    ledger_created_at = Column(DateTime(timezone=True), nullable=False)  # 该流水的时间
+    
+    # 时间戳
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    def __repr__(self):
+        return f"<CreditSnapshot(user_id={self.user_id}, balance={self.balance}, ledger_id={self.ledger_id})>"
@@ -1,15 +1,33 @@
 """
 游戏记录模型
 """
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, JSON, Index, text, literal_column
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 from ..database import Base
+from .types import CompressedJSON
+
+# 大奖阈值（需与部分索引 ix_game_records_big_wins 的 WHERE 条件保持一致）
+BIG_WIN_CREDITS = 1000
 
 
 class GameRecord(Base):
     """游戏记录表"""
     __tablename__ = "game_records"
+    __table_args__ = (
+        # /history: WHERE user_id = ? ORDER BY created_at DESC
+        Index("ix_game_records_user_created", "user_id", "created_at"),
+        # 统计与管理后台的时间范围扫描
+        Index("ix_game_records_created_at", "created_at"),
+        # 按游戏/模板分组及过滤的统计
+        Index("ix_game_records_type_template_created", "game_type", "template_id", "created_at"),
+        # 大奖查询: WHERE prize_credits >= 1000 ORDER BY created_at DESC
+        Index(
+            "ix_game_records_big_wins",
+            "created_at",
+            sqlite_where=text(f"prize_credits >= {BIG_WIN_CREDITS}")
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -18,7 +36,8 @@ class GameRecord(Base):
     game_type = Column(String(50), nullable=False)  # scratch_card, slot_machine, lucky_wheel
     template_id = Column(String(50), nullable=False)  # 游戏模板ID
     game_cost = Column(Integer, nullable=False)  # 游戏消耗的积分
-    game_result = Column(JSON, nullable=False)  # 游戏结果详情（JSON格式）
+    # 游戏结果详情（压缩存储的JSON），体积较大，访问时才加载和解压
+    game_result = deferred(Column(CompressedJSON, nullable=False))
     
     # 奖励信息
     prize_name = Column(String(100), nullable=True)  # 奖品名称
@@ -35,6 +54,15 @@ class GameRecord(Base):
     # 关联关系
     user = relationship("User", backref="game_records")
     
+    @classmethod
+    def big_win_clause(cls):
+        """大奖过滤条件
+
+        阈值以字面量写入SQL，SQLite 只有在条件与部分索引完全一致时才会使用该索引，
+        绑定参数无法匹配。
+        """
+        return cls.prize_credits >= literal_column(str(BIG_WIN_CREDITS))
+
     def __repr__(self):
         return f"<GameRecord(id={self.id}, user_id={self.user_id}, game_type='{self.game_type}', is_winner={self.is_winner})>"
 
@@ -13,6 +13,8 @@ class Prize(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False)  # 奖品名称
     game_type = Column(String(50), nullable=False)  # 适用的游戏类型
+    # 绑定的游戏模板ID，与 game_type、name 一起对应游戏引擎中的奖品，为空则不限量
+    template_id = Column(String(50), nullable=True)
     
     # 奖品信息
     credits_value = Column(Integer, default=0)  # 奖品金额价值
@@ -22,6 +24,7 @@ class Prize(Base):
     is_active = Column(Boolean, default=True)  # 是否启用
     stock_quantity = Column(Integer, default=-1)  # 库存数量 (-1表示无限)
     used_quantity = Column(Integer, default=0)  # 已使用数量
+    reserved_quantity = Column(Integer, default=0)  # 各进程已租借、尚未发出的数量
     
     # 显示信息
     description = Column(Text, nullable=True)  # 奖品描述
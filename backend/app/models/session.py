@@ -0,0 +1,51 @@
+"""
+登录会话与令牌吊销模型
+"""
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+from ..database import Base
+
+
+class UserSession(Base):
+    """登录会话表（刷新令牌）
+
+    只保存刷新令牌的 SHA-256 摘要。每次刷新都吊销当前令牌并在同一会话族中签发新令牌，
+    已吊销的令牌再次出现说明可能被盗用，整个会话族随之吊销。
+    """
+    __tablename__ = "user_sessions"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    token_hash = Column(String(64), unique=True, nullable=False)  # 刷新令牌的 SHA-256 摘要
+    family_id = Column(String(32), nullable=False, index=True)  # 同一次登录轮换出的令牌属于同一族
+    token_version = Column(Integer, nullable=False, default=0)  # 签发时用户的令牌版本
+    
+    # 时间戳
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    revoked_at = Column(DateTime(timezone=True), nullable=True)  # 已轮换或登出
+    
+    __table_args__ = (
+        Index("ix_user_sessions_expires_at", "expires_at"),
+    )
+    
+    def __repr__(self):
+        return f"<UserSession(id={self.id}, user_id={self.user_id}, family_id='{self.family_id}')>"
+
+
+class TokenRevocation(Base):
+    """访问令牌吊销表
+
+    token_key 为 jti:<令牌ID>（单个令牌）或 user:<用户ID>:<令牌版本>（用户某个版本的全部令牌）。
+    各进程启动时把未过期的条目载入布隆过滤器，之后按自增 id 增量同步。
+    """
+    __tablename__ = "token_revocations"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    token_key = Column(String(64), unique=True, nullable=False)
+    user_id = Column(Integer, nullable=True, index=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)  # 被吊销的令牌都已过期的时间
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    def __repr__(self):
+        return f"<TokenRevocation(id={self.id}, token_key='{self.token_key}')>"
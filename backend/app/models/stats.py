@@ -0,0 +1,76 @@
+"""
+统计汇总模型
+"""
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, BigInteger, ForeignKey, LargeBinary
+from sqlalchemy.sql import func
+from ..database import Base
+
+
+class UserGameStats(Base):
+    """用户分游戏类型统计汇总表
+
+    随每局结算在同一事务内累加，引入前的历史记录由回填任务补齐。
+    """
+    __tablename__ = "user_game_stats"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    game_type = Column(String(50), primary_key=True)
+    
+    # 累计数据
+    game_count = Column(Integer, nullable=False, default=0)  # 游戏次数
+    total_bet = Column(BigInteger, nullable=False, default=0)  # 总消耗
+    total_win = Column(BigInteger, nullable=False, default=0)  # 总奖励
+    winning_games = Column(Integer, nullable=False, default=0)  # 中奖次数（is_winner）
+    profitable_games = Column(Integer, nullable=False, default=0)  # 盈利次数（奖励大于消耗）
+    
+    # 时间戳
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    def __repr__(self):
+        return f"<UserGameStats(user_id={self.user_id}, game_type='{self.game_type}', game_count={self.game_count})>"
+
+
+class BackfillCheckpoint(Base):
+    """回填任务进度表
+
+    每个任务/分区一行，记录已处理到的最大记录 id，中断后从这里继续。
+    target_id 为回填的截止 id，之后的数据由结算实时维护。
+    """
+    __tablename__ = "backfill_checkpoints"
+    
+    name = Column(String(100), primary_key=True)  # 任务名:分区名
+    high_water_mark = Column(Integer, nullable=False, default=0)  # 已处理的最大 id
+    target_id = Column(Integer, nullable=False, default=0)  # 截止 id（含）
+    is_complete = Column(Boolean, nullable=False, default=False)
+    
+    # 时间戳
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    def __repr__(self):
+        return f"<BackfillCheckpoint(name='{self.name}', high_water_mark={self.high_water_mark}, target_id={self.target_id})>"
+
+
+class GameStatsHourly(Base):
+    """按小时、游戏类型和模板预聚合的游戏统计
+
+    每个单元格随每局结算在同一事务内累加，引入前的历史记录由回填任务补齐。
+    去重玩家数保存为可合并的 HyperLogLog 草图（见 core.sketches）。
+    """
+    __tablename__ = "game_stats_hourly"
+    
+    hour_bucket = Column(String(13), primary_key=True)  # UTC 小时，YYYY-MM-DD HH
+    game_type = Column(String(50), primary_key=True)
+    template_id = Column(String(50), primary_key=True)
+    
+    # 累计数据
+    plays = Column(Integer, nullable=False, default=0)  # 对局数
+    revenue = Column(BigInteger, nullable=False, default=0)  # 消耗积分
+    payout = Column(BigInteger, nullable=False, default=0)  # 奖励积分
+    winners = Column(Integer, nullable=False, default=0)  # 中奖次数
+    players = Column(LargeBinary, nullable=True)  # 玩家草图
+    
+    # 时间戳
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    def __repr__(self):
+        return f"<GameStatsHourly(hour_bucket='{self.hour_bucket}', game_type='{self.game_type}', template_id='{self.template_id}', plays={self.plays})>"
@@ -0,0 +1,28 @@
+"""
+自定义字段类型
+"""
+from sqlalchemy import LargeBinary
+from sqlalchemy.types import TypeDecorator
+from ..utils import compression
+
+
+class CompressedJSON(TypeDecorator):
+    """压缩存储的 JSON 字段
+
+    写入时序列化并压缩，读取时解压；未压缩的旧数据按 JSON 文本解析。
+    编码格式见 app.utils.compression。
+    """
+    impl = LargeBinary
+    cache_ok = True
+
+    def bind_processor(self, dialect):
+        # 不经过 LargeBinary 的处理，"none" 模式下写入的是 JSON 文本
+        def process(value):
+            if value is None:
+                return None
+            return compression.get_default_codec().encode(value)
+        return process
+
+    def result_processor(self, dialect, coltype):
+        # 旧数据是 TEXT，不能交给 LargeBinary 转成 bytes
+        return compression.decode
@@ -19,6 +19,8 @@ class User(Base):
     # 用户状态
     is_active = Column(Boolean, default=True)
     is_admin = Column(Boolean, default=False)
+    # 令牌版本：写入访问令牌，状态或权限变更时递增，已签发的令牌随之失效
+    token_version = Column(Integer, nullable=False, default=0)
     
     # 游戏相关
     credits = Column(Integer, default=1000)  # 用户金额
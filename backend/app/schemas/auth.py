@@ -53,9 +53,16 @@ class Token(BaseModel):
     access_token: str
     token_type: str = "bearer"
     expires_in: int
+    refresh_token: Optional[str] = None
+    refresh_expires_in: Optional[int] = None
     user: UserResponse
 
 
+class RefreshTokenRequest(BaseModel):
+    """刷新令牌请求模式"""
+    refresh_token: str = Field(..., description="刷新令牌")
+
+
 class TokenData(BaseModel):
     """令牌数据模式"""
     username: Optional[str] = None
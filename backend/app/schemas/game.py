@@ -4,6 +4,7 @@
 from pydantic import BaseModel, Field
 from typing import Dict, List, Any, Optional
 from datetime import datetime
+from enum import Enum
 
 
 class GameTemplateResponse(BaseModel):
@@ -70,7 +71,7 @@ class GameHistoryResponse(BaseModel):
     win_amount: int
     net_win: int
     created_at: datetime
-    result_data: Dict[str, Any]
+    result_data: Optional[Dict[str, Any]] = None  # 只有显式请求详情时才返回
 
     class Config:
         from_attributes = True
@@ -105,9 +106,17 @@ class LeaderboardEntry(BaseModel):
     game_count: int
 
 
+class LeaderboardWindow(str, Enum):
+    """时间窗口排行榜的统计范围（UTC）"""
+    TODAY = "today"  # 今天
+    WEEK = "week"  # 本周（周一起）
+    LAST_24H = "24h"  # 最近24小时（按整小时滚动）
+
+
 class LeaderboardResponse(BaseModel):
     """排行榜响应"""
-    leaderboard_type: str  # "credits", "total_win", "win_rate"
+    leaderboard_type: str  # "credits", "total_win", "win_rate", "net_win", "biggest_win"
+    window: Optional[LeaderboardWindow] = None  # 时间窗口排行榜的统计范围
     entries: List[LeaderboardEntry]
     user_rank: Optional[int] = None
     user_value: Optional[int] = None
@@ -146,11 +155,18 @@ class GamePrizesResponse(BaseModel):
 
 # 游戏分析模式
 class GameAnalysisRequest(BaseModel):
-    """游戏分析请求"""
+    """游戏分析请求，未指定的条件不限"""
     game_type: Optional[str] = None
     template_id: Optional[str] = None
-    start_date: Optional[datetime] = None
-    end_date: Optional[datetime] = None
+    game_types: Optional[List[str]] = Field(None, description="游戏类型，任一匹配即可")
+    template_ids: Optional[List[str]] = Field(None, description="模板ID，任一匹配即可")
+    user_ids: Optional[List[int]] = Field(None, description="用户ID（仅管理员可用）")
+    start_date: Optional[datetime] = Field(None, description="开始时间，默认结束时间前7天")
+    end_date: Optional[datetime] = Field(None, description="结束时间，默认当前时间")
+    min_cost: Optional[int] = Field(None, ge=0, description="最低单局消耗")
+    max_cost: Optional[int] = Field(None, ge=0, description="最高单局消耗")
+    is_winner: Optional[bool] = Field(None, description="只统计中奖或未中奖的对局")
+    top_games: int = Field(5, ge=1, le=50, description="热门游戏返回数量")
 
 
 class GameAnalysisResponse(BaseModel):
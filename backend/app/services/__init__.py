@@ -0,0 +1,4 @@
+# 业务服务包
+
+# 导入时注册结算钩子
+from . import user_stats, daily_stats, hourly_stats, leaderboard, big_wins, activity, payout_monitor, live  # noqa: F401
@@ -0,0 +1,253 @@
+"""
+实时活跃度指标
+
+按秒、分钟、小时三级环形缓冲累计对局数、收入和派奖，分钟和小时槽位另带玩家草图
+（HyperLogLog），最近 1 分钟 / 10 分钟 / 1 小时 / 24 小时的对局数和去重玩家数直接由
+内存中的槽位求和、合并得到，不再扫描游戏记录。槽位数量固定，内存占用与流量无关。
+
+- 1 小时以内的计数精确到秒：起点所在的不完整分钟读秒级槽位，其余读分钟槽位
+- 去重玩家按分钟对齐，24 小时窗口按小时对齐（包含起点所在的整分钟 / 整小时）
+
+本进程的结算由提交后钩子计入，启动时从游戏记录加载，其他进程的对局由后台任务按
+记录 id 增量同步，规则与时间窗口排行榜相同。时间均为 UTC。
+"""
+import asyncio
+import calendar
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Set
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from ..config import settings
+from ..core.sketches import HyperLogLog
+from ..database import SessionLocal
+from ..models.game import GameRecord
+from ..utils.partitions import iter_game_records_sources
+from .settlement import PlaySettlement, register_post_commit_hook
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 窗口名 -> 时长（秒）
+WINDOWS = {"1m": 60, "10m": 600, "1h": 3600, "24h": 86400}
+
+SECOND_SLOTS = 3600
+# 未对齐的 1 小时 / 24 小时窗口会跨越 61 个分钟槽位 / 25 个小时槽位
+MINUTE_SLOTS = 61
+HOUR_SLOTS = 25
+
+
+def _epoch(moment: datetime) -> int:
+    """UTC 时间（不带时区）对应的秒数"""
+    return calendar.timegm(moment.timetuple())
+
+
+class _Slot:
+    __slots__ = ("index", "plays", "revenue", "payout", "players")
+
+    def __init__(self, index: int, sketch: bool):
+        self.index = index
+        self.plays = 0
+        self.revenue = 0
+        self.payout = 0
+        self.players = HyperLogLog() if sketch else None
+
+
+class _Ring:
+    """固定长度的环形缓冲，槽位序号不连续时覆盖旧槽位"""
+
+    def __init__(self, size: int, sketch: bool):
+        self.size = size
+        self.sketch = sketch
+        self._slots: List[Optional[_Slot]] = [None] * size
+
+    def slot(self, index: int) -> Optional[_Slot]:
+        """写入用的槽位，序号已被更新的槽位覆盖时返回 None（数据过旧）"""
+        slot = self._slots[index % self.size]
+        if slot is None or slot.index < index:
+            slot = self._slots[index % self.size] = _Slot(index, self.sketch)
+        elif slot.index > index:
+            return None
+        return slot
+
+    def get(self, index: int) -> Optional[_Slot]:
+        slot = self._slots[index % self.size]
+        return slot if slot is not None and slot.index == index else None
+
+    def add(self, index: int, plays: int, revenue: int, payout: int, player: Optional[int] = None,
+            players: Optional[HyperLogLog] = None):
+        slot = self.slot(index)
+        if slot is None:
+            return
+        slot.plays += plays
+        slot.revenue += revenue
+        slot.payout += payout
+        if slot.players is not None:
+            if player is not None:
+                slot.players.add(player)
+            if players is not None:
+                slot.players.merge(players)
+
+
+@dataclass
+class ActivityTotals:
+    """时间窗口内的累计值"""
+    plays: int = 0
+    revenue: int = 0
+    payout: int = 0
+    players: Optional[int] = None
+
+    def add(self, slot: Optional[_Slot]):
+        if slot is not None:
+            self.plays += slot.plays
+            self.revenue += slot.revenue
+            self.payout += slot.payout
+
+
+class ActivityMetrics:
+    """最近一段时间的对局数、收支和去重玩家数"""
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal):
+        self._session_factory = session_factory
+        self._lock = threading.Lock()
+        self._reset()
+        self._cursor = 0
+        # 本进程已计入、尚未被同步游标越过的记录 id
+        self._local_ids: Set[int] = set()
+
+    def _reset(self):
+        self._seconds = _Ring(SECOND_SLOTS, sketch=False)
+        self._minutes = _Ring(MINUTE_SLOTS, sketch=True)
+        self._hours = _Ring(HOUR_SLOTS, sketch=True)
+
+    def _add(self, second: int, user_id: int, cost: int, prize: int):
+        self._seconds.add(second, 1, cost, prize)
+        self._minutes.add(second // 60, 1, cost, prize, player=user_id)
+        self._hours.add(second // 3600, 1, cost, prize, player=user_id)
+
+    def load(self):
+        """从游戏记录加载最近 24 小时（启动时）
+
+        最近一小时逐条计入秒级和分钟槽位，更早的部分按小时聚合后只计入小时槽位。
+        """
+        now = datetime.utcnow().replace(microsecond=0)
+        start = now.replace(minute=0, second=0) - timedelta(hours=HOUR_SLOTS - 1)
+        recent = now.replace(second=0) - timedelta(minutes=MINUTE_SLOTS - 1)
+        with self._session_factory() as db:
+            cursor = db.execute(select(func.max(GameRecord.id))).scalar() or 0
+            hours, rows = [], []
+            for source in iter_game_records_sources(db, start, now):
+                bucket = func.strftime("%Y-%m-%d %H", source.created_at).label("bucket")
+                prize = func.coalesce(source.prize_credits, 0)
+                hours += db.query(
+                    bucket,
+                    func.count().label("plays"),
+                    func.sum(source.game_cost).label("revenue"),
+                    func.sum(prize).label("payout"),
+                    func.hll_union_agg(func.hll_of(source.user_id)).label("players")
+                ).filter(
+                    source.created_at >= start, source.created_at < recent, source.id <= cursor
+                ).group_by(bucket).all()
+                rows += db.query(
+                    source.user_id, source.created_at, source.game_cost, prize.label("prize")
+                ).filter(
+                    source.created_at >= recent, source.id <= cursor
+                ).all()
+
+        with self._lock:
+            self._reset()
+            for row in hours:
+                hour = _epoch(datetime.strptime(row.bucket, "%Y-%m-%d %H")) // 3600
+                self._hours.add(hour, row.plays, row.revenue or 0, row.payout or 0,
+                                players=HyperLogLog.from_bytes(row.players))
+            for row in rows:
+                self._add(_epoch(row.created_at), row.user_id, row.game_cost, row.prize)
+            self._cursor = cursor
+            self._local_ids = {record_id for record_id in self._local_ids if record_id > cursor}
+
+    def sync(self) -> int:
+        """增量计入其他进程的对局，返回新计入的数量"""
+        with self._session_factory() as db:
+            rows = db.execute(
+                select(
+                    GameRecord.id, GameRecord.user_id, GameRecord.created_at,
+                    GameRecord.game_cost, GameRecord.prize_credits
+                ).where(GameRecord.id > self._cursor).order_by(GameRecord.id)
+            ).all()
+        if not rows:
+            return 0
+
+        added = 0
+        with self._lock:
+            for row in rows:
+                if row.id in self._local_ids:
+                    self._local_ids.discard(row.id)
+                    continue
+                self._add(_epoch(row.created_at), row.user_id, row.game_cost, row.prize_credits or 0)
+                added += 1
+            self._cursor = max(self._cursor, rows[-1].id)
+            self._local_ids = {record_id for record_id in self._local_ids if record_id > self._cursor}
+        return added
+
+    def record_play(self, settlement: PlaySettlement):
+        """计入本进程的一局结算"""
+        with self._lock:
+            if settlement.record_id <= self._cursor or settlement.record_id in self._local_ids:
+                return
+            self._local_ids.add(settlement.record_id)
+            self._add(int(time.time()), settlement.user_id, settlement.cost, settlement.prize_credits or 0)
+
+    def totals(self, window: str, players: bool = True) -> ActivityTotals:
+        """窗口（WINDOWS 中的名称）内的累计值，players 为 False 时不估算去重玩家数"""
+        now = int(time.time())
+        start = now - WINDOWS[window] + 1
+        totals = ActivityTotals()
+        with self._lock:
+            if WINDOWS[window] > SECOND_SLOTS:
+                sketches = self._hours
+                indexes = range(start // 3600, now // 3600 + 1)
+                for hour in indexes:
+                    totals.add(self._hours.get(hour))
+            else:
+                sketches = self._minutes
+                indexes = range(start // 60, now // 60 + 1)
+                first_full = -(-start // 60)
+                for second in range(start, min(first_full * 60, now + 1)):
+                    totals.add(self._seconds.get(second))
+                for minute in range(first_full, now // 60 + 1):
+                    totals.add(self._minutes.get(minute))
+            if players:
+                merged = HyperLogLog()
+                for index in indexes:
+                    slot = sketches.get(index)
+                    if slot is not None:
+                        merged.merge(slot.players)
+                totals.players = merged.count()
+        return totals
+
+    def snapshot(self) -> Dict[str, ActivityTotals]:
+        """所有窗口的累计值"""
+        return {window: self.totals(window) for window in WINDOWS}
+
+
+activity_metrics = ActivityMetrics()
+
+
+@register_post_commit_hook
+def record_activity(settlement: PlaySettlement):
+    """提交后钩子：计入实时活跃度"""
+    activity_metrics.record_play(settlement)
+
+
+async def run_activity_sync():
+    """后台任务：增量同步其他进程的对局"""
+    interval = settings.activity_sync_seconds
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_threadpool(activity_metrics.sync)
+        except Exception as e:
+            logger.error(f"实时活跃度同步失败: {e}")
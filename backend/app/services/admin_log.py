@@ -0,0 +1,33 @@
+"""
+管理员操作日志
+"""
+from typing import Any, Dict, Optional
+from sqlalchemy.orm import Session
+from ..models.admin import AdminLog
+from ..core.deps import Principal
+
+
+def record_admin_action(
+    db: Session,
+    admin: Principal,
+    action_type: str,
+    description: str,
+    target_type: Optional[str] = None,
+    target_id: Optional[int] = None,
+    old_data: Optional[Dict[str, Any]] = None,
+    new_data: Optional[Dict[str, Any]] = None
+) -> AdminLog:
+    """记录一条管理员操作日志（随调用方的事务提交）"""
+    admin_log = AdminLog(
+        admin_user_id=admin.id,
+        admin_username=admin.username,
+        action_type=action_type,
+        action_description=description,
+        target_type=target_type,
+        target_id=target_id,
+        old_data=old_data,
+        new_data=new_data
+    )
+    db.add(admin_log)
+    db.flush()
+    return admin_log
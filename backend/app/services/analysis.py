@@ -0,0 +1,169 @@
+"""
+游戏分析服务
+
+汇总、热门游戏和时间分布都在 SQL 中用 GROUP BY 聚合，按日期和小时分桶（strftime），
+结果行数只与时间范围内的天数有关，与记录数无关；逐行合并分桶结果时按批流式读取。
+涉及的归档月份较多时按批分区分别聚合后合并（见 iter_game_records_sources）。
+只限定时间范围、游戏类型和模板时，由按小时预聚合的单元格求和（见 hourly_stats），
+玩家数由草图合并估算。
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+from sqlalchemy import Integer, cast, func
+from sqlalchemy.orm import Query, Session
+from ..utils.partitions import iter_game_records_sources
+from .hourly_stats import summarize_hours
+
+# 合并分桶结果时每批读取的行数
+STREAM_BATCH_SIZE = 1000
+
+
+@dataclass
+class AnalysisFilter:
+    """分析范围，列表条件为空表示不限"""
+    start: datetime
+    end: datetime
+    user_ids: Optional[List[int]] = None
+    game_types: Optional[List[str]] = None
+    template_ids: Optional[List[str]] = None
+    min_cost: Optional[int] = None
+    max_cost: Optional[int] = None
+    is_winner: Optional[bool] = None
+    top_games: int = 5
+
+    @property
+    def summarizable(self) -> bool:
+        """只限定了时间范围、游戏类型和模板，可以由小时汇总回答"""
+        return not (
+            self.user_ids or self.min_cost is not None or self.max_cost is not None or self.is_winner is not None
+        )
+
+
+def _filtered(query: Query, source, filters: AnalysisFilter) -> Query:
+    query = query.filter(source.created_at >= filters.start, source.created_at <= filters.end)
+    if filters.user_ids:
+        query = query.filter(source.user_id.in_(filters.user_ids))
+    if filters.game_types:
+        query = query.filter(source.game_type.in_(filters.game_types))
+    if filters.template_ids:
+        query = query.filter(source.template_id.in_(filters.template_ids))
+    if filters.min_cost is not None:
+        query = query.filter(source.game_cost >= filters.min_cost)
+    if filters.max_cost is not None:
+        query = query.filter(source.game_cost <= filters.max_cost)
+    if filters.is_winner is not None:
+        query = query.filter(source.is_winner == filters.is_winner)
+    return query
+
+
+def _result(
+    total_players: int,
+    total_games: int,
+    total_revenue: int,
+    total_payout: int,
+    popular_games: List[Dict[str, Any]],
+    hourly_distribution: Dict[str, int],
+    daily_distribution: Dict[str, int]
+) -> Dict[str, Any]:
+    profit_margin = ((total_revenue - total_payout) / total_revenue * 100) if total_revenue > 0 else 0
+    return {
+        "total_players": total_players,
+        "total_games": total_games,
+        "total_revenue": total_revenue,
+        "total_payout": total_payout,
+        "profit_margin": profit_margin,
+        "popular_games": popular_games,
+        "hourly_distribution": hourly_distribution,
+        "daily_distribution": daily_distribution
+    }
+
+
+def analyze_games(db: Session, filters: AnalysisFilter) -> Dict[str, Any]:
+    """统计范围内的对局数、玩家数、收支、热门游戏及按小时、按日期的分布"""
+    if filters.summarizable:
+        summary = summarize_hours(db, filters.start, filters.end, filters.game_types, filters.template_ids)
+        if summary is not None:
+            if not summary.games:
+                return _result(0, 0, 0, 0, [], {}, {})
+            return _result(
+                summary.players.count(),
+                summary.games,
+                summary.revenue,
+                summary.payout,
+                [
+                    {"game": f"{game_type}:{template_id}", "play_count": plays, "revenue": revenue}
+                    for game_type, template_id, plays, revenue in summary.top_templates(filters.top_games)
+                ],
+                summary.hourly,
+                summary.daily
+            )
+
+    # 只读取时间范围涉及的分区（热表及相关月份的归档库），分区较多时分批聚合后合并
+    total_games = total_revenue = total_payout = 0
+    hourly_distribution: Dict[str, int] = {}
+    daily_distribution: Dict[str, int] = {}
+    players: Set[int] = set()
+    templates: Dict[Tuple[str, str], List[int]] = {}
+    for source in iter_game_records_sources(db, filters.start, filters.end):
+        payout = func.coalesce(source.prize_credits, 0)
+
+        # 按 (日期, 小时) 分桶，一次扫描得到总数、收支和两种分布
+        day = func.strftime("%Y-%m-%d", source.created_at).label("day")
+        hour = cast(func.strftime("%H", source.created_at), Integer).label("hour")
+        buckets = _filtered(
+            db.query(
+                day,
+                hour,
+                func.count().label("games"),
+                func.sum(source.game_cost).label("revenue"),
+                func.sum(payout).label("payout")
+            ),
+            source, filters
+        ).group_by(day, hour)
+
+        source_games = 0
+        for bucket in buckets.yield_per(STREAM_BATCH_SIZE):
+            source_games += bucket.games
+            total_revenue += bucket.revenue or 0
+            total_payout += bucket.payout or 0
+            hourly_distribution[str(bucket.hour)] = hourly_distribution.get(str(bucket.hour), 0) + bucket.games
+            daily_distribution[bucket.day] = daily_distribution.get(bucket.day, 0) + bucket.games
+        if not source_games:
+            continue
+        total_games += source_games
+
+        # 同一玩家可能出现在多批分区中，按用户ID去重后计数
+        user_ids = _filtered(db.query(source.user_id), source, filters).distinct()
+        players.update(row.user_id for row in user_ids.yield_per(STREAM_BATCH_SIZE))
+
+        rows = _filtered(
+            db.query(
+                source.game_type, source.template_id,
+                func.count().label("play_count"), func.sum(source.game_cost).label("revenue")
+            ),
+            source, filters
+        ).group_by(source.game_type, source.template_id)
+        for row in rows:
+            counts = templates.setdefault((row.game_type, row.template_id), [0, 0])
+            counts[0] += row.play_count
+            counts[1] += row.revenue or 0
+
+    if not total_games:
+        return _result(0, 0, 0, 0, [], {}, {})
+
+    total_players = len(players)
+    popular_games = sorted(templates.items(), key=lambda item: item[1][0], reverse=True)[:filters.top_games]
+
+    return _result(
+        total_players,
+        total_games,
+        total_revenue,
+        total_payout,
+        [
+            {"game": f"{game_type}:{template_id}", "play_count": plays, "revenue": revenue}
+            for (game_type, template_id), (plays, revenue) in popular_games
+        ],
+        hourly_distribution,
+        daily_distribution
+    )
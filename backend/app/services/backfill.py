@@ -0,0 +1,99 @@
+"""
+历史记录回填
+
+汇总表引入之前的历史记录由回填任务补齐：迁移时在 backfill_checkpoints 中记下任务
+和当时的最大记录 id（截止点），之后的记录由结算钩子实时维护。热表和每个归档分区
+分别按 id 分批处理，每批与进度在同一事务内提交，中断后从进度处继续，不会重复累加。
+回填完成前暂停归档，保证各分区中的记录不变。
+"""
+from typing import Callable, Optional
+from sqlalchemy import Table, select
+from sqlalchemy.orm import Session
+from ..database import SessionLocal
+from ..models.game import GameRecord
+from ..models.stats import BackfillCheckpoint
+from ..utils.partitions import archive_table, attach_archives, list_archived_months
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 回填时每批处理的记录数
+BACKFILL_CHUNK_SIZE = 5000
+
+# 处理某个分区中 id 在 (low, high] 内的记录（不提交事务），返回处理的记录数
+ChunkHandler = Callable[[Session, Table, int, int], int]
+
+
+def _chunk_upper_bound(db: Session, table: Table, low: int, target: int) -> int:
+    """从 low 之后数 BACKFILL_CHUNK_SIZE 条记录的 id，不超过 target"""
+    upper = db.execute(
+        select(table.c.id)
+        .where(table.c.id > low, table.c.id <= target)
+        .order_by(table.c.id)
+        .offset(BACKFILL_CHUNK_SIZE - 1)
+        .limit(1)
+    ).scalar()
+    return upper if upper is not None else target
+
+
+def _partition_table(db: Session, partition: str) -> Table:
+    if partition == "main":
+        return GameRecord.__table__
+    # 每批提交后连接会归还连接池，下一批可能换了连接，需要重新确认已附加
+    return archive_table(attach_archives(db, [partition])[0])
+
+
+def _backfill_partition(db: Session, job: str, partition: str, target: int, handle_chunk: ChunkHandler) -> int:
+    """回填一个分区，返回本次处理的记录数"""
+    name = f"{job}:{partition}"
+    checkpoint = db.get(BackfillCheckpoint, name)
+    if checkpoint is None:
+        checkpoint = BackfillCheckpoint(name=name, high_water_mark=0, target_id=target, is_complete=False)
+        db.add(checkpoint)
+        db.commit()
+    if checkpoint.is_complete:
+        return 0
+
+    processed = 0
+    while True:
+        table = _partition_table(db, partition)
+        low = checkpoint.high_water_mark
+        high = _chunk_upper_bound(db, table, low, target)
+
+        processed += handle_chunk(db, table, low, high)
+        checkpoint.high_water_mark = high
+        checkpoint.is_complete = high >= target
+        db.commit()
+
+        if checkpoint.is_complete:
+            return processed
+
+
+def run_backfill(job: str, handle_chunk: ChunkHandler, db: Optional[Session] = None) -> Optional[int]:
+    """回填截止点之前的历史记录，返回本次处理的记录数，已完成时返回 None"""
+    owns_session = db is None
+    db = db or SessionLocal()
+    try:
+        checkpoint = db.get(BackfillCheckpoint, job)
+        if checkpoint is None or checkpoint.is_complete:
+            return None
+
+        target = checkpoint.target_id
+        processed = 0
+        for partition in list_archived_months() + ["main"]:
+            processed += _backfill_partition(db, job, partition, target, handle_chunk)
+            logger.info(f"{job} 回填 {partition} 完成")
+
+        checkpoint.high_water_mark = target
+        checkpoint.is_complete = True
+        db.commit()
+        return processed
+    finally:
+        if owns_session:
+            db.close()
+
+
+def is_backfilled(db: Session, job: str) -> bool:
+    """回填任务是否已完成（汇总表已包含全部历史记录）"""
+    checkpoint = db.get(BackfillCheckpoint, job)
+    return checkpoint is not None and checkpoint.is_complete
@@ -0,0 +1,163 @@
+"""
+最近大奖缓存
+
+每种游戏类型一个固定长度的环形缓冲，按游戏记录 id 从新到旧保存最近的大奖（已附带
+用户名）。本进程的结算由提交后钩子写入，启动时从数据库预热，其他进程的大奖由后台
+任务按记录 id 增量同步；同一条记录只保存一次。实时状态和管理后台概览直接读取缓存，
+不再查询数据库。
+"""
+import asyncio
+import bisect
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from sqlalchemy import desc, func, select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from ..config import settings
+from ..database import SessionLocal
+from ..models.game import GameRecord, BIG_WIN_CREDITS
+from ..models.user import User
+from .settlement import PlaySettlement, register_post_commit_hook
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class BigWin:
+    """一次大奖"""
+    record_id: int
+    user_id: int
+    username: str
+    game_type: str
+    template_id: str
+    win_amount: int
+    created_at: datetime  # UTC，与游戏记录的 created_at 一致
+
+
+class BigWinBuffer:
+    """按游戏类型划分的最近大奖环形缓冲"""
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal, size: Optional[int] = None):
+        self._session_factory = session_factory
+        self.size = size or settings.big_win_buffer_size
+        self._lock = threading.Lock()
+        # 游戏类型 -> 按记录 id 升序的大奖，超过 size 时丢弃最旧的
+        self._rings: Dict[str, List[BigWin]] = {}
+        self._cursor = 0
+
+    def _add(self, win: BigWin):
+        ring = self._rings.setdefault(win.game_type, [])
+        ids = [item.record_id for item in ring]
+        index = bisect.bisect_left(ids, win.record_id)
+        if index < len(ring) and ring[index].record_id == win.record_id:
+            return
+        ring.insert(index, win)
+        if len(ring) > self.size:
+            del ring[0]
+
+    @staticmethod
+    def _query():
+        return select(
+            GameRecord.id, GameRecord.user_id, User.username, GameRecord.game_type,
+            GameRecord.template_id, GameRecord.prize_credits, GameRecord.created_at
+        ).outerjoin(User, User.id == GameRecord.user_id).where(GameRecord.big_win_clause())
+
+    @staticmethod
+    def _to_win(row) -> BigWin:
+        return BigWin(
+            record_id=row.id,
+            user_id=row.user_id,
+            username=row.username or "未知用户",
+            game_type=row.game_type,
+            template_id=row.template_id,
+            win_amount=row.prize_credits,
+            created_at=row.created_at
+        )
+
+    def warm(self):
+        """从数据库预热各游戏类型最近的大奖（启动时）"""
+        with self._session_factory() as db:
+            # 先取游标，预热期间写入的大奖由增量同步补上（重复的记录会被跳过）
+            cursor = db.execute(select(func.max(GameRecord.id))).scalar() or 0
+            game_types = db.execute(
+                select(GameRecord.game_type).where(GameRecord.big_win_clause()).distinct()
+            ).scalars().all()
+            rows = []
+            for game_type in game_types:
+                rows += db.execute(
+                    self._query()
+                    .where(GameRecord.game_type == game_type, GameRecord.id <= cursor)
+                    .order_by(desc(GameRecord.created_at))
+                    .limit(self.size)
+                ).all()
+
+        with self._lock:
+            self._rings = {}
+            for row in rows:
+                self._add(self._to_win(row))
+            self._cursor = cursor
+
+    def sync(self) -> int:
+        """增量加载其他进程结算的大奖，返回新读取的数量"""
+        with self._session_factory() as db:
+            cursor = db.execute(select(func.max(GameRecord.id))).scalar() or 0
+            if cursor <= self._cursor:
+                return 0
+            rows = db.execute(
+                self._query()
+                .where(GameRecord.id > self._cursor, GameRecord.id <= cursor)
+                .order_by(GameRecord.id)
+            ).all()
+        with self._lock:
+            for row in rows:
+                self._add(self._to_win(row))
+            self._cursor = cursor
+        return len(rows)
+
+    def record(self, settlement: PlaySettlement):
+        """写入本进程结算的大奖"""
+        if settlement.prize_credits < BIG_WIN_CREDITS:
+            return
+        with self._lock:
+            self._add(BigWin(
+                record_id=settlement.record_id,
+                user_id=settlement.user_id,
+                username=settlement.username,
+                game_type=settlement.game_type,
+                template_id=settlement.template_id,
+                win_amount=settlement.prize_credits,
+                created_at=settlement.settled_at
+            ))
+
+    def recent(self, limit: int, game_type: Optional[str] = None) -> List[BigWin]:
+        """最近的大奖，从新到旧"""
+        with self._lock:
+            if game_type is not None:
+                wins = list(self._rings.get(game_type, []))
+            else:
+                wins = [win for ring in self._rings.values() for win in ring]
+        wins.sort(key=lambda win: win.record_id, reverse=True)
+        return wins[:limit]
+
+
+big_wins = BigWinBuffer()
+
+
+@register_post_commit_hook
+def record_big_win(settlement: PlaySettlement):
+    """提交后钩子：写入最近大奖缓存"""
+    big_wins.record(settlement)
+
+
+async def run_big_win_sync():
+    """后台任务：增量同步其他进程结算的大奖"""
+    interval = settings.big_win_sync_seconds
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_threadpool(big_wins.sync)
+        except Exception as e:
+            logger.error(f"最近大奖同步失败: {e}")
@@ -0,0 +1,260 @@
+"""
+每日系统统计服务
+
+system_stats 每天一行（按游戏记录 created_at 的 UTC 日期）。当天的对局数和收支随
+每局结算在同一事务内累加，后台任务定期按游戏记录重算当天（补上活跃用户等去重
+数据），并把已结束的日期逐天重算后标记为定稿（is_final）。
+
+按时间段统计时，已定稿的整天直接读取汇总行，今天读取实时计数，只有不足一天的
+边缘时段和尚未定稿的日期才聚合游戏记录。
+"""
+import asyncio
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import case, func
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from ..config import settings
+from ..database import SessionLocal
+from ..models.admin import SystemStats
+from ..models.user import User
+from ..models.game import GameRecord
+from ..utils.partitions import (
+    archive_source, game_records_source, iter_game_records_sources, list_archived_months
+)
+from .settlement import PlaySettlement, register_settlement_hook
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 各游戏类型对应的计数列
+GAME_TYPE_COLUMNS = {
+    "scratch_card": "scratch_card_games",
+    "slot_machine": "slot_machine_games",
+    "wheel_fortune": "lucky_wheel_games",
+}
+
+
+def stats_today() -> date:
+    """统计口径的今天（游戏记录的 created_at 为 UTC 时间）"""
+    return datetime.utcnow().date()
+
+
+def day_bounds(day: date) -> Tuple[datetime, datetime]:
+    """某天的起止时间，左闭右开"""
+    start = datetime.combine(day, time.min)
+    return start, start + timedelta(days=1)
+
+
+@register_settlement_hook
+def count_play(db: Session, settlement: PlaySettlement):
+    """结算钩子：累加当天的实时计数（已定稿的日期不再修改）"""
+    values = {
+        "total_games": 1,
+        "total_credits_consumed": settlement.cost,
+        "total_credits_awarded": settlement.prize_credits,
+        "total_prizes_awarded": 1 if settlement.is_winner else 0,
+    }
+    column = GAME_TYPE_COLUMNS.get(settlement.game_type)
+    if column:
+        values[column] = 1
+
+    statement = insert(SystemStats).values(stat_date=stats_today().isoformat(), is_final=False, **values)
+    statement = statement.on_conflict_do_update(
+        index_elements=[SystemStats.stat_date],
+        set_={
+            **{
+                name: func.coalesce(getattr(SystemStats, name), 0) + getattr(statement.excluded, name)
+                for name in values
+            },
+            "updated_at": func.now(),
+        },
+        where=SystemStats.is_final == False
+    )
+    db.execute(statement)
+
+
+def refresh_day(db: Session, day: date, final: bool):
+    """按游戏记录重算某天的统计并提交
+
+    重算当天时，与查询同时提交的对局可能漏计，下次重算时补上；已结束的日期不再
+    有新记录，重算结果即为定稿。
+    """
+    start, end = day_bounds(day)
+    # 只读取该日期所在的分区
+    source = game_records_source(db, start, end)
+    payout = func.coalesce(source.prize_credits, 0)
+    games = db.query(
+        func.count().label("total_games"),
+        *[
+            func.sum(case((source.game_type == game_type, 1), else_=0)).label(column)
+            for game_type, column in GAME_TYPE_COLUMNS.items()
+        ],
+        func.sum(source.game_cost).label("total_credits_consumed"),
+        func.sum(payout).label("total_credits_awarded"),
+        func.sum(case((source.is_winner == True, 1), else_=0)).label("total_prizes_awarded"),
+        func.count(func.distinct(source.user_id)).label("active_users"),
+        func.count(func.distinct(case((source.is_winner == True, source.user_id)))).label("total_winners"),
+    ).filter(source.created_at >= start, source.created_at < end).one()
+
+    values = {name: value or 0 for name, value in games._mapping.items()}
+    values["total_users"] = db.query(func.count(User.id)).filter(User.created_at < end).scalar() or 0
+    values["new_users"] = db.query(func.count(User.id)).filter(
+        User.created_at >= start, User.created_at < end
+    ).scalar() or 0
+    values["is_final"] = final
+
+    statement = insert(SystemStats).values(stat_date=day.isoformat(), **values)
+    statement = statement.on_conflict_do_update(
+        index_elements=[SystemStats.stat_date],
+        set_={**values, "updated_at": func.now()}
+    )
+    db.execute(statement)
+    db.commit()
+
+
+def _first_pending_day(db: Session) -> Optional[date]:
+    """第一个尚未定稿的日期：最后一个定稿日期的下一天，从未定稿时为最早记录的日期"""
+    last_final = db.query(func.max(SystemStats.stat_date)).filter(SystemStats.is_final == True).scalar()
+    if last_final:
+        return date.fromisoformat(last_final) + timedelta(days=1)
+
+    earliest = _earliest_record_time(db)
+    return earliest.date() if earliest is not None else None
+
+
+def _earliest_record_time(db: Session) -> Optional[datetime]:
+    """最早一条游戏记录的时间：归档月份从旧到新逐个查找，都为空时查热表"""
+    for month in list_archived_months():
+        earliest = db.query(func.min(archive_source(db, month).created_at)).scalar()
+        if earliest is not None:
+            break
+    else:
+        earliest = db.query(func.min(GameRecord.created_at)).scalar()
+    if isinstance(earliest, str):
+        earliest = datetime.fromisoformat(earliest)
+    return earliest
+
+
+def finalize_closed_days(db: Session) -> int:
+    """逐天定稿已结束的日期，返回定稿的天数；每天单独提交，中断后从下一天继续"""
+    day = _first_pending_day(db)
+    if day is None:
+        return 0
+
+    finalized = 0
+    today = stats_today()
+    while day < today:
+        refresh_day(db, day, final=True)
+        finalized += 1
+        day += timedelta(days=1)
+    return finalized
+
+
+def _rollup_job() -> int:
+    with SessionLocal() as db:
+        finalized = finalize_closed_days(db)
+        refresh_day(db, stats_today(), final=False)
+        return finalized
+
+
+async def run_daily_stats_rollup():
+    """后台任务：定稿已结束的日期并重算当天"""
+    interval = settings.daily_stats_rollup_minutes * 60
+    while True:
+        try:
+            finalized = await run_in_threadpool(_rollup_job)
+            if finalized:
+                logger.info(f"已定稿 {finalized} 天的系统统计")
+        except Exception as e:
+            logger.error(f"系统统计汇总失败: {e}")
+        await asyncio.sleep(interval)
+
+
+@dataclass
+class PeriodTotals:
+    """时间段内的对局数、收支和按日期的对局分布"""
+    games: int = 0
+    revenue: int = 0
+    payout: int = 0
+    daily: Dict[str, int] = field(default_factory=dict)
+
+    def add(self, day: str, games: int, revenue: int, payout: int):
+        if not games:
+            return
+        self.games += games
+        self.revenue += revenue or 0
+        self.payout += payout or 0
+        self.daily[day] = self.daily.get(day, 0) + games
+
+
+def _aggregate_records(db: Session, totals: PeriodTotals, start: Optional[datetime], end: Optional[datetime], include_end: bool):
+    # 时段涉及的归档月份较多时按批分区聚合
+    for source in iter_game_records_sources(db, start, end):
+        day = func.strftime("%Y-%m-%d", source.created_at).label("day")
+        query = db.query(
+            day,
+            func.count().label("games"),
+            func.sum(source.game_cost).label("revenue"),
+            func.sum(func.coalesce(source.prize_credits, 0)).label("payout")
+        )
+        if start is not None:
+            query = query.filter(source.created_at >= start)
+        if end is not None:
+            query = query.filter(source.created_at <= end if include_end else source.created_at < end)
+        for row in query.group_by(day):
+            totals.add(row.day, row.games, row.revenue, row.payout)
+
+
+def period_totals(db: Session, start: Optional[datetime] = None, end: Optional[datetime] = None) -> PeriodTotals:
+    """[start, end] 内的统计，start 为空表示从最早的记录开始，end 为空表示到当前时间"""
+    today = stats_today()
+    today_start = day_bounds(today)[0]
+    last_day = end.date() if end is not None else today
+
+    query = db.query(SystemStats).filter(SystemStats.stat_date <= last_day.isoformat())
+    if start is not None:
+        query = query.filter(SystemStats.stat_date >= start.date().isoformat())
+    rows = {row.stat_date: row for row in query.all()}
+
+    totals = PeriodTotals()
+    # 需要聚合游戏记录的时段，相邻的合并为一段
+    segments: List[List[Optional[datetime]]] = []
+
+    def pending(segment_start: Optional[datetime], segment_end: datetime):
+        if segments and segments[-1][1] == segment_start:
+            segments[-1][1] = segment_end
+        else:
+            segments.append([segment_start, segment_end])
+
+    if start is not None:
+        day = start.date()
+    else:
+        final_days = [stat_date for stat_date, row in rows.items() if row.is_final]
+        day = date.fromisoformat(min(final_days)) if final_days else None
+        if day is None:
+            # 还没有定稿的汇总，整段聚合游戏记录
+            pending(None, today_start if end is None else end)
+            day = today if end is None else last_day + timedelta(days=1)
+        # 定稿从最早记录的日期开始（见 _first_pending_day），第一个定稿日期之前没有记录
+
+    while day is not None and day <= last_day:
+        day_start, day_end = day_bounds(day)
+        row = rows.get(day.isoformat())
+        covers_day = (start is None or start <= day_start) and (end is None or end >= day_end)
+        covers_today = day == today and (start is None or start <= day_start) and end is None
+        if row is not None and ((covers_day and row.is_final) or covers_today):
+            totals.add(row.stat_date, row.total_games, row.total_credits_consumed, row.total_credits_awarded)
+        else:
+            segment_start = day_start if start is None else max(start, day_start)
+            segment_end = day_end if end is None else min(end, day_end)
+            pending(segment_start, segment_end)
+        day += timedelta(days=1)
+
+    for index, (segment_start, segment_end) in enumerate(segments):
+        # 最后一段包含结束时间本身，与接口原先的 created_at <= end 一致
+        is_last = index == len(segments) - 1 and end is not None and segment_end == end
+        _aggregate_records(db, totals, segment_start, segment_end, include_end=is_last)
+    return totals
@@ -0,0 +1,142 @@
+"""
+游戏记录导出
+
+按记录 id 倒序分批读取（keyset：每批从上一批最小的 id 继续，不使用 OFFSET），每批
+在新的只读会话中查询并连同用户名一起取出，读完即结束读事务，不会长时间持有读事务
+而拖延 WAL 检查点。按分区从新到旧依次读取热表和涉及的归档月份。
+
+导出内容逐批编码为 NDJSON 或 CSV（可选 gzip 压缩）交给流式响应，内存占用只与
+批大小有关，与导出的总行数无关。
+"""
+import csv
+import io
+import json
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterator, List, Optional
+from sqlalchemy.orm import aliased
+from ..config import settings
+from ..database import ReadSessionLocal
+from ..models.game import GameRecord
+from ..models.user import User
+from ..utils.partitions import archive_table, archived_months_in_range, attach_archives
+
+EXPORT_COLUMNS = [
+    "id", "user_id", "username", "game_type", "template_id",
+    "bet_amount", "win_amount", "net_result", "created_at"
+]
+
+
+@dataclass
+class ExportFilter:
+    """导出条件，与 /api/admin/games/records 相同"""
+    game_type: Optional[str] = None
+    user_id: Optional[int] = None
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+    include_result: bool = False
+
+
+def _fetch_batch(month: Optional[str], filters: ExportFilter, before_id: Optional[int], batch_size: int) -> List:
+    """读取一个分区中 id 小于 before_id 的下一批记录（month 为 None 时读热表）"""
+    with ReadSessionLocal() as db:
+        if month is None:
+            source = GameRecord
+        else:
+            schema = attach_archives(db, [month])[0]
+            source = aliased(GameRecord, archive_table(schema), adapt_on_names=True)
+
+        columns = [
+            source.id, source.user_id, User.username, source.game_type, source.template_id,
+            source.game_cost, source.prize_credits, source.created_at
+        ]
+        if filters.include_result:
+            columns.append(source.game_result)
+        query = db.query(*columns).outerjoin(User, User.id == source.user_id)
+        if filters.game_type:
+            query = query.filter(source.game_type == filters.game_type)
+        if filters.user_id:
+            query = query.filter(source.user_id == filters.user_id)
+        if filters.start_date:
+            query = query.filter(source.created_at >= filters.start_date)
+        if filters.end_date:
+            query = query.filter(source.created_at <= filters.end_date)
+        if before_id is not None:
+            query = query.filter(source.id < before_id)
+        return query.order_by(source.id.desc()).limit(batch_size).all()
+
+
+def iter_record_batches(filters: ExportFilter, batch_size: Optional[int] = None) -> Iterator[List[dict]]:
+    """按分区从新到旧、分区内按 id 倒序逐批返回导出行"""
+    batch_size = batch_size or settings.export_batch_size
+    months = archived_months_in_range(filters.start_date, filters.end_date)
+    for month in [None] + list(reversed(months)):
+        before_id = None
+        while True:
+            rows = _fetch_batch(month, filters, before_id, batch_size)
+            if not rows:
+                break
+            batch = []
+            for row in rows:
+                item = {
+                    "id": row.id,
+                    "user_id": row.user_id,
+                    "username": row.username or "未知用户",
+                    "game_type": row.game_type,
+                    "template_id": row.template_id,
+                    "bet_amount": row.game_cost,
+                    "win_amount": row.prize_credits,
+                    "net_result": (row.prize_credits or 0) - row.game_cost,
+                    "created_at": row.created_at.isoformat() if row.created_at else None
+                }
+                if filters.include_result:
+                    item["result_data"] = row.game_result
+                batch.append(item)
+            yield batch
+            if len(rows) < batch_size:
+                break
+            before_id = rows[-1].id
+
+
+def _encode_ndjson(batches: Iterator[List[dict]]) -> Iterator[bytes]:
+    for batch in batches:
+        yield "".join(json.dumps(item, ensure_ascii=False) + "\n" for item in batch).encode("utf-8")
+
+
+def _encode_csv(batches: Iterator[List[dict]], include_result: bool) -> Iterator[bytes]:
+    columns = EXPORT_COLUMNS + (["result_data"] if include_result else [])
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # 带 BOM，Excel 打开时按 UTF-8 识别中文
+    buffer.write("\ufeff")
+    writer.writerow(columns)
+    for batch in batches:
+        for item in batch:
+            if include_result:
+                item["result_data"] = json.dumps(item["result_data"], ensure_ascii=False)
+            writer.writerow([item[column] for column in columns])
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _gzip(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31：gzip 格式
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_game_records(filters: ExportFilter, export_format: str, compress: bool = False) -> Iterator[bytes]:
+    """导出内容的字节流（同步迭代器，由流式响应在线程池中逐块读取）"""
+    batches = iter_record_batches(filters)
+    if export_format == "csv":
+        chunks = _encode_csv(batches, filters.include_result)
+    else:
+        chunks = _encode_ndjson(batches)
+    return _gzip(chunks) if compress else chunks
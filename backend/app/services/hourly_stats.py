@@ -0,0 +1,256 @@
+"""
+按小时预聚合的游戏统计服务
+
+game_stats_hourly 按 (UTC 小时, 游戏类型, 模板) 累计对局数、收支、中奖次数和玩家
+草图，随每局结算在同一事务内更新；引入前的历史记录由后台回填任务补齐（见 backfill）。
+
+按时间段统计时，整小时部分直接对单元格求和、合并玩家草图，只有不足一小时的首尾
+时段才聚合游戏记录。回填完成前汇总不完整，调用方回退到扫描游戏记录。
+"""
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import Table, case, func, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Query, Session
+from starlette.concurrency import run_in_threadpool
+from ..core.sketches import HyperLogLog
+from ..models.stats import GameStatsHourly
+from ..utils.partitions import iter_game_records_sources
+from .backfill import is_backfilled, run_backfill
+from .settlement import PlaySettlement, register_settlement_hook
+import logging
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_JOB = "game_stats_hourly"
+
+HOUR_FORMAT = "%Y-%m-%d %H"
+
+COUNTER_COLUMNS = ("plays", "revenue", "payout", "winners")
+
+
+def hour_bucket(moment: datetime) -> str:
+    """时间所在的小时单元格，与 strftime('%Y-%m-%d %H', created_at) 一致"""
+    return moment.strftime(HOUR_FORMAT)
+
+
+def _upsert(statement):
+    """单元格已存在时累加计数并合并玩家草图"""
+    return statement.on_conflict_do_update(
+        index_elements=[GameStatsHourly.hour_bucket, GameStatsHourly.game_type, GameStatsHourly.template_id],
+        set_={
+            **{
+                name: getattr(GameStatsHourly, name) + getattr(statement.excluded, name)
+                for name in COUNTER_COLUMNS
+            },
+            "players": func.hll_union(GameStatsHourly.players, statement.excluded.players),
+            "updated_at": func.now(),
+        }
+    )
+
+
+@register_settlement_hook
+def record_play(db: Session, settlement: PlaySettlement):
+    """结算钩子：累加本局所在的小时单元格"""
+    db.execute(_upsert(insert(GameStatsHourly).values(
+        hour_bucket=hour_bucket(datetime.utcnow()),
+        game_type=settlement.game_type,
+        template_id=settlement.template_id,
+        plays=1,
+        revenue=settlement.cost,
+        payout=settlement.prize_credits,
+        winners=1 if settlement.is_winner else 0,
+        players=HyperLogLog().add(settlement.user_id).to_bytes()
+    )))
+
+
+def _record_cells(table, start: Optional[datetime] = None, end: Optional[datetime] = None):
+    """按小时单元格聚合游戏记录的列，与 game_stats_hourly 的列一一对应"""
+    bucket = func.strftime(HOUR_FORMAT, table.created_at)
+    columns = (
+        bucket.label("hour_bucket"),
+        table.game_type,
+        table.template_id,
+        func.count().label("plays"),
+        func.sum(table.game_cost).label("revenue"),
+        func.sum(func.coalesce(table.prize_credits, 0)).label("payout"),
+        func.sum(case((table.is_winner == True, 1), else_=0)).label("winners"),
+        func.hll_union_agg(func.hll_of(table.user_id)).label("players"),
+    )
+    return bucket, columns
+
+
+def _backfill_chunk(db: Session, table: Table, low: int, high: int) -> int:
+    bucket, columns = _record_cells(table.c)
+    cells = (
+        select(*columns)
+        .where(table.c.id > low, table.c.id <= high)
+        .group_by(bucket, table.c.game_type, table.c.template_id)
+    )
+    db.execute(_upsert(insert(GameStatsHourly).from_select(
+        ["hour_bucket", "game_type", "template_id", *COUNTER_COLUMNS, "players"], cells
+    )))
+    return db.execute(
+        select(func.count()).select_from(table).where(table.c.id > low, table.c.id <= high)
+    ).scalar() or 0
+
+
+def backfill_hourly_stats(db: Optional[Session] = None) -> Optional[int]:
+    """回填截止点之前的历史记录，返回本次处理的记录数，已完成时返回 None"""
+    return run_backfill(BACKFILL_JOB, _backfill_chunk, db)
+
+
+async def run_hourly_stats_backfill():
+    """后台回填任务"""
+    try:
+        processed = await run_in_threadpool(backfill_hourly_stats)
+        if processed is not None:
+            logger.info(f"小时统计回填完成，共 {processed} 条记录")
+    except Exception as e:
+        logger.error(f"小时统计回填失败，下次启动时从中断处继续: {e}")
+
+
+@dataclass
+class HourlySummary:
+    """时间段内的统计：总数、按小时（0-23）和按日期的对局分布、各模板的对局数和收入"""
+    games: int = 0
+    revenue: int = 0
+    payout: int = 0
+    winners: int = 0
+    players: HyperLogLog = field(default_factory=HyperLogLog)
+    hourly: Dict[str, int] = field(default_factory=dict)
+    daily: Dict[str, int] = field(default_factory=dict)
+    templates: Dict[Tuple[str, str], List[int]] = field(default_factory=dict)
+
+    def add_hour(self, bucket: str, plays: int, revenue: int, payout: int, winners: int):
+        if not plays:
+            return
+        self.games += plays
+        self.revenue += revenue or 0
+        self.payout += payout or 0
+        self.winners += winners or 0
+        hour, day = str(int(bucket[11:13])), bucket[:10]
+        self.hourly[hour] = self.hourly.get(hour, 0) + plays
+        self.daily[day] = self.daily.get(day, 0) + plays
+
+    def add_template(self, game_type: str, template_id: str, plays: int, revenue: int):
+        totals = self.templates.setdefault((game_type, template_id), [0, 0])
+        totals[0] += plays
+        totals[1] += revenue or 0
+
+    def add_players(self, sketch: Optional[bytes]):
+        if sketch:
+            self.players.merge(HyperLogLog.from_bytes(sketch))
+
+    def top_templates(self, limit: int) -> List[Tuple[str, str, int, int]]:
+        """对局数最多的模板：(游戏类型, 模板ID, 对局数, 收入)"""
+        ranked = sorted(self.templates.items(), key=lambda item: item[1][0], reverse=True)[:limit]
+        return [(game_type, template_id, plays, revenue) for (game_type, template_id), (plays, revenue) in ranked]
+
+
+def _scoped(query: Query, columns, game_types: Optional[List[str]], template_ids: Optional[List[str]]) -> Query:
+    if game_types:
+        query = query.filter(columns.game_type.in_(game_types))
+    if template_ids:
+        query = query.filter(columns.template_id.in_(template_ids))
+    return query
+
+
+def _add_cells(db: Session, summary: HourlySummary, start: datetime, end: datetime,
+               game_types: Optional[List[str]], template_ids: Optional[List[str]], players: bool):
+    """整小时部分：[start, end) 内的单元格求和"""
+    cells = GameStatsHourly
+
+    def scoped(query: Query) -> Query:
+        query = query.filter(cells.hour_bucket >= hour_bucket(start), cells.hour_bucket < hour_bucket(end))
+        return _scoped(query, cells, game_types, template_ids)
+
+    hours = scoped(db.query(
+        cells.hour_bucket,
+        func.sum(cells.plays).label("plays"),
+        func.sum(cells.revenue).label("revenue"),
+        func.sum(cells.payout).label("payout"),
+        func.sum(cells.winners).label("winners"),
+    )).group_by(cells.hour_bucket)
+    for row in hours:
+        summary.add_hour(row.hour_bucket, row.plays, row.revenue, row.payout, row.winners)
+
+    templates = scoped(db.query(
+        cells.game_type,
+        cells.template_id,
+        func.sum(cells.plays).label("plays"),
+        func.sum(cells.revenue).label("revenue"),
+    )).group_by(cells.game_type, cells.template_id)
+    for row in templates:
+        summary.add_template(row.game_type, row.template_id, row.plays, row.revenue)
+
+    if players:
+        summary.add_players(scoped(db.query(func.hll_union_agg(cells.players))).scalar())
+
+
+def _add_records(db: Session, summary: HourlySummary, start: datetime, end: datetime, include_end: bool,
+                 game_types: Optional[List[str]], template_ids: Optional[List[str]]):
+    """不足一小时的首尾时段：按单元格聚合游戏记录"""
+    for source in iter_game_records_sources(db, start, end):
+        bucket, columns = _record_cells(source)
+        query = db.query(*columns).filter(
+            source.created_at >= start,
+            source.created_at <= end if include_end else source.created_at < end
+        )
+        query = _scoped(query, source, game_types, template_ids)
+        for row in query.group_by(bucket, source.game_type, source.template_id):
+            summary.add_hour(row.hour_bucket, row.plays, row.revenue, row.payout, row.winners)
+            summary.add_template(row.game_type, row.template_id, row.plays, row.revenue)
+            summary.add_players(row.players)
+
+
+def summarize_hours(
+    db: Session,
+    start: datetime,
+    end: datetime,
+    game_types: Optional[List[str]] = None,
+    template_ids: Optional[List[str]] = None,
+    players: bool = True
+) -> Optional[HourlySummary]:
+    """[start, end] 内的统计（UTC 时间），回填尚未完成时返回 None
+
+    players 为 False 时不合并玩家草图（只需要对局数和收入时使用）。
+    """
+    if not is_backfilled(db, BACKFILL_JOB):
+        return None
+
+    summary = HourlySummary()
+    full_start = start.replace(minute=0, second=0, microsecond=0)
+    if full_start < start:
+        full_start += timedelta(hours=1)
+    full_end = end.replace(minute=0, second=0, microsecond=0)
+
+    if full_start < full_end:
+        _add_cells(db, summary, full_start, full_end, game_types, template_ids, players)
+        if start < full_start:
+            _add_records(db, summary, start, full_start, False, game_types, template_ids)
+        _add_records(db, summary, full_end, end, True, game_types, template_ids)
+    else:
+        _add_records(db, summary, start, end, True, game_types, template_ids)
+    return summary
+
+
+def popular_games(db: Session, start: datetime, end: datetime, limit: int) -> List[Tuple[str, str, int, int]]:
+    """[start, end] 内对局数最多的模板：(游戏类型, 模板ID, 对局数, 收入)"""
+    summary = summarize_hours(db, start, end, players=False)
+    if summary is not None:
+        return summary.top_templates(limit)
+
+    # 回填未完成：按分区分批聚合游戏记录，在 HourlySummary 中合并各模板的计数
+    summary = HourlySummary()
+    for source in iter_game_records_sources(db, start, end):
+        rows = db.query(
+            source.game_type, source.template_id,
+            func.count().label("play_count"), func.sum(source.game_cost).label("revenue")
+        ).filter(
+            source.created_at >= start, source.created_at <= end
+        ).group_by(source.game_type, source.template_id)
+        for row in rows:
+            summary.add_template(row.game_type, row.template_id, row.play_count, row.revenue)
+    return summary.top_templates(limit)
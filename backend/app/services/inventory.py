@@ -0,0 +1,294 @@
+"""
+限量奖品库存服务
+
+prizes 中 template_id 不为空的记录按 (game_type, template_id, name) 绑定游戏引擎中的
+奖品，stock_quantity 不为 -1 时限量发放（game_type 与游戏记录一致，如 wheel_fortune）。
+
+每个进程从数据库按块租借库存（reserved_quantity），抽奖时只在内存中扣减，已发出的
+数量由后台任务批量结算到 used_quantity，抽奖路径不会争用 prizes 的行锁。任何时候
+都满足 used_quantity + reserved_quantity <= stock_quantity，进程异常退出时未发出的
+租借最多让每种奖品少发一块，不会超发。
+"""
+import asyncio
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Dict, FrozenSet, Iterator, List, Optional, Tuple
+from sqlalchemy import bindparam, func, or_, select, update
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from ..config import settings
+from ..database import SessionLocal
+from ..models.prize import Prize
+import logging
+
+logger = logging.getLogger(__name__)
+
+StockKey = Tuple[str, str, str]
+
+
+@dataclass
+class _StockEntry:
+    """单个限量奖品在本进程中的状态"""
+    prize_id: int
+    is_active: bool
+    leased: int = 0  # 已租借、尚未发出的数量
+    used: int = 0  # 已发出、尚未结算到数据库的数量
+    exhausted: bool = False  # 数据库中已没有可租借的库存
+    lease_lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    @property
+    def sold_out(self) -> bool:
+        return not self.is_active or (self.leased <= 0 and self.exhausted)
+
+
+class PrizeInventory:
+    """进程内的限量奖品库存"""
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal, block_size: Optional[int] = None):
+        self._session_factory = session_factory
+        self._block_size = block_size or settings.prize_lease_block_size
+        self._lock = threading.RLock()
+        self._entries: Dict[StockKey, _StockEntry] = {}
+        self._sold_out: Dict[Tuple[str, str], FrozenSet[str]] = {}
+
+    def sold_out(self, game_type: str, template_id: str) -> FrozenSet[str]:
+        """模板中已售罄的奖品名称"""
+        return self._sold_out.get((game_type, template_id), frozenset())
+
+    def take(self, game_type: str, template_id: str, name: str) -> bool:
+        """领取一件奖品，不限量的奖品直接返回 True"""
+        key = (game_type, template_id, name)
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is None:
+                    return True
+                if entry.sold_out:
+                    return False
+                if entry.leased > 0:
+                    entry.leased -= 1
+                    entry.used += 1
+                    # refresh 可能已把仍有租借的奖品标记为库存耗尽，发出最后一件时即售罄
+                    if entry.sold_out:
+                        self._update_sold_out(key)
+                    return True
+
+            # 租借需要写数据库，只持有该奖品的锁，其他奖品的抽奖不必等待
+            with entry.lease_lock:
+                with self._lock:
+                    if entry.leased > 0 or entry.sold_out:
+                        continue
+                leased = self._lease(entry.prize_id)
+                released = None
+                with self._lock:
+                    if self._entries.get(key) is not entry:
+                        # 租借期间奖品已被刷新替换或不再限量
+                        released = leased
+                    else:
+                        entry.leased += leased
+                        entry.exhausted = leased <= 0
+                        if entry.exhausted:
+                            self._update_sold_out(key)
+                if released:
+                    self._release([(entry.prize_id, released)])
+
+    def give_back(self, game_type: str, template_id: str, name: str):
+        """退回一件未实际发放的奖品（如结算失败）"""
+        key = (game_type, template_id, name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.used <= 0:
+                return
+            entry.used -= 1
+            entry.leased += 1
+            self._update_sold_out(key)
+
+    @contextmanager
+    def draw(self, game_type: str) -> Iterator["StockView"]:
+        """一局游戏的抽奖范围，代码块出现异常时退回本局领取的奖品"""
+        view = StockView(self, game_type)
+        try:
+            yield view
+        except BaseException:
+            for template_id, name in view.taken:
+                self.give_back(game_type, template_id, name)
+            raise
+
+    def _lease(self, prize_id: int) -> int:
+        """从数据库租借一块库存，返回租到的数量"""
+        with self._session_factory() as db:
+            while True:
+                row = db.execute(
+                    select(Prize.stock_quantity, Prize.used_quantity, Prize.reserved_quantity, Prize.is_active)
+                    .where(Prize.id == prize_id)
+                ).one_or_none()
+                if row is None or not row.is_active:
+                    return 0
+                available = row.stock_quantity - (row.used_quantity or 0) - (row.reserved_quantity or 0)
+                quantity = min(self._block_size, available)
+                if quantity <= 0:
+                    return 0
+
+                # 条件更新，与其他进程同时租借时不会超出库存
+                reserved = func.coalesce(Prize.reserved_quantity, 0)
+                leased = db.execute(
+                    update(Prize.__table__)
+                    .where(
+                        Prize.id == prize_id,
+                        func.coalesce(Prize.used_quantity, 0) + reserved + quantity <= Prize.stock_quantity
+                    )
+                    .values(reserved_quantity=reserved + quantity)
+                ).rowcount
+                db.commit()
+                if leased:
+                    return quantity
+
+    def _update_sold_out(self, key: StockKey):
+        """重新计算奖品所在模板的售罄集合"""
+        game_type, template_id = key[0], key[1]
+        self._sold_out[(game_type, template_id)] = frozenset(
+            name for (entry_game, entry_template, name), entry in self._entries.items()
+            if entry_game == game_type and entry_template == template_id and entry.sold_out
+        )
+
+    def _rebuild_sold_out(self):
+        self._sold_out = {}
+        for key in self._entries:
+            if (key[0], key[1]) not in self._sold_out:
+                self._update_sold_out(key)
+
+    def flush(self) -> int:
+        """把已发出的数量批量结算到数据库，返回结算的数量"""
+        with self._lock:
+            pending = [
+                (entry.prize_id, entry.used) for entry in self._entries.values() if entry.used > 0
+            ]
+            for entry in self._entries.values():
+                entry.used = 0
+        if not pending:
+            return 0
+
+        prizes = Prize.__table__
+        try:
+            with self._session_factory() as db:
+                db.execute(
+                    update(prizes)
+                    .where(prizes.c.id == bindparam("prize_id"))
+                    .values(
+                        used_quantity=func.coalesce(prizes.c.used_quantity, 0) + bindparam("quantity"),
+                        reserved_quantity=func.coalesce(prizes.c.reserved_quantity, 0) - bindparam("quantity")
+                    ),
+                    [{"prize_id": prize_id, "quantity": quantity} for prize_id, quantity in pending]
+                )
+                db.commit()
+        except Exception:
+            with self._lock:
+                by_id = {entry.prize_id: entry for entry in self._entries.values()}
+                for prize_id, quantity in pending:
+                    if prize_id in by_id:
+                        by_id[prize_id].used += quantity
+            raise
+        return sum(quantity for _, quantity in pending)
+
+    def refresh(self):
+        """重新加载限量奖品（后台修改库存、启停奖品后生效）"""
+        with self._session_factory() as db:
+            rows = db.execute(
+                select(
+                    Prize.id, Prize.game_type, Prize.template_id, Prize.name, Prize.is_active,
+                    Prize.stock_quantity, Prize.used_quantity, Prize.reserved_quantity
+                )
+                .where(
+                    Prize.template_id.isnot(None),
+                    or_(Prize.stock_quantity != -1, Prize.is_active == False)
+                )
+                .order_by(Prize.id)
+            ).all()
+
+        with self._lock:
+            entries: Dict[StockKey, _StockEntry] = {}
+            for row in rows:
+                key = (row.game_type, row.template_id, row.name)
+                if key in entries:
+                    continue
+                entry = self._entries.get(key)
+                if entry is None or entry.prize_id != row.id:
+                    entry = _StockEntry(prize_id=row.id, is_active=bool(row.is_active))
+                entry.is_active = bool(row.is_active)
+                available = row.stock_quantity - (row.used_quantity or 0) - (row.reserved_quantity or 0)
+                entry.exhausted = row.stock_quantity != -1 and available <= 0
+                entries[key] = entry
+
+            released = [
+                (entry.prize_id, entry.leased) for key, entry in self._entries.items()
+                if key not in entries and entry.leased > 0
+            ]
+            self._entries = entries
+            self._rebuild_sold_out()
+
+        # 不再限量的奖品归还租借
+        if released:
+            self._release(released)
+
+    def _release(self, leases: List[Tuple[int, int]]):
+        prizes = Prize.__table__
+        with self._session_factory() as db:
+            db.execute(
+                update(prizes)
+                .where(prizes.c.id == bindparam("prize_id"))
+                .values(reserved_quantity=prizes.c.reserved_quantity - bindparam("quantity")),
+                [{"prize_id": prize_id, "quantity": quantity} for prize_id, quantity in leases]
+            )
+            db.commit()
+
+    def sync(self):
+        """结算并刷新"""
+        self.flush()
+        self.refresh()
+
+    def close(self):
+        """进程退出前结算已发出的奖品并归还未发出的租借"""
+        self.flush()
+        with self._lock:
+            leases = [
+                (entry.prize_id, entry.leased) for entry in self._entries.values() if entry.leased > 0
+            ]
+            for entry in self._entries.values():
+                entry.leased = 0
+                entry.exhausted = True
+            self._rebuild_sold_out()
+        if leases:
+            self._release(leases)
+
+
+class StockView:
+    """某个游戏类型的库存视图，供游戏引擎抽奖时使用"""
+
+    def __init__(self, inventory: PrizeInventory, game_type: str):
+        self.inventory = inventory
+        self.game_type = game_type
+        self.taken: List[Tuple[str, str]] = []
+
+    def sold_out(self, template_id: str) -> FrozenSet[str]:
+        return self.inventory.sold_out(self.game_type, template_id)
+
+    def take(self, template_id: str, name: str) -> bool:
+        if not self.inventory.take(self.game_type, template_id, name):
+            return False
+        self.taken.append((template_id, name))
+        return True
+
+
+prize_inventory = PrizeInventory()
+
+
+async def run_inventory_sync():
+    """后台任务：定期结算已发出的奖品并刷新库存"""
+    interval = settings.prize_inventory_sync_seconds
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_threadpool(prize_inventory.sync)
+        except Exception as e:
+            logger.error(f"奖品库存同步失败: {e}")
@@ -0,0 +1,439 @@
+"""
+排行榜服务
+
+余额、总赢取和胜率三个排行榜常驻内存，各用一个可按名次访问的跳表保存
+(-分数, 用户ID)，前 K 名和任意用户的名次都是 O(log n)，不再扫描用户或游戏记录。
+
+启动时从数据库整体加载（users 的余额和累计数据、user_game_stats 的盈利局数）。
+本进程的结算由提交后钩子立即计入；所有余额变动都写入金额流水，后台任务按流水
+自增 id 找出有变动的用户并从数据库重新加载，补上其他进程的结算和管理员调整，
+另外定期整体重建以移除已删除的用户。
+
+每个用户记录加载时游戏记录的最大 id（版本）：钩子只计入更新的对局，已包含在
+加载结果中的对局不会重复累加。
+
+今天、本周和最近24小时的净赢取、单局最大奖励排行榜按 UTC 小时分桶累计，每桶保存
+各用户的净赢取、最大奖励和局数，超过保留时长的桶随时间淘汰；查询时合并窗口内的
+桶（最多 8 天 × 24 个）。其他进程的对局按游戏记录自增 id 增量同步，本进程已计入的
+记录 id 在同步时跳过。
+"""
+import asyncio
+import calendar
+import heapq
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from ..config import settings
+from ..core.skiplist import IndexableSkipList
+from ..database import SessionLocal
+from ..models.credit import CreditLedger
+from ..models.game import GameRecord
+from ..models.stats import UserGameStats
+from ..models.user import User
+from ..schemas.game import LeaderboardWindow
+from ..utils.partitions import iter_game_records_sources
+from .backfill import is_backfilled
+from .settlement import PlaySettlement, register_post_commit_hook
+from .user_stats import BACKFILL_JOB
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 重新加载有变动的用户时每条 IN 查询的用户数
+RELOAD_BATCH_SIZE = 500
+
+
+@dataclass
+class _Player:
+    username: str
+    credits: int
+    total_win: int
+    games: int
+    profitable_games: int
+    version: int  # 已计入的最大游戏记录 id
+
+
+class _Board:
+    """单个排行榜，分数为 None 的用户不上榜"""
+
+    def __init__(self, score: Callable[[_Player], Optional[float]]):
+        self.score = score
+        self._entries = IndexableSkipList()
+        self._scores: Dict[int, float] = {}
+
+    def update(self, user_id: int, player: _Player):
+        self.remove(user_id)
+        value = self.score(player)
+        if value is not None:
+            self._entries.insert((-value, user_id))
+            self._scores[user_id] = value
+
+    def remove(self, user_id: int):
+        old = self._scores.pop(user_id, None)
+        if old is not None:
+            self._entries.remove((-old, user_id))
+
+    def top(self, limit: int) -> List[int]:
+        user_ids = []
+        for _, user_id in self._entries.iter_from(0):
+            if len(user_ids) >= limit:
+                break
+            user_ids.append(user_id)
+        return user_ids
+
+    def count_above(self, value: float) -> int:
+        """分数严格高于 value 的用户数"""
+        return self._entries.count_less((-value,))
+
+
+def _win_rate(player: _Player) -> Optional[float]:
+    if player.games < settings.leaderboard_win_rate_min_games:
+        return None
+    return player.profitable_games * 100.0 / player.games
+
+
+@dataclass
+class Standing:
+    """排行榜查询结果：前几名 (用户ID, 用户名, 分数, 游戏次数)，以及当前用户的名次和分数"""
+    entries: List[Tuple[int, str, float, int]]
+    user_rank: Optional[int]
+    user_value: float
+
+
+class Leaderboards:
+    """内存排行榜"""
+
+    CREDITS = "credits"
+    TOTAL_WIN = "total_win"
+    WIN_RATE = "win_rate"
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal):
+        self._session_factory = session_factory
+        self._lock = threading.Lock()
+        self._players: Dict[int, _Player] = {}
+        self._boards = self._new_boards()
+        self._ledger_cursor = 0
+        # 加载时统计回填尚未完成，回填完成后需要整体重建
+        self._incomplete = False
+
+    @staticmethod
+    def _new_boards() -> Dict[str, _Board]:
+        return {
+            Leaderboards.CREDITS: _Board(lambda player: player.credits),
+            Leaderboards.TOTAL_WIN: _Board(lambda player: player.total_win if player.games else None),
+            Leaderboards.WIN_RATE: _Board(_win_rate),
+        }
+
+    @staticmethod
+    def _load_players(db: Session, user_ids: Optional[Iterable[int]] = None) -> Dict[int, _Player]:
+        """从数据库加载用户数据，user_ids 为空时加载全部用户"""
+        profitable = (
+            select(UserGameStats.user_id, func.sum(UserGameStats.profitable_games).label("profitable_games"))
+            .group_by(UserGameStats.user_id)
+            .subquery()
+        )
+        query = select(
+            User.id, User.username, User.credits, User.total_winnings, User.total_games_played,
+            profitable.c.profitable_games
+        ).outerjoin(profitable, profitable.c.user_id == User.id)
+
+        if user_ids is None:
+            rows = db.execute(query).all()
+        else:
+            ids = list(user_ids)
+            rows = []
+            for start in range(0, len(ids), RELOAD_BATCH_SIZE):
+                rows += db.execute(query.where(User.id.in_(ids[start:start + RELOAD_BATCH_SIZE]))).all()
+
+        # 最后读取版本：读取期间提交的对局即使未包含在结果中，其流水也会在下次同步时重新加载
+        version = db.execute(select(func.max(GameRecord.id))).scalar() or 0
+        return {
+            row.id: _Player(
+                username=row.username,
+                credits=row.credits or 0,
+                total_win=row.total_winnings or 0,
+                games=row.total_games_played or 0,
+                profitable_games=row.profitable_games or 0,
+                version=version
+            )
+            for row in rows
+        }
+
+    def _set_player(self, user_id: int, player: _Player):
+        self._players[user_id] = player
+        for board in self._boards.values():
+            board.update(user_id, player)
+
+    def _drop_player(self, user_id: int):
+        self._players.pop(user_id, None)
+        for board in self._boards.values():
+            board.remove(user_id)
+
+    def rebuild(self):
+        """从数据库整体加载（启动时、回填完成后和定期执行）"""
+        with self._session_factory() as db:
+            # 先取流水游标，加载期间的变动由增量同步补上
+            cursor = db.execute(select(func.max(CreditLedger.id))).scalar() or 0
+            incomplete = not is_backfilled(db, BACKFILL_JOB)
+            players = self._load_players(db)
+
+        boards = self._new_boards()
+        for user_id, player in players.items():
+            for board in boards.values():
+                board.update(user_id, player)
+        with self._lock:
+            self._players = players
+            self._boards = boards
+            self._ledger_cursor = cursor
+            self._incomplete = incomplete
+
+    def sync(self) -> int:
+        """重新加载流水游标之后余额有变动的用户，返回加载的用户数"""
+        if self._incomplete:
+            with self._session_factory() as db:
+                backfilled = is_backfilled(db, BACKFILL_JOB)
+            if backfilled:
+                self.rebuild()
+                return len(self._players)
+
+        with self._session_factory() as db:
+            cursor = db.execute(select(func.max(CreditLedger.id))).scalar() or 0
+            if cursor <= self._ledger_cursor:
+                return 0
+            user_ids = db.execute(
+                select(CreditLedger.user_id)
+                .where(CreditLedger.id > self._ledger_cursor, CreditLedger.id <= cursor)
+                .distinct()
+            ).scalars().all()
+            players = self._load_players(db, user_ids)
+
+        with self._lock:
+            for user_id in user_ids:
+                if user_id in players:
+                    self._set_player(user_id, players[user_id])
+                else:
+                    self._drop_player(user_id)
+            self._ledger_cursor = cursor
+        return len(user_ids)
+
+    def record_play(self, settlement: PlaySettlement):
+        """计入本进程的一局结算"""
+        with self._lock:
+            player = self._players.get(settlement.user_id)
+            # 新用户或已包含在加载结果中的对局，留给增量同步
+            if player is None or settlement.record_id <= player.version:
+                return
+            self._set_player(settlement.user_id, _Player(
+                username=player.username,
+                credits=settlement.credits_after,
+                total_win=player.total_win + settlement.prize_credits,
+                games=player.games + 1,
+                profitable_games=player.profitable_games + (1 if settlement.prize_credits > settlement.cost else 0),
+                version=settlement.record_id
+            ))
+
+    def remove(self, user_id: int):
+        """移除用户（删除用户时）"""
+        with self._lock:
+            self._drop_player(user_id)
+
+    def standing(self, board_name: str, user_id: int, limit: int) -> Standing:
+        """前 limit 名和用户的名次（并列时名次相同）；用户未上榜时名次为 None"""
+        with self._lock:
+            board = self._boards[board_name]
+            entries = []
+            for top_id in board.top(limit):
+                player = self._players[top_id]
+                entries.append((top_id, player.username, board.score(player), player.games))
+
+            player = self._players.get(user_id)
+            value = board.score(player) if player is not None else None
+            if value is None:
+                return Standing(entries=entries, user_rank=None, user_value=0)
+            return Standing(entries=entries, user_rank=board.count_above(value) + 1, user_value=value)
+
+
+leaderboards = Leaderboards()
+
+
+# 小时桶保留时长：本周最长 7 天，多留一天余量
+WINDOW_RETENTION_HOURS = 8 * 24
+
+
+def _hour_index(moment: datetime) -> int:
+    """UTC 时间所在的小时序号"""
+    return calendar.timegm(moment.timetuple()) // 3600
+
+
+@dataclass
+class WindowStanding:
+    """时间窗口排行榜查询结果：前几名 (用户ID, 分数, 局数)，以及当前用户的名次和分数"""
+    entries: List[Tuple[int, int, int]]
+    user_rank: Optional[int]
+    user_value: int
+
+
+class WindowLeaderboards:
+    """按小时分桶的时间窗口排行榜"""
+
+    NET_WIN = "net_win"
+    BIGGEST_WIN = "biggest_win"
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal):
+        self._session_factory = session_factory
+        self._lock = threading.Lock()
+        # 小时序号 -> 用户ID -> [净赢取, 最大奖励, 局数]
+        self._buckets: Dict[int, Dict[int, List[int]]] = {}
+        self._cursor = 0
+        # 本进程已计入、尚未被同步游标越过的记录 id
+        self._local_ids: Set[int] = set()
+
+    def _add(self, hour: int, user_id: int, net_win: int, prize: int, games: int = 1):
+        if hour <= _hour_index(datetime.utcnow()) - WINDOW_RETENTION_HOURS:
+            return
+        cell = self._buckets.setdefault(hour, {}).get(user_id)
+        if cell is None:
+            self._buckets[hour][user_id] = [net_win, prize, games]
+        else:
+            cell[0] += net_win
+            cell[1] = max(cell[1], prize)
+            cell[2] += games
+
+    def _rotate(self):
+        oldest = _hour_index(datetime.utcnow()) - WINDOW_RETENTION_HOURS
+        for hour in [hour for hour in self._buckets if hour <= oldest]:
+            del self._buckets[hour]
+
+    def load(self):
+        """从游戏记录加载保留时长内的小时桶（启动时）"""
+        now = datetime.utcnow()
+        start = now.replace(minute=0, second=0, microsecond=0) - timedelta(hours=WINDOW_RETENTION_HOURS - 1)
+        with self._session_factory() as db:
+            cursor = db.execute(select(func.max(GameRecord.id))).scalar() or 0
+            rows = []
+            for source in iter_game_records_sources(db, start, now):
+                bucket = func.strftime("%Y-%m-%d %H", source.created_at).label("bucket")
+                prize = func.coalesce(source.prize_credits, 0)
+                rows += db.query(
+                    bucket,
+                    source.user_id,
+                    func.sum(prize - source.game_cost).label("net_win"),
+                    func.max(prize).label("biggest_win"),
+                    func.count().label("games")
+                ).filter(
+                    source.created_at >= start, source.id <= cursor
+                ).group_by(bucket, source.user_id).all()
+
+        with self._lock:
+            self._buckets = {}
+            for row in rows:
+                hour = _hour_index(datetime.strptime(row.bucket, "%Y-%m-%d %H"))
+                self._add(hour, row.user_id, row.net_win, row.biggest_win, row.games)
+            self._cursor = cursor
+            self._local_ids = {record_id for record_id in self._local_ids if record_id > cursor}
+
+    def sync(self) -> int:
+        """增量计入其他进程的对局，返回新计入的数量"""
+        with self._session_factory() as db:
+            rows = db.execute(
+                select(
+                    GameRecord.id, GameRecord.user_id, GameRecord.created_at,
+                    GameRecord.game_cost, GameRecord.prize_credits
+                ).where(GameRecord.id > self._cursor).order_by(GameRecord.id)
+            ).all()
+        if not rows:
+            return 0
+
+        added = 0
+        with self._lock:
+            for row in rows:
+                if row.id in self._local_ids:
+                    self._local_ids.discard(row.id)
+                    continue
+                prize = row.prize_credits or 0
+                self._add(_hour_index(row.created_at), row.user_id, prize - row.game_cost, prize)
+                added += 1
+            self._cursor = max(self._cursor, rows[-1].id)
+            self._local_ids = {record_id for record_id in self._local_ids if record_id > self._cursor}
+            self._rotate()
+        return added
+
+    def record_play(self, settlement: PlaySettlement):
+        """计入本进程的一局结算"""
+        with self._lock:
+            if settlement.record_id <= self._cursor or settlement.record_id in self._local_ids:
+                return
+            self._local_ids.add(settlement.record_id)
+            prize = settlement.prize_credits or 0
+            self._add(_hour_index(datetime.utcnow()), settlement.user_id, prize - settlement.cost, prize)
+
+    @staticmethod
+    def window_start(window: LeaderboardWindow, now: datetime) -> datetime:
+        """窗口的起始时间（UTC）"""
+        hour_start = now.replace(minute=0, second=0, microsecond=0)
+        if window == LeaderboardWindow.LAST_24H:
+            return hour_start - timedelta(hours=23)
+        day_start = hour_start.replace(hour=0)
+        if window == LeaderboardWindow.WEEK:
+            return day_start - timedelta(days=day_start.weekday())
+        return day_start
+
+    def standing(self, kind: str, window: LeaderboardWindow, user_id: int, limit: int) -> WindowStanding:
+        """窗口内的前 limit 名和用户的名次（并列时名次相同）；用户在窗口内没有对局时名次为 None"""
+        now = datetime.utcnow()
+        first_hour = _hour_index(self.window_start(window, now))
+        last_hour = _hour_index(now)
+        column = 0 if kind == self.NET_WIN else 1
+
+        merged: Dict[int, List[int]] = {}
+        with self._lock:
+            for hour in range(first_hour, last_hour + 1):
+                for cell_user, (net_win, prize, games) in self._buckets.get(hour, {}).items():
+                    totals = merged.get(cell_user)
+                    if totals is None:
+                        merged[cell_user] = [net_win, prize, games]
+                    else:
+                        totals[0] += net_win
+                        totals[1] = max(totals[1], prize)
+                        totals[2] += games
+
+        top = heapq.nsmallest(limit, merged.items(), key=lambda item: (-item[1][column], item[0]))
+        entries = [(top_id, totals[column], totals[2]) for top_id, totals in top]
+        mine = merged.get(user_id)
+        if mine is None:
+            return WindowStanding(entries=entries, user_rank=None, user_value=0)
+        rank = sum(1 for totals in merged.values() if totals[column] > mine[column]) + 1
+        return WindowStanding(entries=entries, user_rank=rank, user_value=mine[column])
+
+
+window_leaderboards = WindowLeaderboards()
+
+
+@register_post_commit_hook
+def record_play(settlement: PlaySettlement):
+    """提交后钩子：更新本进程的排行榜"""
+    leaderboards.record_play(settlement)
+    window_leaderboards.record_play(settlement)
+
+
+async def run_leaderboard_sync():
+    """后台任务：增量同步其他进程的余额变动和对局，定期整体重建"""
+    interval = settings.leaderboard_sync_seconds
+    rebuild_interval = settings.leaderboard_rebuild_minutes * 60
+    last_rebuild = time.monotonic()
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            if time.monotonic() - last_rebuild >= rebuild_interval:
+                last_rebuild = time.monotonic()
+                await run_in_threadpool(leaderboards.rebuild)
+            else:
+                await run_in_threadpool(leaderboards.sync)
+            await run_in_threadpool(window_leaderboards.sync)
+        except Exception as e:
+            logger.error(f"排行榜同步失败: {e}")
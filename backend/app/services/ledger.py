@@ -0,0 +1,182 @@
+"""
+金额流水服务
+
+所有余额变动都通过这里完成：余额用单条原子 UPDATE 修改，同一事务内批量写入
+对应的流水。后台任务定期为流水较多的用户生成余额快照，查询历史时刻的余额时
+只需读取一条快照加上其后有限的流水。
+"""
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from ..config import settings
+from ..database import SessionLocal
+from ..models.credit import CreditLedger, CreditSnapshot, LedgerReason
+from ..models.user import User
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class InsufficientCreditsError(Exception):
+    """余额不足"""
+
+
+def ledger_entry(
+    user_id: int,
+    delta: int,
+    reason: LedgerReason,
+    ref_type: Optional[str] = None,
+    ref_id: Optional[int] = None,
+    description: Optional[str] = None
+) -> Dict[str, Any]:
+    """构造一条流水"""
+    return {
+        "user_id": user_id,
+        "delta": delta,
+        "reason": reason.value,
+        "ref_type": ref_type,
+        "ref_id": ref_id,
+        "description": description,
+    }
+
+
+def append_entries(db: Session, entries: List[Dict[str, Any]]):
+    """批量写入流水，随调用方的事务一起提交"""
+    if entries:
+        db.execute(insert(CreditLedger), entries)
+
+
+def apply_credit_delta(db: Session, user_id: int, delta: int, required: int = 0) -> int:
+    """原子地修改用户余额，返回修改后的余额
+
+    required 为执行前余额至少需要的金额（如游戏消耗），并且修改后余额不能为负，
+    不满足时抛出 InsufficientCreditsError。会话中已加载的 User 对象会同步更新。
+    """
+    new_credits = db.execute(
+        update(User)
+        .where(
+            User.id == user_id,
+            User.credits >= required,
+            User.credits + delta >= 0
+        )
+        .values(credits=User.credits + delta)
+        .returning(User.credits)
+    ).scalar()
+
+    if new_credits is None:
+        raise InsufficientCreditsError("积分不足")
+    return new_credits
+
+
+def record_opening_credits(db: Session, user: User, reason: LedgerReason = LedgerReason.REGISTER):
+    """为新用户写入初始余额流水（需在 flush 之后调用，以获得用户ID）"""
+    if user.credits:
+        append_entries(db, [ledger_entry(user.id, user.credits, reason, description="初始金额")])
+
+
+def adjust_credits(
+    db: Session,
+    user_id: int,
+    delta: int,
+    reason: LedgerReason = LedgerReason.ADMIN_ADJUST,
+    ref_type: Optional[str] = None,
+    ref_id: Optional[int] = None,
+    description: Optional[str] = None
+) -> int:
+    """调整用户余额并记录流水，返回调整后的余额（不提交事务）"""
+    new_credits = apply_credit_delta(db, user_id, delta)
+    append_entries(db, [ledger_entry(user_id, delta, reason, ref_type, ref_id, description)])
+    return new_credits
+
+
+def take_snapshots(db: Session, min_entries: Optional[int] = None) -> int:
+    """为自上次快照以来流水数达到阈值的用户生成余额快照，返回生成数量"""
+    min_entries = min_entries or settings.credit_snapshot_interval
+
+    last_snapshot_ledger_id = (
+        select(func.max(CreditSnapshot.ledger_id))
+        .where(CreditSnapshot.user_id == User.id)
+        .correlate(User)
+        .scalar_subquery()
+    )
+    users = db.execute(select(User.id, last_snapshot_ledger_id)).all()
+
+    created = 0
+    for user_id, last_ledger_id in users:
+        last_ledger_id = last_ledger_id or 0
+        count, total, max_id = db.execute(
+            select(func.count(), func.sum(CreditLedger.delta), func.max(CreditLedger.id))
+            .where(CreditLedger.user_id == user_id, CreditLedger.id > last_ledger_id)
+        ).one()
+        if count < min_entries:
+            continue
+
+        last_balance = db.execute(
+            select(CreditSnapshot.balance)
+            .where(CreditSnapshot.user_id == user_id, CreditSnapshot.ledger_id == last_ledger_id)
+        ).scalar() or 0
+        ledger_created_at = db.execute(
+            select(CreditLedger.created_at).where(CreditLedger.id == max_id)
+        ).scalar()
+        db.add(CreditSnapshot(
+            user_id=user_id,
+            balance=last_balance + total,
+            ledger_id=max_id,
+            ledger_created_at=ledger_created_at
+        ))
+        created += 1
+
+    db.commit()
+    return created
+
+
+def balance_at(db: Session, user_id: int, at: datetime) -> int:
+    """还原用户在某一时刻的余额
+
+    读取该时刻之前最近的一条快照，再加上快照之后、下一条快照之前且不晚于该时刻的流水。
+    """
+    snapshot = db.execute(
+        select(CreditSnapshot.balance, CreditSnapshot.ledger_id)
+        .where(CreditSnapshot.user_id == user_id, CreditSnapshot.ledger_created_at <= at)
+        .order_by(CreditSnapshot.ledger_created_at.desc(), CreditSnapshot.ledger_id.desc())
+        .limit(1)
+    ).first()
+    base_balance, base_ledger_id = snapshot if snapshot else (0, 0)
+
+    next_ledger_id = db.execute(
+        select(CreditSnapshot.ledger_id)
+        .where(CreditSnapshot.user_id == user_id, CreditSnapshot.ledger_id > base_ledger_id)
+        .order_by(CreditSnapshot.ledger_id)
+        .limit(1)
+    ).scalar()
+
+    tail = select(func.sum(CreditLedger.delta)).where(
+        CreditLedger.user_id == user_id,
+        CreditLedger.id > base_ledger_id,
+        CreditLedger.created_at <= at
+    )
+    if next_ledger_id is not None:
+        tail = tail.where(CreditLedger.id <= next_ledger_id)
+
+    return base_balance + (db.execute(tail).scalar() or 0)
+
+
+def _take_snapshots_job() -> int:
+    with SessionLocal() as db:
+        return take_snapshots(db)
+
+
+async def run_snapshot_scheduler():
+    """后台快照任务"""
+    interval = settings.credit_snapshot_check_minutes * 60
+    while True:
+        try:
+            created = await run_in_threadpool(_take_snapshots_job)
+            if created:
+                logger.info(f"已生成 {created} 条余额快照")
+        except Exception as e:
+            logger.error(f"生成余额快照失败: {e}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,180 @@
+"""
+实时推送服务
+
+/api/stats/live 的 SSE 和 WebSocket 订阅者共用一个广播器：后台任务每隔
+live_status_interval_seconds 计算一次实时状态（与订阅者数量无关），只推送变化的字段；
+本进程结算的大奖在提交后立即推送，其他进程的大奖随下一次状态变化推送。
+/api/stats/live-status 轮询时同样读取广播器最近一次计算的状态。
+
+每个订阅者有独立的有界队列。队列满时丢弃积压的消息，改为放入一份完整状态让客户端
+重新同步，慢客户端不会阻塞广播或其他订阅者。
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Set
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from ..config import settings
+from ..database import ReadSessionLocal
+from ..models.game import BIG_WIN_CREDITS
+from ..schemas.game import GameEvent
+from .activity import activity_metrics
+from .big_wins import big_wins
+from .hourly_stats import popular_games
+from .settlement import PlaySettlement, register_post_commit_hook
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 最近一次 /live-status 轮询之后继续定时计算状态的时长（秒）
+POLL_DEMAND_SECONDS = 30
+
+
+class LiveCapacityExceeded(Exception):
+    """订阅者数量已达上限"""
+
+
+def compute_live_status(db: Session) -> Dict[str, Any]:
+    """计算实时游戏状态（可直接序列化为 JSON）"""
+    # 最近1小时的去重玩家数和最近10分钟的游戏数，读取内存实时统计
+    online_players = activity_metrics.totals("1h").players
+    active_games = activity_metrics.totals("10m", players=False).plays
+
+    # 最近的大奖，读取内存缓存
+    big_wins_data = [
+        {
+            "username": win.username,
+            "game_type": win.game_type,
+            "win_amount": win.win_amount,
+            "timestamp": win.created_at
+        }
+        for win in big_wins.recent(5)
+    ]
+
+    # 获取热门游戏（最近24小时，由小时汇总求和）
+    now = datetime.utcnow()
+    hot_games = [
+        f"{game_type}:{template_id}"
+        for game_type, template_id, _, _ in popular_games(db, now - timedelta(hours=24), now, limit=3)
+    ]
+
+    return jsonable_encoder({
+        "online_players": online_players,
+        "active_games": active_games,
+        "recent_big_wins": big_wins_data,
+        "hot_games": hot_games
+    })
+
+
+def _compute_status_job() -> Dict[str, Any]:
+    with ReadSessionLocal() as db:
+        return compute_live_status(db)
+
+
+class LiveSubscriber:
+    """一个订阅连接，消息为 {"event": 事件名, "data": 内容}"""
+
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.resyncs = 0
+
+
+class LiveBroadcaster:
+    """实时状态和大奖事件的广播器"""
+
+    def __init__(self, interval: Optional[float] = None, queue_size: Optional[int] = None,
+                 max_subscribers: Optional[int] = None):
+        self.interval = interval or settings.live_status_interval_seconds
+        self.queue_size = queue_size or settings.live_queue_size
+        self.max_subscribers = max_subscribers or settings.live_max_subscribers
+        self._subscribers: Set[LiveSubscriber] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._status: Optional[Dict[str, Any]] = None
+        self._status_at = 0.0
+        self._polled_at = 0.0
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> LiveSubscriber:
+        """新增订阅者（在事件循环中调用），先放入当前的完整状态"""
+        if len(self._subscribers) >= self.max_subscribers:
+            raise LiveCapacityExceeded()
+        subscriber = LiveSubscriber(self.queue_size)
+        if self._status is not None:
+            subscriber.queue.put_nowait({"event": "status", "data": self._status})
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: LiveSubscriber):
+        self._subscribers.discard(subscriber)
+
+    def _resync(self, subscriber: LiveSubscriber):
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.resyncs += 1
+        subscriber.queue.put_nowait({"event": "status", "data": self._status or {}, "resync": True})
+
+    def _deliver(self, message: Dict[str, Any]):
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                self._resync(subscriber)
+
+    def publish(self, event: str, data: Dict[str, Any]):
+        """推送事件，可在任意线程调用"""
+        loop = self._loop
+        if loop is None or not self._subscribers:
+            return
+        loop.call_soon_threadsafe(self._deliver, {"event": event, "data": data})
+
+    def latest_status(self) -> Optional[Dict[str, Any]]:
+        """最近一次计算的状态，超过计算间隔时返回 None；同时让后台任务继续定时计算"""
+        self._polled_at = time.monotonic()
+        if self._status is None or time.monotonic() - self._status_at > self.interval * 2:
+            return None
+        return self._status
+
+    async def run(self):
+        """后台任务：有订阅者或近期有轮询时定时计算状态，推送变化的字段"""
+        self._loop = asyncio.get_running_loop()
+        while True:
+            try:
+                polled = time.monotonic() - self._polled_at < POLL_DEMAND_SECONDS
+                if self._subscribers or polled:
+                    status = await run_in_threadpool(_compute_status_job)
+                    previous = self._status or {}
+                    changes = {key: value for key, value in status.items() if previous.get(key) != value}
+                    self._status = status
+                    self._status_at = time.monotonic()
+                    if changes:
+                        self._deliver({"event": "status", "data": changes})
+            except Exception as e:
+                logger.error(f"实时状态计算失败: {e}")
+            await asyncio.sleep(self.interval)
+
+
+live_broadcaster = LiveBroadcaster()
+
+
+@register_post_commit_hook
+def push_big_win(settlement: PlaySettlement):
+    """提交后钩子：推送本进程结算的大奖"""
+    if settlement.prize_credits < BIG_WIN_CREDITS:
+        return
+    event_type = "jackpot" if settlement.prize_credits >= settings.slot_machine_jackpot else "big_win"
+    event = GameEvent(
+        event_type=event_type,
+        user_id=settlement.user_id,
+        username=settlement.username,
+        game_type=settlement.game_type,
+        template_id=settlement.template_id,
+        amount=settlement.prize_credits,
+        timestamp=settlement.settled_at,
+        details={"record_id": settlement.record_id, "prize_name": settlement.prize_name}
+    )
+    live_broadcaster.publish(event_type, event.model_dump(mode="json"))
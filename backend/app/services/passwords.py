@@ -0,0 +1,133 @@
+"""
+密码哈希进程池
+
+bcrypt 是刻意放慢的 CPU 运算，放在请求线程中执行时，登录高峰会占满同步接口共用的
+线程池。注册、登录、修改密码等接口把哈希和校验交给独立的进程池，正在执行和排队的
+数量有上限，超出时立即拒绝（503），不在线程池中堆积请求。
+"""
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+from ..config import settings
+from ..core.security import hash_password_with_rounds, verify_and_rehash
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordPoolBusy(Exception):
+    """密码进程池排队已满"""
+
+
+@dataclass
+class _OperationMetrics:
+    """单类操作的耗时统计（从提交到返回，含排队时间）"""
+    count: int = 0
+    failed: int = 0
+    rejected: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+
+    def record(self, seconds: float):
+        self.count += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "avg_ms": round(self.total_seconds / self.count * 1000, 2) if self.count else 0.0,
+            "max_ms": round(self.max_seconds * 1000, 2),
+        }
+
+
+class PasswordPool:
+    """容量有限的密码哈希进程池"""
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        rounds: Optional[int] = None
+    ):
+        self.workers = workers or settings.password_pool_workers
+        self.queue_size = settings.password_pool_queue_size if queue_size is None else queue_size
+        self.rounds = rounds or settings.bcrypt_rounds
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self._metrics = {"hash": _OperationMetrics(), "verify": _OperationMetrics()}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # 服务进程中有多个线程，用 spawn 启动子进程，避免 fork 复制持有中的锁
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    async def _run(self, operation: str, fn: Callable, *args):
+        metrics = self._metrics[operation]
+        with self._lock:
+            if self._pending >= self.workers + self.queue_size:
+                metrics.rejected += 1
+                raise PasswordPoolBusy()
+            self._pending += 1
+
+        started = time.perf_counter()
+        executor = self._get_executor()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+        except BrokenProcessPool:
+            # 子进程异常退出后进程池不可再用，下次调用时重建
+            with self._lock:
+                metrics.failed += 1
+                if self._executor is executor:
+                    self._executor = None
+            logger.error("密码进程池异常退出，已重建")
+            raise
+        except Exception:
+            with self._lock:
+                metrics.failed += 1
+            raise
+        finally:
+            with self._lock:
+                self._pending -= 1
+                metrics.record(time.perf_counter() - started)
+
+    async def hash(self, password: str) -> str:
+        """生成密码哈希"""
+        return await self._run("hash", hash_password_with_rounds, password, self.rounds)
+
+    async def verify(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """验证密码，哈希成本与配置不一致时同时返回新的哈希（调用方负责保存）"""
+        return await self._run("verify", verify_and_rehash, password, hashed_password, self.rounds)
+
+    def stats(self) -> Dict[str, Any]:
+        """进程池状态和各操作耗时"""
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_size": self.queue_size,
+                "bcrypt_rounds": self.rounds,
+                "pending": self._pending,
+                "operations": {name: metrics.snapshot() for name, metrics in self._metrics.items()},
+            }
+
+    def close(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_pool = PasswordPool()
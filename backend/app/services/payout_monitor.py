@@ -0,0 +1,241 @@
+"""
+派奖分布监控
+
+按模板持续累计实际派奖（与 settle_play 一致，负数奖励不扣减余额，按 0 计）：对局数、
+成本和派奖合计（返奖率 RTP）、派奖的均值和方差（Welford）以及分位数（t-digest），
+每局结算 O(1) 更新。每局同时按配置的概率计算期望派奖（老虎机按押注线数，口径同样
+是实际派发的积分），实际与期望之差的均值超出置信区间时判定为偏离并记录告警日志。
+
+启动时加载最近 payout_monitor_days 天的游戏记录（按派奖金额分组，不逐条读取），
+本进程的结算由提交后钩子计入，其他进程的对局由后台任务按记录 id 增量同步。
+"""
+import asyncio
+import math
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from ..config import settings
+from ..core.streaming import RunningMoments, TDigest
+from ..database import SessionLocal
+from ..games import scratch_card_game, slot_machine_game, wheel_fortune_game
+from ..models.game import GameRecord
+from ..utils.partitions import iter_game_records_sources
+from .settlement import PlaySettlement, register_post_commit_hook
+import logging
+
+logger = logging.getLogger(__name__)
+
+QUANTILES = {"p50": 0.5, "p90": 0.9, "p99": 0.99, "p999": 0.999}
+
+
+def expected_payout(game_type: str, template_id: str, cost: int) -> Optional[float]:
+    """按配置概率计算一局的期望派奖，模板不存在时返回 None"""
+    try:
+        if game_type == "scratch_card":
+            return scratch_card_game.expected_payout(template_id)
+        if game_type == "wheel_fortune":
+            return wheel_fortune_game.expected_payout(template_id)
+        if game_type == "slot_machine":
+            line_cost = slot_machine_game.templates[template_id].cost
+            return slot_machine_game.expected_payout(template_id, max(cost // line_cost, 1))
+    except KeyError:
+        return None
+    return None
+
+
+@dataclass
+class TemplateMonitor:
+    """一个模板的派奖统计"""
+    game_type: str
+    template_id: str
+    plays: int = 0
+    cost: int = 0
+    payout: int = 0
+    expected: float = 0.0
+    moments: RunningMoments = field(default_factory=RunningMoments)
+    # 实际派奖 - 期望派奖，模板没有配置概率时为 None
+    residuals: Optional[RunningMoments] = field(default_factory=RunningMoments)
+    digest: TDigest = field(default_factory=TDigest)
+    drifting: bool = False
+
+    def add(self, cost: int, payout: int, expected: Optional[float], count: int = 1):
+        self.plays += count
+        self.cost += cost * count
+        self.payout += payout * count
+        self.moments.add(payout, count)
+        self.digest.add(payout, count)
+        if expected is None:
+            self.residuals = None
+        elif self.residuals is not None:
+            self.expected += expected * count
+            self.residuals.add(payout - expected, count)
+
+    def z_score(self) -> Optional[float]:
+        """实际与期望派奖之差的 z 值"""
+        residuals = self.residuals
+        if residuals is None or residuals.count < 2:
+            return None
+        if residuals.std == 0:
+            return 0.0 if residuals.mean == 0 else math.copysign(math.inf, residuals.mean)
+        return residuals.mean / (residuals.std / math.sqrt(residuals.count))
+
+    def check_drift(self) -> bool:
+        """更新偏离状态，返回状态是否变化"""
+        z = self.z_score()
+        drifting = (
+            z is not None
+            and self.plays >= settings.payout_monitor_min_plays
+            and abs(z) > settings.payout_monitor_z
+        )
+        changed = drifting != self.drifting
+        self.drifting = drifting
+        return changed
+
+    def report(self) -> Dict:
+        rtp = self.payout / self.cost if self.cost else None
+        expected_rtp = rtp_bound = None
+        if self.residuals is not None and self.cost:
+            expected_rtp = self.expected / self.cost
+            # RTP 的置信区间半径：z * 差值标准差 * sqrt(n) / 总成本
+            rtp_bound = settings.payout_monitor_z * self.residuals.std * math.sqrt(self.plays) / self.cost
+        z = self.z_score()
+        return {
+            "game_type": self.game_type,
+            "template_id": self.template_id,
+            "plays": self.plays,
+            "total_cost": self.cost,
+            "total_payout": self.payout,
+            "rtp": rtp,
+            "expected_rtp": expected_rtp,
+            "rtp_bound": rtp_bound,
+            "payout_mean": self.moments.mean,
+            "payout_std": self.moments.std,
+            "payout_quantiles": {name: self.digest.quantile(q) for name, q in QUANTILES.items()},
+            "z_score": z if z is None or math.isfinite(z) else None,
+            "drifting": self.drifting
+        }
+
+
+class PayoutMonitor:
+    """各模板的派奖统计"""
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal):
+        self._session_factory = session_factory
+        self._lock = threading.Lock()
+        self._templates: Dict[Tuple[str, str], TemplateMonitor] = {}
+        self._expected: Dict[Tuple[str, str, int], Optional[float]] = {}
+        self._cursor = 0
+        # 本进程已计入、尚未被同步游标越过的记录 id
+        self._local_ids: Set[int] = set()
+
+    def _expected_payout(self, game_type: str, template_id: str, cost: int) -> Optional[float]:
+        key = (game_type, template_id, cost)
+        if key not in self._expected:
+            self._expected[key] = expected_payout(game_type, template_id, cost)
+        return self._expected[key]
+
+    def _add(self, game_type: str, template_id: str, cost: int, payout: int, count: int = 1):
+        monitor = self._templates.get((game_type, template_id))
+        if monitor is None:
+            monitor = self._templates[(game_type, template_id)] = TemplateMonitor(game_type, template_id)
+        monitor.add(cost, payout, self._expected_payout(game_type, template_id, cost), count)
+        if monitor.check_drift():
+            report = monitor.report()
+            if monitor.drifting:
+                logger.warning(
+                    f"派奖偏离: {game_type}:{template_id} RTP {report['rtp']:.4f}，"
+                    f"期望 {report['expected_rtp']:.4f} ± {report['rtp_bound']:.4f}（{monitor.plays} 局）"
+                )
+            else:
+                logger.info(f"派奖恢复正常: {game_type}:{template_id}")
+
+    def load(self):
+        """加载最近 payout_monitor_days 天的游戏记录（启动时）"""
+        # 预先枚举老虎机各模板的支付线期望，避免在结算钩子中计算
+        for template_id, template in slot_machine_game.templates.items():
+            slot_machine_game.expected_payout(template_id)
+
+        now = datetime.utcnow()
+        start = now - timedelta(days=settings.payout_monitor_days)
+        with self._session_factory() as db:
+            cursor = db.execute(select(func.max(GameRecord.id))).scalar() or 0
+            rows = []
+            for source in iter_game_records_sources(db, start, now):
+                payout = func.max(func.coalesce(source.prize_credits, 0), 0).label("payout")
+                rows += db.query(
+                    source.game_type, source.template_id, source.game_cost, payout, func.count().label("plays")
+                ).filter(
+                    source.created_at >= start, source.id <= cursor
+                ).group_by(source.game_type, source.template_id, source.game_cost, payout).all()
+
+        with self._lock:
+            self._templates = {}
+            for row in rows:
+                self._add(row.game_type, row.template_id, row.game_cost, row.payout, row.plays)
+            self._cursor = cursor
+            self._local_ids = {record_id for record_id in self._local_ids if record_id > cursor}
+
+    def sync(self) -> int:
+        """增量计入其他进程的对局，返回新计入的数量"""
+        with self._session_factory() as db:
+            rows = db.execute(
+                select(
+                    GameRecord.id, GameRecord.game_type, GameRecord.template_id,
+                    GameRecord.game_cost, GameRecord.prize_credits
+                ).where(GameRecord.id > self._cursor).order_by(GameRecord.id)
+            ).all()
+        if not rows:
+            return 0
+
+        added = 0
+        with self._lock:
+            for row in rows:
+                if row.id in self._local_ids:
+                    self._local_ids.discard(row.id)
+                    continue
+                self._add(row.game_type, row.template_id, row.game_cost, max(row.prize_credits or 0, 0))
+                added += 1
+            self._cursor = max(self._cursor, rows[-1].id)
+            self._local_ids = {record_id for record_id in self._local_ids if record_id > self._cursor}
+        return added
+
+    def record_play(self, settlement: PlaySettlement):
+        """计入本进程的一局结算"""
+        with self._lock:
+            if settlement.record_id <= self._cursor or settlement.record_id in self._local_ids:
+                return
+            self._local_ids.add(settlement.record_id)
+            self._add(settlement.game_type, settlement.template_id, settlement.cost, max(settlement.prize_credits, 0))
+
+    def report(self, game_type: Optional[str] = None) -> List[Dict]:
+        """各模板的统计，按游戏类型和模板排序"""
+        with self._lock:
+            return [
+                monitor.report()
+                for key, monitor in sorted(self._templates.items())
+                if game_type is None or key[0] == game_type
+            ]
+
+
+payout_monitor = PayoutMonitor()
+
+
+@register_post_commit_hook
+def record_payout(settlement: PlaySettlement):
+    """提交后钩子：计入派奖统计"""
+    payout_monitor.record_play(settlement)
+
+
+async def run_payout_monitor_sync():
+    """后台任务：增量同步其他进程的对局"""
+    interval = settings.payout_monitor_sync_seconds
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_threadpool(payout_monitor.sync)
+        except Exception as e:
+            logger.error(f"派奖监控同步失败: {e}")
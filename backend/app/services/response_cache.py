@@ -0,0 +1,90 @@
+"""
+接口响应缓存
+
+统计和管理后台的只读接口按 (路由, 权限范围, 规范化后的查询参数) 缓存计算结果：
+管理员共用一份，普通用户按用户区分。各路由的新鲜期见 settings.response_cache_ttls，
+过期后 response_cache_stale_seconds 秒内先返回旧结果并在后台刷新；同时到达的相同
+请求只计算一次（见 SingleFlightCache）。计算在线程池中使用独立的只读会话，
+不依赖请求的数据库会话。
+
+管理员修改用户数据后调用 invalidate_responses，清除管理员范围和该用户的缓存。
+"""
+from typing import Any, Callable, Hashable, Optional, Tuple, TypeVar
+from fastapi import Response
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from ..config import settings
+from ..core.cache import SingleFlightCache
+from ..core.deps import Principal
+from ..database import ReadSessionLocal
+
+T = TypeVar("T")
+
+ADMIN_SCOPE = "admin"
+
+response_cache: SingleFlightCache[Any] = SingleFlightCache(maxsize=settings.response_cache_size)
+
+
+def user_scope(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+def role_scope(principal: Principal) -> str:
+    """管理员共用一份缓存，普通用户各自一份"""
+    return ADMIN_SCOPE if principal.is_admin else user_scope(principal.id)
+
+
+def _normalize(value: Any) -> Hashable:
+    """把查询参数转换为可比较的键：字典按键排序并去掉空值，列表按内容排序"""
+    if isinstance(value, BaseModel):
+        value = value.model_dump()
+    if isinstance(value, dict):
+        return tuple(sorted((key, _normalize(item)) for key, item in value.items() if item is not None))
+    if isinstance(value, (list, tuple, set)):
+        return tuple(sorted((_normalize(item) for item in value), key=repr))
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+def _read_job(compute: Callable[[Session], T]) -> T:
+    with ReadSessionLocal() as db:
+        return compute(db)
+
+
+async def cached_response(
+    response: Response,
+    route: str,
+    scope: str,
+    params: Optional[dict],
+    compute: Callable[[Session], T]
+) -> T:
+    """读取或计算接口结果，并设置 HTTP 缓存头
+
+    compute 在线程池中以独立的只读会话执行，不能使用请求的会话。
+    """
+    ttl = settings.response_cache_ttls.get(route, 0)
+    if ttl <= 0:
+        value = await run_in_threadpool(_read_job, compute)
+        response.headers["Cache-Control"] = "no-store"
+        return value
+
+    stale = settings.response_cache_stale_seconds
+    key: Tuple[Hashable, ...] = (route, scope, _normalize(params or {}))
+    value, age, state = await response_cache.get(
+        key, lambda: run_in_threadpool(_read_job, compute), ttl, stale
+    )
+    max_age = max(int(ttl - age), 0)
+    response.headers["Cache-Control"] = f"private, max-age={max_age}, stale-while-revalidate={stale}"
+    response.headers["Age"] = str(int(age))
+    response.headers["X-Cache"] = state
+    return value
+
+
+def invalidate_responses(user_id: Optional[int] = None) -> int:
+    """管理员操作后清除管理员范围的缓存（和指定用户的缓存），返回清除的条目数"""
+    scopes = {ADMIN_SCOPE}
+    if user_id is not None:
+        scopes.add(user_scope(user_id))
+    return response_cache.invalidate(lambda key: key[1] in scopes)
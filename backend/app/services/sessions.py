@@ -0,0 +1,177 @@
+"""
+登录会话服务（刷新令牌）
+
+登录时签发不透明的刷新令牌，数据库只保存其 SHA-256 摘要。访问令牌过期后客户端用
+刷新令牌换取新的访问令牌，只需按摘要查找会话和按主键读取用户，不再执行 bcrypt。
+
+刷新令牌一次有效：每次刷新都吊销当前令牌并签发新令牌。已吊销的令牌再次出现说明
+可能被盗用，整个会话族随之吊销。用户令牌版本变化（禁用、权限变更）后会话同样失效。
+"""
+import asyncio
+import hashlib
+import secrets
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from ..config import settings
+from ..core.cache import TTLCache
+from ..database import SessionLocal
+from ..models.session import UserSession
+from ..models.user import User
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidRefreshToken(Exception):
+    """刷新令牌无效、过期或已吊销"""
+
+
+@dataclass(frozen=True)
+class _CachedSession:
+    """会话的内存快照，命中时跳过按摘要查找"""
+    id: int
+    user_id: int
+    family_id: str
+    token_version: int
+    expires_at: datetime
+
+
+# 按令牌摘要缓存未使用的会话。条目取出即删除，其他进程已轮换的会话由条件更新识别
+session_cache: TTLCache[_CachedSession] = TTLCache(
+    settings.session_cache_size, settings.refresh_token_expire_days * 86400
+)
+
+
+def hash_refresh_token(refresh_token: str) -> str:
+    return hashlib.sha256(refresh_token.encode()).hexdigest()
+
+
+def create_session(db: Session, user: User, family_id: Optional[str] = None) -> str:
+    """为用户签发刷新令牌（不提交事务），返回令牌原文"""
+    refresh_token = secrets.token_urlsafe(32)
+    token_hash = hash_refresh_token(refresh_token)
+    expires_at = datetime.utcnow() + timedelta(days=settings.refresh_token_expire_days)
+    session = UserSession(
+        user_id=user.id,
+        token_hash=token_hash,
+        family_id=family_id or secrets.token_hex(16),
+        token_version=user.token_version or 0,
+        expires_at=expires_at
+    )
+    db.add(session)
+    db.flush()
+
+    session_cache.set(token_hash, _CachedSession(
+        id=session.id,
+        user_id=session.user_id,
+        family_id=session.family_id,
+        token_version=session.token_version,
+        expires_at=expires_at
+    ), ttl=(expires_at - datetime.utcnow()).total_seconds())
+    return refresh_token
+
+
+def _load_session(db: Session, token_hash: str) -> Optional[_CachedSession]:
+    row = db.execute(
+        select(
+            UserSession.id, UserSession.user_id, UserSession.family_id,
+            UserSession.token_version, UserSession.expires_at
+        ).where(UserSession.token_hash == token_hash)
+    ).first()
+    return _CachedSession(**row._mapping) if row else None
+
+
+def _revoke_family(db: Session, family_id: str):
+    sessions = UserSession.__table__
+    db.execute(
+        update(sessions)
+        .where(sessions.c.family_id == family_id, sessions.c.revoked_at.is_(None))
+        .values(revoked_at=datetime.utcnow())
+    )
+
+
+def rotate_session(db: Session, refresh_token: str) -> Tuple[User, str]:
+    """用刷新令牌换取新的刷新令牌（成功时不提交事务），返回用户和新令牌
+
+    令牌无效时抛出 InvalidRefreshToken，当前令牌的吊销在抛出前已提交。
+    """
+    token_hash = hash_refresh_token(refresh_token)
+    session = session_cache.pop(token_hash) or _load_session(db, token_hash)
+    if session is None:
+        raise InvalidRefreshToken()
+
+    # 条件更新吊销当前令牌，多个进程同时使用同一令牌时只有一个能成功
+    now = datetime.utcnow()
+    sessions = UserSession.__table__
+    rotated = db.execute(
+        update(sessions)
+        .where(sessions.c.id == session.id, sessions.c.revoked_at.is_(None))
+        .values(revoked_at=now)
+    ).rowcount
+    if not rotated:
+        logger.warning(f"刷新令牌重复使用，吊销会话族: user_id={session.user_id}")
+        _revoke_family(db, session.family_id)
+        db.commit()
+        raise InvalidRefreshToken()
+
+    user = db.get(User, session.user_id)
+    if (
+        session.expires_at <= now
+        or user is None
+        or not user.is_active
+        or (user.token_version or 0) != session.token_version
+    ):
+        db.commit()
+        raise InvalidRefreshToken()
+
+    return user, create_session(db, user, family_id=session.family_id)
+
+
+def revoke_session(db: Session, refresh_token: str) -> bool:
+    """吊销刷新令牌所在的会话族（登出，不提交事务），令牌无效时返回 False"""
+    token_hash = hash_refresh_token(refresh_token)
+    session = session_cache.pop(token_hash) or _load_session(db, token_hash)
+    if session is None:
+        return False
+    _revoke_family(db, session.family_id)
+    return True
+
+
+def delete_user_sessions(db: Session, user_id: int):
+    """删除用户的全部会话（不提交事务）"""
+    db.execute(delete(UserSession).where(UserSession.user_id == user_id))
+    session_cache.pop_where(lambda session: session.user_id == user_id)
+
+
+def purge_expired_sessions(db: Session) -> int:
+    """删除已过期的会话，返回删除数量
+
+    已吊销但未过期的会话保留到过期，以便识别被盗用的旧令牌。
+    """
+    deleted = db.execute(
+        delete(UserSession).where(UserSession.expires_at < datetime.utcnow())
+    ).rowcount
+    db.commit()
+    return deleted
+
+
+def _purge_expired_sessions_job() -> int:
+    with SessionLocal() as db:
+        return purge_expired_sessions(db)
+
+
+async def run_session_cleanup():
+    """后台任务：定期删除过期会话"""
+    interval = settings.session_cleanup_check_minutes * 60
+    while True:
+        try:
+            deleted = await run_in_threadpool(_purge_expired_sessions_job)
+            if deleted:
+                logger.info(f"已删除 {deleted} 个过期会话")
+        except Exception as e:
+            logger.error(f"删除过期会话失败: {e}")
+        await asyncio.sleep(interval)
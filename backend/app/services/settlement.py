@@ -0,0 +1,130 @@
+"""
+游戏结算服务
+
+三种游戏的扣费、派奖、游戏记录和金额流水统一在这里结算，保证在同一个事务内完成。
+需要随结算同步更新的数据（如统计汇总表）注册为事务内钩子，和结算一起提交或回滚；
+不影响结算结果的后续处理（如排行榜、实时推送）注册为提交后钩子，失败只记录日志。
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from sqlalchemy.orm import Session
+from ..models.credit import LedgerReason
+from ..models.game import GameRecord, BIG_WIN_CREDITS
+from ..models.user import User
+from .ledger import InsufficientCreditsError, apply_credit_delta, append_entries, ledger_entry
+import logging
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class PlaySettlement:
+    """一局游戏的结算结果"""
+    record_id: int
+    user_id: int
+    username: str
+    game_type: str
+    template_id: str
+    cost: int
+    prize_credits: int
+    prize_name: Optional[str]
+    is_winner: bool
+    credits_before: int
+    credits_after: int
+    settled_at: datetime  # UTC，与游戏记录的 created_at 一致（精确到秒）
+
+    @property
+    def net_win(self) -> int:
+        return self.prize_credits - self.cost
+
+
+SettlementHook = Callable[[Session, PlaySettlement], None]
+PostCommitHook = Callable[[PlaySettlement], None]
+
+_settlement_hooks: List[SettlementHook] = []
+_post_commit_hooks: List[PostCommitHook] = []
+
+
+def register_settlement_hook(hook: SettlementHook) -> SettlementHook:
+    """注册事务内钩子，异常会导致整局结算回滚"""
+    _settlement_hooks.append(hook)
+    return hook
+
+
+def register_post_commit_hook(hook: PostCommitHook) -> PostCommitHook:
+    """注册提交后钩子"""
+    _post_commit_hooks.append(hook)
+    return hook
+
+
+def settle_play(
+    db: Session,
+    user: User,
+    game_type: str,
+    template_id: str,
+    cost: int,
+    prize_credits: int,
+    prize_name: Optional[str],
+    is_winner: bool,
+    game_result: Dict[str, Any]
+) -> PlaySettlement:
+    """结算一局游戏并提交事务
+
+    余额不足时抛出 InsufficientCreditsError，事务不会有任何写入。
+    """
+    # 负数奖励不额外扣减余额，与原先各游戏接口的处理一致
+    payout = max(prize_credits, 0)
+    credits_after = apply_credit_delta(db, user.id, payout - cost, required=cost)
+    credits_before = credits_after - payout + cost
+
+    game_record = GameRecord(
+        user_id=user.id,
+        game_type=game_type,
+        template_id=template_id,
+        game_cost=cost,
+        game_result=game_result,
+        prize_name=prize_name,
+        prize_credits=prize_credits,
+        is_winner=is_winner,
+        credits_before=credits_before,
+        credits_after=credits_after
+    )
+    db.add(game_record)
+    db.flush()
+
+    entries = [
+        ledger_entry(user.id, -cost, LedgerReason.GAME_COST, "game_record", game_record.id, game_type)
+    ]
+    if payout:
+        reason = LedgerReason.JACKPOT if payout >= BIG_WIN_CREDITS else LedgerReason.GAME_WIN
+        entries.append(
+            ledger_entry(user.id, payout, reason, "game_record", game_record.id, prize_name)
+        )
+    append_entries(db, entries)
+
+    settlement = PlaySettlement(
+        record_id=game_record.id,
+        user_id=user.id,
+        username=user.username,
+        game_type=game_type,
+        template_id=template_id,
+        cost=cost,
+        prize_credits=prize_credits,
+        prize_name=prize_name,
+        is_winner=is_winner,
+        credits_before=credits_before,
+        credits_after=credits_after,
+        settled_at=datetime.utcnow().replace(microsecond=0)
+    )
+    for hook in _settlement_hooks:
+        hook(db, settlement)
+
+    db.commit()
+
+    for hook in _post_commit_hooks:
+        try:
+            hook(settlement)
+        except Exception as e:
+            logger.error(f"结算后处理失败 {getattr(hook, '__name__', hook)}: {e}")
+
+    return settlement
@@ -0,0 +1,125 @@
+"""
+用户游戏统计汇总服务
+
+user_game_stats 按 (用户, 游戏类型) 累计对局数、消耗、奖励和中奖次数，随每局
+结算在同一事务内更新；统计接口只需读取该用户的几行汇总，不再扫描游戏记录。
+users.total_games_played / total_winnings 同步累加。
+
+引入汇总表之前的历史记录由后台回填任务补齐（见 backfill）。
+"""
+from typing import Any, Dict, List, Optional
+from sqlalchemy import Table, bindparam, case, func, select, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from ..models.stats import UserGameStats
+from ..models.user import User
+from .backfill import run_backfill
+from .settlement import PlaySettlement, register_settlement_hook
+import logging
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_JOB = "user_game_stats"
+
+COUNTER_COLUMNS = ("game_count", "total_bet", "total_win", "winning_games", "profitable_games")
+
+
+def accumulate_stats(db: Session, rows: List[Dict[str, Any]]):
+    """把增量累加到汇总表和用户总计（不提交事务）
+
+    rows 中每项包含 user_id、game_type 以及 COUNTER_COLUMNS 中各计数的增量。
+    """
+    if not rows:
+        return
+
+    statement = insert(UserGameStats)
+    statement = statement.on_conflict_do_update(
+        index_elements=[UserGameStats.user_id, UserGameStats.game_type],
+        set_={
+            **{
+                name: getattr(UserGameStats, name) + getattr(statement.excluded, name)
+                for name in COUNTER_COLUMNS
+            },
+            "updated_at": func.now(),
+        }
+    )
+    db.execute(statement, rows)
+
+    totals: Dict[int, List[int]] = {}
+    for row in rows:
+        total = totals.setdefault(row["user_id"], [0, 0])
+        total[0] += row["game_count"]
+        total[1] += row["total_win"]
+
+    users = User.__table__
+    db.execute(
+        update(users)
+        .where(users.c.id == bindparam("target_id"))
+        .values(
+            total_games_played=users.c.total_games_played + bindparam("games"),
+            total_winnings=users.c.total_winnings + bindparam("winnings")
+        ),
+        [
+            {"target_id": user_id, "games": games, "winnings": winnings}
+            for user_id, (games, winnings) in totals.items()
+        ]
+    )
+
+
+@register_settlement_hook
+def accumulate_play(db: Session, settlement: PlaySettlement):
+    """结算钩子：累加本局数据"""
+    accumulate_stats(db, [{
+        "user_id": settlement.user_id,
+        "game_type": settlement.game_type,
+        "game_count": 1,
+        "total_bet": settlement.cost,
+        "total_win": settlement.prize_credits,
+        "winning_games": 1 if settlement.is_winner else 0,
+        "profitable_games": 1 if settlement.prize_credits > settlement.cost else 0,
+    }])
+
+
+def get_user_game_stats(db: Session, user_id: int) -> List[UserGameStats]:
+    """用户各游戏类型的汇总"""
+    return db.query(UserGameStats).filter(UserGameStats.user_id == user_id).all()
+
+
+def _aggregate_chunk(table: Table, low: int, high: int):
+    """某个分区中 id 在 (low, high] 内的记录按用户和游戏类型聚合"""
+    prize = func.coalesce(table.c.prize_credits, 0)
+    return (
+        select(
+            table.c.user_id,
+            table.c.game_type,
+            func.count().label("game_count"),
+            func.sum(table.c.game_cost).label("total_bet"),
+            func.sum(prize).label("total_win"),
+            func.sum(case((table.c.is_winner == True, 1), else_=0)).label("winning_games"),
+            func.sum(case((prize > table.c.game_cost, 1), else_=0)).label("profitable_games"),
+        )
+        .where(table.c.id > low, table.c.id <= high)
+        .group_by(table.c.user_id, table.c.game_type)
+    )
+
+
+def _backfill_chunk(db: Session, table: Table, low: int, high: int) -> int:
+    rows = [dict(row._mapping) for row in db.execute(_aggregate_chunk(table, low, high))]
+    accumulate_stats(db, rows)
+    return sum(row["game_count"] for row in rows)
+
+
+def backfill_user_game_stats(db: Optional[Session] = None) -> Optional[int]:
+    """回填截止点之前的历史记录，返回本次处理的记录数，已完成时返回 None"""
+    return run_backfill(BACKFILL_JOB, _backfill_chunk, db)
+
+
+async def run_stats_backfill():
+    """后台回填任务"""
+    try:
+        processed = await run_in_threadpool(backfill_user_game_stats)
+        if processed is not None:
+            logger.info(f"统计汇总回填完成，共 {processed} 条记录")
+    except Exception as e:
+        logger.error(f"统计汇总回填失败，下次启动时从中断处继续: {e}")
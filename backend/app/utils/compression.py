@@ -0,0 +1,238 @@
+"""
+游戏结果 JSON 压缩编解码
+
+game_result 以 "标记字节 + 压缩数据" 的二进制形式存储，标记字节区分压缩算法：
+
+    0x01 zlib            0x02 zlib + 字典
+    0x03 zstd            0x04 zstd + 字典
+
+带字典的格式在标记字节后附加 4 字节字典 id（字典内容的 crc32），解压时按 id
+从字典目录中查找，因此更换字典后旧数据仍可读取。未压缩的旧数据（JSON 文本）
+按原样解析。zstd 需要安装 zstandard，未安装时回退到 zlib。
+
+训练字典：python -m app.utils.compression train
+"""
+import json
+import struct
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+from ..config import settings
+import logging
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - 可选依赖
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+MARKER_ZLIB = 0x01
+MARKER_ZLIB_DICT = 0x02
+MARKER_ZSTD = 0x03
+MARKER_ZSTD_DICT = 0x04
+
+DICT_ID_STRUCT = struct.Struct(">I")
+
+# zlib 的预置字典只在 32KB 窗口内有效
+ZLIB_MAX_DICT_SIZE = 32 * 1024
+
+SUPPORTED_METHODS = ("none", "zlib", "zstd")
+
+
+def dictionary_id(dictionary: bytes) -> int:
+    """字典 id：字典内容的 crc32"""
+    return zlib.crc32(dictionary)
+
+
+def get_dictionary_dir() -> Path:
+    """压缩字典所在目录"""
+    return Path(settings.game_result_dictionary_dir)
+
+
+class DictionaryStore:
+    """按 id 查找压缩字典，目录中的字典文件在首次用到时加载"""
+
+    def __init__(self):
+        self._dictionaries: Dict[int, bytes] = {}
+
+    def add(self, dictionary: bytes) -> int:
+        dict_id = dictionary_id(dictionary)
+        self._dictionaries[dict_id] = dictionary
+        return dict_id
+
+    def get(self, dict_id: int) -> bytes:
+        dictionary = self._dictionaries.get(dict_id)
+        if dictionary is None:
+            path = get_dictionary_dir() / f"game_result_{dict_id:08x}.dict"
+            if not path.is_file():
+                raise ValueError(f"找不到压缩字典: {path.name}")
+            dictionary = path.read_bytes()
+            self._dictionaries[dict_id] = dictionary
+        return dictionary
+
+
+dictionary_store = DictionaryStore()
+
+
+class GameResultCodec:
+    """game_result 编解码器"""
+
+    def __init__(self, method: str = "zlib", level: int = 6, dictionary: Optional[bytes] = None):
+        if method not in SUPPORTED_METHODS:
+            raise ValueError(f"不支持的压缩方式: {method}")
+        if method == "zstd" and zstandard is None:
+            logger.warning("未安装 zstandard，game_result 改用 zlib 压缩")
+            method = "zlib"
+
+        self.method = method
+        self.level = level
+        self.dictionary = dictionary
+        self.dict_id = dictionary_store.add(dictionary) if dictionary else None
+        self._zstd_compressor = None
+
+        if method == "zlib" and dictionary and len(dictionary) > ZLIB_MAX_DICT_SIZE:
+            self.dictionary = dictionary[-ZLIB_MAX_DICT_SIZE:]
+            self.dict_id = dictionary_store.add(self.dictionary)
+
+        if method == "zstd":
+            zstd_dict = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+            self._zstd_compressor = zstandard.ZstdCompressor(level=level, dict_data=zstd_dict)
+
+    def encode(self, value: Any) -> Union[bytes, str]:
+        """序列化并压缩"""
+        text = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+        if self.method == "none":
+            return text
+
+        data = text.encode("utf-8")
+        if self.method == "zstd":
+            payload = self._zstd_compressor.compress(data)
+            if self.dict_id is None:
+                return bytes([MARKER_ZSTD]) + payload
+            return bytes([MARKER_ZSTD_DICT]) + DICT_ID_STRUCT.pack(self.dict_id) + payload
+
+        if self.dict_id is None:
+            return bytes([MARKER_ZLIB]) + zlib.compress(data, self.level)
+        compressor = zlib.compressobj(self.level, zdict=self.dictionary)
+        payload = compressor.compress(data) + compressor.flush()
+        return bytes([MARKER_ZLIB_DICT]) + DICT_ID_STRUCT.pack(self.dict_id) + payload
+
+
+def decode(raw: Union[bytes, str, None]) -> Any:
+    """解压并反序列化，兼容未压缩的 JSON 文本"""
+    if raw is None:
+        return None
+    if isinstance(raw, str):
+        return json.loads(raw)
+
+    raw = bytes(raw)
+    marker = raw[0] if raw else None
+
+    if marker == MARKER_ZLIB:
+        data = zlib.decompress(raw[1:])
+    elif marker == MARKER_ZLIB_DICT:
+        (dict_id,) = DICT_ID_STRUCT.unpack_from(raw, 1)
+        decompressor = zlib.decompressobj(zdict=dictionary_store.get(dict_id))
+        data = decompressor.decompress(raw[5:]) + decompressor.flush()
+    elif marker in (MARKER_ZSTD, MARKER_ZSTD_DICT):
+        if zstandard is None:
+            raise RuntimeError("读取 zstd 压缩的游戏结果需要安装 zstandard")
+        if marker == MARKER_ZSTD:
+            data = zstandard.ZstdDecompressor().decompress(raw[1:])
+        else:
+            (dict_id,) = DICT_ID_STRUCT.unpack_from(raw, 1)
+            zstd_dict = zstandard.ZstdCompressionDict(dictionary_store.get(dict_id))
+            data = zstandard.ZstdDecompressor(dict_data=zstd_dict).decompress(raw[5:])
+    else:
+        # 以二进制形式存储的 JSON 文本
+        data = raw
+
+    return json.loads(data)
+
+
+_default_codec: Optional[GameResultCodec] = None
+
+
+def get_default_codec() -> GameResultCodec:
+    """按配置创建的默认编解码器"""
+    global _default_codec
+    if _default_codec is None:
+        dictionary = None
+        if settings.game_result_dictionary:
+            dictionary = (get_dictionary_dir() / settings.game_result_dictionary).read_bytes()
+        _default_codec = GameResultCodec(
+            method=settings.game_result_compression,
+            level=settings.game_result_compression_level,
+            dictionary=dictionary
+        )
+    return _default_codec
+
+
+def set_default_codec(codec: GameResultCodec):
+    """替换默认编解码器（基准测试等场景使用）"""
+    global _default_codec
+    _default_codec = codec
+
+
+def train_dictionary(samples: List[Any], method: str = "zstd", size: int = 16 * 1024) -> bytes:
+    """用样本训练压缩字典
+
+    zstd 使用 zstandard 自带的训练算法；zlib 的字典只是预置内容，取样本中
+    最常见的片段拼接，越常见的越靠后（离待压缩数据越近，编码越短）。
+    """
+    encoded = [
+        json.dumps(sample, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        for sample in samples
+    ]
+
+    if method == "zstd" and zstandard is not None:
+        return zstandard.train_dictionary(size, encoded).as_bytes()
+
+    size = min(size, ZLIB_MAX_DICT_SIZE)
+    counts: Dict[bytes, int] = {}
+    for data in encoded:
+        for fragment in set(data.split(b",")):
+            if len(fragment) > 3:
+                counts[fragment] = counts.get(fragment, 0) + 1
+
+    dictionary = b""
+    for fragment, _ in sorted(counts.items(), key=lambda item: item[1], reverse=True):
+        if len(dictionary) + len(fragment) + 1 > size:
+            break
+        dictionary = fragment + b"," + dictionary
+    return dictionary
+
+
+def save_dictionary(dictionary: bytes) -> Path:
+    """保存字典文件，文件名中包含字典 id"""
+    path = get_dictionary_dir() / f"game_result_{dictionary_id(dictionary):08x}.dict"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(dictionary)
+    return path
+
+
+if __name__ == "__main__":
+    import argparse
+    from sqlalchemy import select
+    from ..database import SessionLocal
+    from ..models.game import GameRecord
+
+    parser = argparse.ArgumentParser(description="用最近的游戏结果训练 game_result 压缩字典")
+    parser.add_argument("command", choices=["train"])
+    parser.add_argument("--samples", type=int, default=5000, help="样本数量")
+    parser.add_argument("--size", type=int, default=16 * 1024, help="字典大小（字节）")
+    parser.add_argument("--method", choices=["zlib", "zstd"], default=settings.game_result_compression)
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        samples = db.execute(
+            select(GameRecord.game_result).order_by(GameRecord.id.desc()).limit(args.samples)
+        ).scalars().all()
+
+    if not samples:
+        raise SystemExit("没有可用的游戏记录样本")
+
+    path = save_dictionary(train_dictionary(samples, args.method, args.size))
+    print(f"字典已保存: {path}")
+    print(f"启用方式: 设置 GAME_RESULT_DICTIONARY={path.name}")
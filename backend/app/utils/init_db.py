@@ -2,10 +2,12 @@
 数据库初始化工具
 """
 from sqlalchemy.orm import Session
-from ..database import engine, SessionLocal, create_tables
+from ..database import SessionLocal
 from ..models import User, Prize, GameConfig
 from ..core.security import get_password_hash
 from ..config import settings
+from ..services.ledger import record_opening_credits
+from .migrate import upgrade_database
 import logging
 
 logger = logging.getLogger(__name__)
@@ -14,12 +16,8 @@ logger = logging.getLogger(__name__)
 def init_database():
     """初始化数据库"""
     try:
-        # 先修复数据库表结构
-        fix_database_schema()
-
-        # 创建所有表
-        create_tables()
-        logger.info("数据库表创建成功")
+        # 按版本迁移表结构（已是最新版本时只做一次版本比对）
+        upgrade_database()
 
         # 创建初始数据
         db = SessionLocal()
@@ -36,98 +34,6 @@ def init_database():
         raise
 
 
-def fix_database_schema():
-    """修复数据库表结构"""
-    import sqlite3
-    from pathlib import Path
-
-    # 数据库文件路径 - 项目根目录的database文件夹
-    db_path = Path(__file__).parent.parent.parent.parent / "database" / "entertainment.db"
-
-    try:
-        conn = sqlite3.connect(str(db_path))
-        cursor = conn.cursor()
-
-        logger.info("检查并修复数据库表结构...")
-
-        # 检查 game_records 表是否存在
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='game_records';")
-        table_exists = cursor.fetchone()
-
-        if table_exists:
-            # 检查 game_records 表字段
-            cursor.execute("PRAGMA table_info(game_records);")
-            columns = cursor.fetchall()
-            column_names = [col[1] for col in columns]
-
-            # 检查必需字段是否存在
-            required_fields = ['template_id', 'game_result', 'prize_name']
-            missing_fields = [field for field in required_fields if field not in column_names]
-
-            if missing_fields:
-                logger.info(f"发现缺失字段: {missing_fields}，重新创建表...")
-
-                # 备份现有数据
-                cursor.execute("SELECT * FROM game_records;")
-                existing_data = cursor.fetchall()
-
-                # 删除旧表
-                cursor.execute("DROP TABLE IF EXISTS game_records_old;")
-                cursor.execute("ALTER TABLE game_records RENAME TO game_records_old;")
-
-                # 创建新表
-                cursor.execute("""
-                CREATE TABLE game_records (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    game_type VARCHAR(50) NOT NULL,
-                    template_id VARCHAR(50) NOT NULL,
-                    game_cost INTEGER NOT NULL,
-                    game_result JSON NOT NULL,
-                    prize_name VARCHAR(100),
-                    prize_credits INTEGER DEFAULT 0,
-                    is_winner BOOLEAN DEFAULT 0,
-                    credits_before INTEGER NOT NULL,
-                    credits_after INTEGER NOT NULL,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES users (id)
-                );
-                """)
-
-                # 迁移数据（如果有的话）
-                if existing_data:
-                    for row in existing_data:
-                        values = list(row)
-                        if len(values) < 12:
-                            while len(values) < 12:
-                                values.append(None)
-
-                        if values[3] is None:  # template_id
-                            values[3] = 'default_template'
-                        if values[5] is None:  # game_result
-                            values[5] = '{}'
-
-                        cursor.execute("""
-                        INSERT INTO game_records
-                        (id, user_id, game_type, template_id, game_cost, game_result,
-                         prize_name, prize_credits, is_winner, credits_before, credits_after, created_at)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        """, values)
-
-                # 删除备份表
-                cursor.execute("DROP TABLE IF EXISTS game_records_old;")
-                logger.info("表结构修复完成")
-            else:
-                logger.info("表结构正常，无需修复")
-
-        conn.commit()
-        conn.close()
-
-    except Exception as e:
-        logger.error(f"修复数据库表结构失败: {e}")
-        # 不抛出异常，让应用继续启动
-
-
 def create_admin_user(db: Session):
     """创建默认管理员用户"""
     admin_user = db.query(User).filter(User.username == "admin").first()
@@ -141,6 +47,8 @@ def create_admin_user(db: Session):
             credits=10000
         )
         db.add(admin_user)
+        db.flush()
+        record_opening_credits(db, admin_user)
         db.commit()
         logger.info("默认管理员用户创建成功")
 
@@ -0,0 +1,58 @@
+"""
+数据库版本迁移工具
+
+表结构变更统一通过 Alembic 迁移脚本（backend/migrations/versions）管理，
+数据库中记录当前版本号。启动时只做一次版本比对，已是最新版本则直接返回。
+"""
+from pathlib import Path
+from typing import Optional
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from ..database import engine
+from ..config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# backend 目录
+BACKEND_DIR = Path(__file__).resolve().parent.parent.parent
+
+
+def get_alembic_config() -> Config:
+    """构建 Alembic 配置，脚本目录和数据库地址均与应用保持一致"""
+    config = Config(str(BACKEND_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(BACKEND_DIR / "migrations"))
+    config.set_main_option("sqlalchemy.url", settings.database_url)
+    return config
+
+
+def get_head_revision(config: Optional[Config] = None) -> Optional[str]:
+    """获取迁移脚本的最新版本号"""
+    config = config or get_alembic_config()
+    return ScriptDirectory.from_config(config).get_current_head()
+
+
+def get_current_revision() -> Optional[str]:
+    """获取数据库当前记录的版本号，未做过迁移的数据库返回 None"""
+    with engine.connect() as conn:
+        return MigrationContext.configure(conn).get_current_revision()
+
+
+def upgrade_database():
+    """将数据库升级到最新版本"""
+    config = get_alembic_config()
+    head = get_head_revision(config)
+    current = get_current_revision()
+
+    if current == head:
+        logger.info(f"数据库已是最新版本: {current}")
+        return
+
+    logger.info(f"数据库版本 {current or '未标记'} -> {head}，开始迁移...")
+    with engine.begin() as conn:
+        config.attributes["connection"] = conn
+        command.upgrade(config, "head")
+    logger.info("数据库迁移完成")
+
@@ -0,0 +1,398 @@
+"""
+游戏记录按月分区
+
+热表 game_records 只保留最近几个月的数据，更早的已结束月份由后台任务迁移到
+按月划分的归档库（database/archive/game_records_YYYY_MM.db）。查询时按时间范围
+只读附加（ATTACH ... mode=ro）涉及到的归档库，未涉及的月份不会被扫描。
+"""
+import asyncio
+import os
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import MetaData, Table, select, union_all
+from sqlalchemy.orm import Query, Session, aliased
+from sqlalchemy.schema import CreateIndex, CreateTable
+from starlette.concurrency import run_in_threadpool
+from ..config import settings
+from ..database import engine
+from ..models.game import GameRecord
+import logging
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FILE_PATTERN = re.compile(r"^game_records_(\d{4})_(\d{2})\.db$")
+
+# 归档库附加时使用的库名前缀，如 arch_2024_01
+ARCHIVE_SCHEMA_PREFIX = "arch_"
+
+# SQLite 默认最多同时附加 10 个库，留出余量
+MAX_ATTACHED_ARCHIVES = 8
+
+# 写入归档时临时附加的库名
+ARCHIVE_WRITE_SCHEMA = "arch_write"
+
+_archive_metadata = MetaData()
+_archive_tables: Dict[str, Table] = {}
+
+
+def get_archive_dir() -> Path:
+    """归档库所在目录"""
+    return Path(settings.archive_dir)
+
+
+def month_bounds(month: str) -> Tuple[datetime, datetime]:
+    """月份的起止时间 [start, end)"""
+    year, month_num = (int(part) for part in month.split("_"))
+    start = datetime(year, month_num, 1)
+    end = datetime(year + 1, 1, 1) if month_num == 12 else datetime(year, month_num + 1, 1)
+    return start, end
+
+
+def archive_path(month: str) -> Path:
+    """月份归档库的文件路径"""
+    return get_archive_dir() / f"game_records_{month}.db"
+
+
+def list_archived_months() -> List[str]:
+    """已归档的月份，按时间升序"""
+    archive_dir = get_archive_dir()
+    if not archive_dir.is_dir():
+        return []
+
+    months = []
+    for name in os.listdir(archive_dir):
+        match = ARCHIVE_FILE_PATTERN.match(name)
+        # 空文件说明归档写入中途失败，表尚未建立
+        if match and os.path.getsize(archive_dir / name) > 0:
+            months.append(f"{match.group(1)}_{match.group(2)}")
+    return sorted(months)
+
+
+def archived_months_in_range(start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[str]:
+    """与时间范围有交集的归档月份，按时间升序"""
+    months = []
+    for month in list_archived_months():
+        month_start, month_end = month_bounds(month)
+        if start is not None and month_end <= start:
+            continue
+        if end is not None and month_start > end:
+            continue
+        months.append(month)
+    return months
+
+
+def archive_table(schema: str) -> Table:
+    """附加到指定库名下的归档表对象"""
+    table = _archive_tables.get(schema)
+    if table is None:
+        table = GameRecord.__table__.to_metadata(_archive_metadata, schema=schema)
+        _archive_tables[schema] = table
+    return table
+
+
+def attach_archives(db: Session, months: List[str]) -> List[str]:
+    """在会话所用的连接上只读附加归档库，返回对应的库名
+
+    已附加的库会被复用；超过 MAX_ATTACHED_ARCHIVES 时先分离最久未使用的库。
+    """
+    if len(months) > MAX_ATTACHED_ARCHIVES:
+        raise ValueError(f"单次查询最多涉及 {MAX_ATTACHED_ARCHIVES} 个归档月份")
+
+    connection = db.connection()
+    attached: List[str] = connection.connection.info.setdefault("attached_archives", [])
+
+    schemas = []
+    for month in months:
+        schema = f"{ARCHIVE_SCHEMA_PREFIX}{month}"
+        if schema in attached:
+            attached.remove(schema)
+        else:
+            while len(attached) >= MAX_ATTACHED_ARCHIVES:
+                stale = next((name for name in attached if name not in schemas), None)
+                if stale is None:
+                    break
+                connection.exec_driver_sql(f"DETACH DATABASE {stale}")
+                attached.remove(stale)
+
+            uri = f"file:{archive_path(month).resolve().as_posix()}?mode=ro"
+            connection.exec_driver_sql(f"ATTACH DATABASE ? AS {schema}", (uri,))
+        attached.append(schema)
+        schemas.append(schema)
+
+    return schemas
+
+
+def archive_source(db: Session, month: str):
+    """单个归档月份的数据源，用法与 GameRecord 相同"""
+    schema = attach_archives(db, [month])[0]
+    return aliased(GameRecord, archive_table(schema), adapt_on_names=True)
+
+
+def _range_select(table: Table, start: Optional[datetime], end: Optional[datetime]):
+    statement = select(*table.c)
+    if start is not None:
+        statement = statement.where(table.c.created_at >= start)
+    if end is not None:
+        statement = statement.where(table.c.created_at <= end)
+    return statement
+
+
+def _union_source(tables: List[Table], start: Optional[datetime], end: Optional[datetime]):
+    """由若干分区表 UNION ALL 组成的 GameRecord 别名，时间条件下推到每个分区内部"""
+    union = union_all(*[_range_select(table, start, end) for table in tables])
+    return aliased(GameRecord, union.subquery("game_records_partitions"), adapt_on_names=True)
+
+
+def game_records_source(db: Session, start: Optional[datetime] = None, end: Optional[datetime] = None):
+    """覆盖指定时间范围的游戏记录数据源
+
+    范围只落在热表时直接返回 GameRecord；否则返回由热表和相关归档表 UNION ALL
+    组成的 GameRecord 别名，用法与 GameRecord 相同（如 source.created_at）。
+    时间条件会下推到每个分区内部，使各分区的 created_at 索引都能生效。
+
+    只用于涉及的归档月份不超过 MAX_ATTACHED_ARCHIVES 个的短时间范围（如一天），
+    范围可能更长时使用 iter_game_records_sources 分批聚合。
+    """
+    months = archived_months_in_range(start, end)
+    if not months:
+        return GameRecord
+
+    schemas = attach_archives(db, months)
+    return _union_source([GameRecord.__table__] + [archive_table(schema) for schema in schemas], start, end)
+
+
+def iter_game_records_sources(db: Session, start: Optional[datetime] = None, end: Optional[datetime] = None) -> Iterator:
+    """覆盖指定时间范围的游戏记录数据源，每个最多涉及 MAX_ATTACHED_ARCHIVES 个归档月份
+
+    按时间从新到旧返回：第一个由热表和最近的若干归档月份组成，之后每个由更早的
+    若干归档月份组成，用法与 game_records_source 相同。调用方对每个数据源分别聚合
+    再合并结果；附加下一批归档时可能分离上一批，必须读完当前数据源的查询再取下一个。
+    """
+    months = archived_months_in_range(start, end)
+    if not months:
+        yield GameRecord
+        return
+
+    for stop in range(len(months), 0, -MAX_ATTACHED_ARCHIVES):
+        schemas = attach_archives(db, months[max(stop - MAX_ATTACHED_ARCHIVES, 0):stop])
+        tables = [archive_table(schema) for schema in schemas]
+        if stop == len(months):
+            tables.insert(0, GameRecord.__table__)
+        yield _union_source(tables, start, end)
+
+
+def iter_partition_sources(db: Session, start: Optional[datetime] = None, end: Optional[datetime] = None) -> Iterator:
+    """按时间从新到旧依次返回各分区的数据源（热表在前）"""
+    yield GameRecord
+    for month in reversed(archived_months_in_range(start, end)):
+        yield archive_source(db, month)
+
+
+def fetch_newest_first(
+    db: Session,
+    build_query: Callable[[object], Query],
+    offset: int,
+    limit: int,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+) -> List:
+    """跨分区按 created_at 倒序分页
+
+    build_query 接收数据源并返回已加好过滤条件的查询。热表中的数据总是比归档
+    月份新，因此按分区顺序读取，凑够 offset + limit 条后即停止，不会触及更早的归档。
+    """
+    rows = []
+    remaining_offset = offset
+
+    for source in iter_partition_sources(db, start, end):
+        query = build_query(source)
+        if remaining_offset:
+            count = query.count()
+            if count <= remaining_offset:
+                remaining_offset -= count
+                continue
+
+        rows.extend(
+            query.order_by(source.created_at.desc())
+            .offset(remaining_offset)
+            .limit(limit - len(rows))
+            .all()
+        )
+        remaining_offset = 0
+        if len(rows) >= limit:
+            break
+
+    return rows
+
+
+def fetch_first(
+    db: Session,
+    build_query: Callable[[object], Query],
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+):
+    """按分区从新到旧查找第一条满足条件的记录，找不到返回 None"""
+    for source in iter_partition_sources(db, start, end):
+        record = build_query(source).first()
+        if record is not None:
+            return record
+    return None
+
+
+def count_across_partitions(
+    db: Session,
+    build_query: Callable[[object], Query],
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+) -> int:
+    """统计各分区中满足条件的记录总数"""
+    return sum(build_query(source).count() for source in iter_partition_sources(db, start, end))
+
+
+def _ensure_incremental_vacuum():
+    """确保热库使用增量 VACUUM 模式
+
+    auto_vacuum 模式只能在 VACUUM 时切换，因此首次切换需要一次完整 VACUUM。
+    """
+    with engine.connect() as conn:
+        conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+        mode = conn.exec_driver_sql("PRAGMA auto_vacuum").scalar()
+        if mode != 2:
+            logger.warning("热库切换为增量 VACUUM 模式，需要执行一次完整 VACUUM...")
+            conn.exec_driver_sql("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.exec_driver_sql("VACUUM")
+
+
+def _create_archive_table(conn, schema: str):
+    table = archive_table(schema)
+    conn.execute(CreateTable(table, include_foreign_key_constraints=[], if_not_exists=True))
+    for index in table.indexes:
+        # 主键上的冗余索引没有必要带到归档库
+        if [column.name for column in index.columns] == ["id"]:
+            continue
+        conn.execute(CreateIndex(index, if_not_exists=True))
+
+
+def archive_month(month: str) -> int:
+    """把热表中某个月的记录迁移到归档库，返回迁移的记录数
+
+    分两步进行：先把记录复制到归档库并提交，核对热表中该月的每条记录（id 和时间）
+    都已在归档库中后，再在单独的事务中从热表删除。WAL 模式下跨附加库的提交不保证
+    原子性，分开提交可保证异常中断时记录至少保留在一处；核对不一致时抛出异常，热表
+    记录不动。中断后重新执行时跳过归档库中已有的记录。
+    """
+    start, end = month_bounds(month)
+    bounds = (start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"))
+    path = archive_path(month)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    columns = ", ".join(column.name for column in GameRecord.__table__.columns)
+    in_month = "created_at >= ? AND created_at < ?"
+
+    with engine.connect() as conn:
+        # ATTACH 不能在事务中执行，附加后先结束 SQLAlchemy 的自动事务
+        conn.exec_driver_sql(f"ATTACH DATABASE ? AS {ARCHIVE_WRITE_SCHEMA}", (str(path),))
+        conn.commit()
+        try:
+            with conn.begin():
+                _create_archive_table(conn, ARCHIVE_WRITE_SCHEMA)
+                conn.exec_driver_sql(
+                    f"INSERT INTO {ARCHIVE_WRITE_SCHEMA}.game_records ({columns}) "
+                    f"SELECT {columns} FROM main.game_records AS hot WHERE {in_month} "
+                    f"AND NOT EXISTS (SELECT 1 FROM {ARCHIVE_WRITE_SCHEMA}.game_records AS archived "
+                    f"WHERE archived.id = hot.id)",
+                    bounds
+                )
+
+            hot = conn.exec_driver_sql(
+                f"SELECT COUNT(*), MAX(id) FROM main.game_records WHERE {in_month}", bounds
+            ).one()
+            missing = conn.exec_driver_sql(
+                f"SELECT COUNT(*) FROM main.game_records AS hot WHERE {in_month} "
+                f"AND NOT EXISTS (SELECT 1 FROM {ARCHIVE_WRITE_SCHEMA}.game_records AS archived "
+                f"WHERE archived.id = hot.id AND archived.created_at = hot.created_at)",
+                bounds
+            ).scalar()
+            conn.commit()
+        finally:
+            conn.exec_driver_sql(f"DETACH DATABASE {ARCHIVE_WRITE_SCHEMA}")
+            conn.commit()
+
+    if missing:
+        raise RuntimeError(f"{month} 归档核对不一致：热表 {hot[0]} 条中有 {missing} 条未写入归档库，热表记录未删除")
+    if not hot[0]:
+        return 0
+
+    with engine.begin() as conn:
+        # 只删除已核对的记录，核对之后写入的记录 id 更大，留待下次归档
+        moved = conn.exec_driver_sql(
+            f"DELETE FROM main.game_records WHERE {in_month} AND id <= ?", (*bounds, hot[1])
+        ).rowcount
+
+    return moved
+
+
+def archive_closed_months(hot_months: Optional[int] = None) -> Dict[str, int]:
+    """将热表中超出保留期的已结束月份迁移到归档库，并回收热库空间"""
+    hot_months = hot_months or settings.archive_hot_months
+    now = datetime.now()
+    cutoff_index = now.year * 12 + now.month - 1 - (hot_months - 1)
+    cutoff = datetime(cutoff_index // 12, cutoff_index % 12 + 1, 1)
+
+    with engine.connect() as conn:
+        # 回填任务按分区记录进度，未完成前迁移记录会导致重复或遗漏
+        pending = conn.exec_driver_sql(
+            "SELECT name FROM backfill_checkpoints WHERE is_complete = 0 LIMIT 1"
+        ).scalar()
+        if pending:
+            logger.info(f"回填任务 {pending} 尚未完成，暂不归档")
+            return {}
+
+        months = [
+            row[0] for row in conn.exec_driver_sql(
+                "SELECT DISTINCT strftime('%Y_%m', created_at) FROM game_records "
+                "WHERE created_at < ? ORDER BY 1",
+                (cutoff.strftime("%Y-%m-%d"),)
+            )
+            if row[0]
+        ]
+        max_id = conn.exec_driver_sql("SELECT MAX(id) FROM game_records").scalar()
+
+    if not months:
+        return {}
+
+    # 表没有 AUTOINCREMENT，新记录的 id 取当前最大 id + 1。
+    # 包含最大 id 的月份不能迁走，否则 id 会回退并与归档库中的记录冲突。
+    with engine.connect() as conn:
+        max_id_month = conn.exec_driver_sql(
+            "SELECT strftime('%Y_%m', created_at) FROM game_records WHERE id = ?", (max_id,)
+        ).scalar()
+
+    _ensure_incremental_vacuum()
+
+    archived = {}
+    for month in months:
+        if month == max_id_month:
+            logger.info(f"{month} 包含当前最大记录 id，暂不归档")
+            break
+        archived[month] = archive_month(month)
+        logger.info(f"已归档 {month}: {archived[month]} 条记录")
+
+    with engine.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT").exec_driver_sql("PRAGMA incremental_vacuum")
+
+    return archived
+
+
+async def run_archive_scheduler():
+    """后台归档任务：定期把已结束的月份迁出热表"""
+    interval = settings.archive_check_interval_hours * 3600
+    while True:
+        try:
+            archived = await run_in_threadpool(archive_closed_months)
+            if archived:
+                logger.info(f"游戏记录归档完成: {archived}")
+        except Exception as e:
+            logger.error(f"游戏记录归档失败: {e}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,162 @@
+"""
+game_records 查询计划检查工具
+
+对各接口使用的典型查询执行 EXPLAIN QUERY PLAN，确认都命中了预期的索引，
+避免退化成全表扫描。测试 tests/test_query_plans.py 在迁移后的临时库上逐条断言，
+也可直接运行：python -m app.utils.query_plans
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List, Any
+from sqlalchemy import select, func, desc
+from sqlalchemy.engine import Engine
+from ..database import engine
+from ..models.game import GameRecord
+from ..models.user import User
+
+
+def explain_query_plan(bind: Engine, statement) -> List[str]:
+    """返回语句的 EXPLAIN QUERY PLAN 明细"""
+    compiled = statement.compile(dialect=bind.dialect)
+    params = compiled.construct_params()
+    parameters = tuple(params[name] for name in compiled.positiontup or [])
+
+    with bind.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", parameters).fetchall()
+
+    return [row[-1] for row in rows]
+
+
+def _endpoint_queries() -> Dict[str, Dict[str, Any]]:
+    """各接口的典型查询及期望使用的索引"""
+    now = datetime.now()
+    week_ago = now - timedelta(days=7)
+    user_id = 1
+
+    return {
+        "/api/games/history": {
+            "statement": select(GameRecord)
+            .where(GameRecord.user_id == user_id)
+            .order_by(GameRecord.created_at.desc())
+            .offset(0).limit(20),
+            "indexes": {"ix_game_records_user_created"},
+        },
+        "/api/games/history?game_type": {
+            "statement": select(GameRecord)
+            .where(GameRecord.user_id == user_id, GameRecord.game_type == "scratch_card")
+            .order_by(GameRecord.created_at.desc())
+            .offset(0).limit(20),
+            "indexes": {"ix_game_records_user_created"},
+        },
+        "/api/stats/user/stats": {
+            "statement": select(GameRecord).where(GameRecord.user_id == user_id),
+            "indexes": {"ix_game_records_user_created"},
+        },
+        "/api/stats/analysis (管理员)": {
+            "statement": select(GameRecord).where(
+                GameRecord.created_at >= week_ago,
+                GameRecord.created_at <= now
+            ),
+            "indexes": {"ix_game_records_created_at"},
+        },
+        "/api/stats/analysis (普通用户)": {
+            "statement": select(GameRecord).where(
+                GameRecord.created_at >= week_ago,
+                GameRecord.created_at <= now,
+                GameRecord.user_id == user_id
+            ),
+            "indexes": {"ix_game_records_user_created"},
+        },
+        "/api/stats/analysis?game_type&template_id": {
+            "statement": select(GameRecord).where(
+                GameRecord.created_at >= week_ago,
+                GameRecord.created_at <= now,
+                GameRecord.game_type == "scratch_card",
+                GameRecord.template_id == "welfare_lottery"
+            ),
+            "indexes": {"ix_game_records_type_template_created"},
+        },
+        "/api/stats/live-status 热门游戏": {
+            "statement": select(
+                GameRecord.game_type,
+                GameRecord.template_id,
+                func.count(GameRecord.id).label("play_count")
+            ).where(GameRecord.created_at >= now - timedelta(hours=24))
+            .group_by(GameRecord.game_type, GameRecord.template_id)
+            .order_by(desc("play_count")).limit(3),
+            "indexes": {"ix_game_records_created_at", "ix_game_records_type_template_created"},
+        },
+        "/api/stats/live-status 在线人数": {
+            "statement": select(func.count(func.distinct(GameRecord.user_id)))
+            .where(GameRecord.created_at >= now - timedelta(hours=1)),
+            "indexes": {"ix_game_records_created_at", "ix_game_records_user_created"},
+        },
+        "/api/stats/live-status 最近大奖": {
+            "statement": select(GameRecord.game_type, GameRecord.prize_credits, User.username)
+            .outerjoin(User, User.id == GameRecord.user_id)
+            .where(GameRecord.big_win_clause())
+            .order_by(desc(GameRecord.created_at)).limit(5),
+            "indexes": {"ix_game_records_big_wins"},
+        },
+        "/api/admin/games/records": {
+            "statement": select(GameRecord)
+            .order_by(desc(GameRecord.created_at))
+            .offset(0).limit(100),
+            "indexes": {"ix_game_records_created_at"},
+        },
+        "/api/admin/games/records?user_id": {
+            "statement": select(GameRecord)
+            .where(GameRecord.user_id == user_id)
+            .order_by(desc(GameRecord.created_at))
+            .offset(0).limit(100),
+            "indexes": {"ix_game_records_user_created"},
+        },
+        "/api/admin/dashboard/overview 本周统计": {
+            "statement": select(func.sum(GameRecord.game_cost))
+            .where(GameRecord.created_at >= week_ago),
+            "indexes": {"ix_game_records_created_at"},
+        },
+        "/api/admin/dashboard/overview 最近大奖": {
+            "statement": select(GameRecord.game_type, GameRecord.prize_credits, User.username)
+            .outerjoin(User, User.id == GameRecord.user_id)
+            .where(GameRecord.big_win_clause())
+            .order_by(desc(GameRecord.created_at)).limit(10),
+            "indexes": {"ix_game_records_big_wins"},
+        },
+    }
+
+
+def check_game_record_query_plans(bind: Engine = engine) -> List[Dict[str, Any]]:
+    """检查各接口查询是否命中索引
+
+    返回每个查询的检查结果，ok 为 False 表示没有使用期望的索引。
+    """
+    results = []
+    for name, query in _endpoint_queries().items():
+        plan = explain_query_plan(bind, query["statement"])
+        used = {
+            index for index in query["indexes"]
+            if any(f"INDEX {index}" in detail for detail in plan)
+        }
+        results.append({
+            "endpoint": name,
+            "ok": bool(used),
+            "expected_indexes": sorted(query["indexes"]),
+            "plan": plan
+        })
+    return results
+
+
+if __name__ == "__main__":
+    failed = 0
+    for result in check_game_record_query_plans():
+        mark = "OK  " if result["ok"] else "FAIL"
+        print(f"[{mark}] {result['endpoint']}")
+        for detail in result["plan"]:
+            print(f"         {detail}")
+        if not result["ok"]:
+            failed += 1
+            print(f"         期望索引: {', '.join(result['expected_indexes'])}")
+
+    if failed:
+        raise SystemExit(f"{failed} 个查询未命中索引")
+    print("所有查询均命中索引")
@@ -0,0 +1,175 @@
+"""
+game_result 压缩基准测试
+
+在合成的游戏记录表上比较各压缩方式的数据库大小、写入吞吐和历史记录分页延迟。
+每种方式使用独立的临时数据库，不会影响应用数据库。
+
+用法:
+    python bench_game_result.py                     # 默认 100 万行
+    python bench_game_result.py --rows 100000 --methods none,zlib,zstd-dict
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session, undefer
+
+from app.database import Base
+from app.models import User, GameRecord
+from app.games import scratch_card_game, slot_machine_game, wheel_fortune_game
+from app.utils import compression
+
+METHODS = ["none", "zlib", "zlib-dict", "zstd", "zstd-dict"]
+
+GAME_TEMPLATES = [
+    ("scratch_card", ["welfare_lottery", "new_year", "lucky_symbol"]),
+    ("slot_machine", ["classic_3_reel", "modern_5_reel", "fruit_machine"]),
+    ("wheel_fortune", ["classic_wheel", "fortune_wheel", "lucky_wheel", "mega_wheel"]),
+]
+
+
+def build_payload_pool(size: int):
+    """用真实的游戏引擎生成结果样本"""
+    pool = []
+    # 游戏引擎会打印调试信息，生成样本时屏蔽
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(size):
+            game_type, templates = GAME_TEMPLATES[i % len(GAME_TEMPLATES)]
+            template_id = random.choice(templates)
+            if game_type == "scratch_card":
+                result = scratch_card_game.create_card(template_id, 1)
+            elif game_type == "slot_machine":
+                result = slot_machine_game.spin(template_id, 1)
+            else:
+                result = wheel_fortune_game.spin(template_id, 1)
+            pool.append((game_type, template_id, result))
+    return pool
+
+
+def make_codec(method: str, training_samples):
+    base_method = method.split("-")[0]
+    dictionary = None
+    if method.endswith("-dict"):
+        dictionary = compression.train_dictionary(training_samples, base_method)
+    return compression.GameResultCodec(method=base_method, dictionary=dictionary)
+
+
+def generate_rows(count: int, users: int, pool, start: datetime):
+    for i in range(count):
+        game_type, template_id, result = pool[i % len(pool)]
+        prize_credits = random.choice([0, 0, 0, 10, 50, 100, 500])
+        yield {
+            "user_id": random.randint(1, users),
+            "game_type": game_type,
+            "template_id": template_id,
+            "game_cost": 10,
+            "game_result": result,
+            "prize_name": None,
+            "prize_credits": prize_credits,
+            "is_winner": prize_credits > 0,
+            "credits_before": 1000,
+            "credits_after": 1000 - 10 + prize_credits,
+            "created_at": start + timedelta(seconds=i),
+        }
+
+
+def run(method: str, args, pool, training_samples):
+    compression.set_default_codec(make_codec(method, training_samples))
+
+    path = os.path.join(args.out, f"bench_{method}.db")
+    if os.path.exists(path):
+        os.remove(path)
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine, tables=[User.__table__, GameRecord.__table__])
+
+    random.seed(42)
+    start = datetime(2024, 1, 1)
+    insert = GameRecord.__table__.insert()
+    rows = generate_rows(args.rows, args.users, pool, start)
+
+    began = time.perf_counter()
+    with engine.begin() as conn:
+        while True:
+            batch = [row for _, row in zip(range(args.batch), rows)]
+            if not batch:
+                break
+            conn.execute(insert, batch)
+    insert_seconds = time.perf_counter() - began
+
+    engine.dispose()
+    db_size = os.path.getsize(path)
+
+    # 历史记录分页：与 /api/games/history 相同的查询，并访问 game_result
+    latencies = []
+    with Session(engine) as db:
+        for _ in range(args.pages):
+            user_id = random.randint(1, args.users)
+            began = time.perf_counter()
+            records = db.execute(
+                select(GameRecord)
+                .options(undefer(GameRecord.game_result))
+                .where(GameRecord.user_id == user_id)
+                .order_by(GameRecord.created_at.desc())
+                .limit(20)
+            ).scalars().all()
+            for record in records:
+                record.game_result
+            latencies.append((time.perf_counter() - began) * 1000)
+            db.expunge_all()
+    engine.dispose()
+
+    if not args.keep:
+        os.remove(path)
+
+    return {
+        "method": method,
+        "size_mb": db_size / 1024 / 1024,
+        "rows_per_sec": args.rows / insert_seconds,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": statistics.quantiles(latencies, n=20)[-1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="game_result 压缩基准测试")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="合成记录数")
+    parser.add_argument("--users", type=int, default=5000, help="用户数")
+    parser.add_argument("--batch", type=int, default=10000, help="每批写入行数")
+    parser.add_argument("--pages", type=int, default=500, help="历史记录分页查询次数")
+    parser.add_argument("--pool", type=int, default=3000, help="游戏结果样本数")
+    parser.add_argument("--methods", default=",".join(METHODS), help="逗号分隔的压缩方式")
+    parser.add_argument("--out", default=tempfile.gettempdir(), help="临时数据库目录")
+    parser.add_argument("--keep", action="store_true", help="保留生成的数据库文件")
+    args = parser.parse_args()
+
+    methods = args.methods.split(",")
+    for method in methods:
+        if method not in METHODS:
+            raise SystemExit(f"未知的压缩方式: {method}")
+    if compression.zstandard is None:
+        print("未安装 zstandard，zstd 方式会回退到 zlib")
+
+    random.seed(0)
+    pool = build_payload_pool(args.pool)
+    # 字典用独立生成的样本训练，避免和写入的数据完全相同
+    training_samples = [result for _, _, result in build_payload_pool(1000)]
+
+    print(f"行数: {args.rows:,}  用户数: {args.users:,}")
+    print(f"{'方式':<12}{'库大小(MB)':>12}{'写入(行/秒)':>14}{'分页P50(ms)':>14}{'分页P95(ms)':>14}")
+    for method in methods:
+        result = run(method, args, pool, training_samples)
+        print(
+            f"{result['method']:<12}{result['size_mb']:>12.1f}{result['rows_per_sec']:>14,.0f}"
+            f"{result['p50_ms']:>14.2f}{result['p95_ms']:>14.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
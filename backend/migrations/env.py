@@ -0,0 +1,80 @@
+"""
+Alembic 迁移环境
+
+应用启动时由 app.utils.migrate 以编程方式调用，并通过 config.attributes["connection"]
+传入应用自身的数据库连接；直接使用 alembic 命令行时则按应用配置创建连接。
+"""
+from logging.config import fileConfig
+
+from alembic import context
+
+from app.config import settings
+from app.database import Base, engine
+import app.models  # noqa: F401  确保所有模型都注册到 Base.metadata
+from app.models.types import CompressedJSON
+import sqlalchemy as sa
+
+config = context.config
+
+# 只有命令行调用时才加载 alembic.ini 中的日志配置，避免覆盖应用的日志设置
+if config.config_file_name is not None and config.attributes.get("connection") is None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def compare_type(context, inspected_column, metadata_column, inspected_type, metadata_type):
+    """自动生成迁移时的字段类型比较
+
+    game_records.game_result 在库中声明为 JSON，模型中为 CompressedJSON（BLOB）。SQLite
+    按原样存储字节，声明类型不影响读写，不为此重建大表，视为相同。其余字段使用默认比较。
+    """
+    if isinstance(metadata_type, CompressedJSON) and isinstance(inspected_type, (sa.JSON, sa.LargeBinary)):
+        return False
+    return None
+
+
+def run_migrations_offline() -> None:
+    """离线模式：只输出SQL，不连接数据库"""
+    url = config.get_main_option("sqlalchemy.url") or settings.database_url
+    context.configure(
+        url=url,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        render_as_batch=True,
+        compare_type=compare_type,
+        dialect_opts={"paramstyle": "named"},
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    """在线模式：连接数据库执行迁移"""
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _run_with_connection(connection)
+        return
+
+    with engine.connect() as connection:
+        _run_with_connection(connection)
+
+
+def _run_with_connection(connection) -> None:
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        # SQLite 不支持大部分 ALTER TABLE，需要批处理模式重建表
+        render_as_batch=True,
+        compare_type=compare_type,
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
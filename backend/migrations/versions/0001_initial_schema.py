@@ -0,0 +1,251 @@
+"""初始表结构
+
+接管引入 Alembic 之前由 create_all 创建的数据库：已存在的表直接跳过，
+缺少字段的旧版 game_records 表按 id 分段用 INSERT ... SELECT 重建，
+不再把整张表读进内存逐行插入。
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# 旧表重建时每批复制的 id 跨度
+COPY_CHUNK_SIZE = 50000
+
+# 旧版 game_records 缺失字段的填充值（对应 NOT NULL 字段）
+LEGACY_GAME_RECORD_DEFAULTS = {
+    "game_type": "'unknown'",
+    "template_id": "'default_template'",
+    "game_cost": "0",
+    "game_result": "'{}'",
+    "credits_before": "0",
+    "credits_after": "0",
+}
+
+
+def _create_users() -> None:
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("username", sa.String(length=50), nullable=False),
+        sa.Column("email", sa.String(length=100), nullable=False),
+        sa.Column("hashed_password", sa.String(length=255), nullable=False),
+        sa.Column("full_name", sa.String(length=100), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+        sa.Column("is_admin", sa.Boolean(), nullable=True),
+        sa.Column("credits", sa.Integer(), nullable=True),
+        sa.Column("total_games_played", sa.Integer(), nullable=True),
+        sa.Column("total_winnings", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("(CURRENT_TIMESTAMP)"), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_login", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("avatar_url", sa.String(length=255), nullable=True),
+        sa.Column("bio", sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_username", "users", ["username"], unique=True)
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+
+def _game_records_columns():
+    return [
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("game_type", sa.String(length=50), nullable=False),
+        sa.Column("template_id", sa.String(length=50), nullable=False),
+        sa.Column("game_cost", sa.Integer(), nullable=False),
+        sa.Column("game_result", sa.JSON(), nullable=False),
+        sa.Column("prize_name", sa.String(length=100), nullable=True),
+        sa.Column("prize_credits", sa.Integer(), nullable=True),
+        sa.Column("is_winner", sa.Boolean(), nullable=True),
+        sa.Column("credits_before", sa.Integer(), nullable=False),
+        sa.Column("credits_after", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("(CURRENT_TIMESTAMP)"), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    ]
+
+
+def _create_game_records() -> None:
+    op.create_table("game_records", *_game_records_columns())
+    op.create_index("ix_game_records_id", "game_records", ["id"])
+
+
+def _create_game_configs() -> None:
+    op.create_table(
+        "game_configs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("game_type", sa.String(length=50), nullable=False),
+        sa.Column("config_data", sa.JSON(), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("(CURRENT_TIMESTAMP)"), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("game_type"),
+    )
+    op.create_index("ix_game_configs_id", "game_configs", ["id"])
+
+
+def _create_prizes() -> None:
+    op.create_table(
+        "prizes",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(length=100), nullable=False),
+        sa.Column("game_type", sa.String(length=50), nullable=False),
+        sa.Column("credits_value", sa.Integer(), nullable=True),
+        sa.Column("probability", sa.Float(), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+        sa.Column("stock_quantity", sa.Integer(), nullable=True),
+        sa.Column("used_quantity", sa.Integer(), nullable=True),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("image_url", sa.String(length=255), nullable=True),
+        sa.Column("display_order", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("(CURRENT_TIMESTAMP)"), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_prizes_id", "prizes", ["id"])
+
+
+def _create_prize_histories() -> None:
+    op.create_table(
+        "prize_histories",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("prize_id", sa.Integer(), nullable=False),
+        sa.Column("game_record_id", sa.Integer(), nullable=False),
+        sa.Column("prize_name", sa.String(length=100), nullable=False),
+        sa.Column("prize_credits", sa.Integer(), nullable=True),
+        sa.Column("game_type", sa.String(length=50), nullable=False),
+        sa.Column("is_claimed", sa.Boolean(), nullable=True),
+        sa.Column("claimed_at", sa.DateTime(timezone=True), server_default=sa.text("(CURRENT_TIMESTAMP)"), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("(CURRENT_TIMESTAMP)"), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_prize_histories_id", "prize_histories", ["id"])
+
+
+def _create_admin_logs() -> None:
+    op.create_table(
+        "admin_logs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("admin_user_id", sa.Integer(), nullable=False),
+        sa.Column("admin_username", sa.String(length=50), nullable=False),
+        sa.Column("action_type", sa.String(length=50), nullable=False),
+        sa.Column("action_description", sa.Text(), nullable=False),
+        sa.Column("target_type", sa.String(length=50), nullable=True),
+        sa.Column("target_id", sa.Integer(), nullable=True),
+        sa.Column("old_data", sa.JSON(), nullable=True),
+        sa.Column("new_data", sa.JSON(), nullable=True),
+        sa.Column("ip_address", sa.String(length=45), nullable=True),
+        sa.Column("user_agent", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("(CURRENT_TIMESTAMP)"), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_admin_logs_id", "admin_logs", ["id"])
+
+
+def _create_system_stats() -> None:
+    op.create_table(
+        "system_stats",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("stat_date", sa.String(length=10), nullable=False),
+        sa.Column("total_users", sa.Integer(), nullable=True),
+        sa.Column("new_users", sa.Integer(), nullable=True),
+        sa.Column("active_users", sa.Integer(), nullable=True),
+        sa.Column("total_games", sa.Integer(), nullable=True),
+        sa.Column("scratch_card_games", sa.Integer(), nullable=True),
+        sa.Column("slot_machine_games", sa.Integer(), nullable=True),
+        sa.Column("lucky_wheel_games", sa.Integer(), nullable=True),
+        sa.Column("total_credits_consumed", sa.Integer(), nullable=True),
+        sa.Column("total_credits_awarded", sa.Integer(), nullable=True),
+        sa.Column("total_prizes_awarded", sa.Integer(), nullable=True),
+        sa.Column("total_winners", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("(CURRENT_TIMESTAMP)"), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("stat_date"),
+    )
+    op.create_index("ix_system_stats_id", "system_stats", ["id"])
+
+
+def _rebuild_legacy_game_records(bind, inspector, legacy_columns) -> None:
+    """重建缺少字段的旧版 game_records 表
+
+    数据完全在 SQLite 内部按 id 分段复制，内存占用与表大小无关。
+    """
+    # 索引名在整个库内唯一，先删掉旧表上的索引，避免和新表冲突
+    for index in inspector.get_indexes("game_records"):
+        op.drop_index(index["name"], table_name="game_records")
+    op.rename_table("game_records", "game_records_legacy")
+    _create_game_records()
+
+    target_columns = [column.name for column in _game_records_columns() if isinstance(column, sa.Column)]
+    select_exprs = []
+    for name in target_columns:
+        default = LEGACY_GAME_RECORD_DEFAULTS.get(name)
+        if name in legacy_columns:
+            select_exprs.append(f"COALESCE({name}, {default})" if default else name)
+        else:
+            select_exprs.append(default or "NULL")
+
+    copy_sql = sa.text(
+        f"INSERT INTO game_records ({', '.join(target_columns)}) "
+        f"SELECT {', '.join(select_exprs)} FROM game_records_legacy "
+        f"WHERE id > :low AND id <= :high"
+    )
+
+    max_id = bind.execute(sa.text("SELECT MAX(id) FROM game_records_legacy")).scalar() or 0
+    low = 0
+    while low < max_id:
+        bind.execute(copy_sql, {"low": low, "high": low + COPY_CHUNK_SIZE})
+        low += COPY_CHUNK_SIZE
+
+    op.drop_table("game_records_legacy")
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+
+    creators = [
+        ("users", _create_users),
+        ("game_records", _create_game_records),
+        ("game_configs", _create_game_configs),
+        ("prizes", _create_prizes),
+        ("prize_histories", _create_prize_histories),
+        ("admin_logs", _create_admin_logs),
+        ("system_stats", _create_system_stats),
+    ]
+    for table_name, create in creators:
+        if table_name not in existing_tables:
+            create()
+
+    if "game_records" in existing_tables:
+        legacy_columns = {column["name"] for column in inspector.get_columns("game_records")}
+        required = {"template_id", "game_result", "prize_name"}
+        if not required.issubset(legacy_columns):
+            _rebuild_legacy_game_records(bind, inspector, legacy_columns)
+
+
+def downgrade() -> None:
+    for table_name in [
+        "system_stats",
+        "admin_logs",
+        "prize_histories",
+        "prizes",
+        "game_configs",
+        "game_records",
+        "users",
+    ]:
+        op.drop_table(table_name)
@@ -0,0 +1,43 @@
+"""game_records 查询索引
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # 引入迁移之前启动时可能已经补建过这些索引，因此使用 IF NOT EXISTS
+    op.create_index(
+        "ix_game_records_user_created", "game_records", ["user_id", "created_at"],
+        if_not_exists=True
+    )
+    op.create_index(
+        "ix_game_records_created_at", "game_records", ["created_at"],
+        if_not_exists=True
+    )
+    op.create_index(
+        "ix_game_records_type_template_created", "game_records",
+        ["game_type", "template_id", "created_at"],
+        if_not_exists=True
+    )
+    # 大奖部分索引，阈值需与 app.models.game.BIG_WIN_CREDITS 一致
+    op.create_index(
+        "ix_game_records_big_wins", "game_records", ["created_at"],
+        sqlite_where=sa.text("prize_credits >= 1000"),
+        if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_game_records_big_wins", table_name="game_records")
+    op.drop_index("ix_game_records_type_template_created", table_name="game_records")
+    op.drop_index("ix_game_records_created_at", table_name="game_records")
+    op.drop_index("ix_game_records_user_created", table_name="game_records")
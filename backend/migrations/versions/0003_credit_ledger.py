@@ -0,0 +1,60 @@
+"""金额流水与余额快照
+
+新建 credit_ledger / credit_snapshots，并为已有用户写入一条期初余额流水，
+使流水累计值与 users.credits 一致。
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "credit_ledger",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("delta", sa.Integer(), nullable=False),
+        sa.Column("reason", sa.String(length=30), nullable=False),
+        sa.Column("ref_type", sa.String(length=30), nullable=True),
+        sa.Column("ref_id", sa.Integer(), nullable=True),
+        sa.Column("description", sa.String(length=255), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("(CURRENT_TIMESTAMP)"), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_credit_ledger_user_id_id", "credit_ledger", ["user_id", "id"])
+
+    op.create_table(
+        "credit_snapshots",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("balance", sa.BigInteger(), nullable=False),
+        sa.Column("ledger_id", sa.Integer(), nullable=False),
+        sa.Column("ledger_created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("(CURRENT_TIMESTAMP)"), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_credit_snapshots_user_ledger", "credit_snapshots", ["user_id", "ledger_id"])
+    op.create_index("ix_credit_snapshots_user_ledger_at", "credit_snapshots", ["user_id", "ledger_created_at"])
+
+    op.execute(
+        "INSERT INTO credit_ledger (user_id, delta, reason, description) "
+        "SELECT id, COALESCE(credits, 0), 'opening_balance', '引入金额流水前的余额' FROM users"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_credit_snapshots_user_ledger_at", table_name="credit_snapshots")
+    op.drop_index("ix_credit_snapshots_user_ledger", table_name="credit_snapshots")
+    op.drop_table("credit_snapshots")
+    op.drop_index("ix_credit_ledger_user_id_id", table_name="credit_ledger")
+    op.drop_table("credit_ledger")
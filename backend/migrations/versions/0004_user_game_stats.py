@@ -0,0 +1,55 @@
+"""用户分游戏类型统计汇总
+
+新建 user_game_stats 和回填进度表 backfill_checkpoints。迁移时记下当前最大
+游戏记录 id 作为回填截止点：之后的对局由结算实时累加，之前的由后台回填任务
+补齐。users.total_games_played / total_winnings 此前从未维护，这里清零后
+同样由回填和结算累加。
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "user_game_stats",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("game_type", sa.String(length=50), nullable=False),
+        sa.Column("game_count", sa.Integer(), nullable=False),
+        sa.Column("total_bet", sa.BigInteger(), nullable=False),
+        sa.Column("total_win", sa.BigInteger(), nullable=False),
+        sa.Column("winning_games", sa.Integer(), nullable=False),
+        sa.Column("profitable_games", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("(CURRENT_TIMESTAMP)"), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("user_id", "game_type"),
+    )
+
+    op.create_table(
+        "backfill_checkpoints",
+        sa.Column("name", sa.String(length=100), nullable=False),
+        sa.Column("high_water_mark", sa.Integer(), nullable=False),
+        sa.Column("target_id", sa.Integer(), nullable=False),
+        sa.Column("is_complete", sa.Boolean(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("(CURRENT_TIMESTAMP)"), nullable=True),
+        sa.PrimaryKeyConstraint("name"),
+    )
+
+    op.execute("UPDATE users SET total_games_played = 0, total_winnings = 0")
+    op.execute(
+        "INSERT INTO backfill_checkpoints (name, high_water_mark, target_id, is_complete) "
+        "SELECT 'user_game_stats', 0, COALESCE(MAX(id), 0), 0 FROM game_records"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("backfill_checkpoints")
+    op.drop_table("user_game_stats")
@@ -0,0 +1,30 @@
+"""限量奖品库存
+
+prizes 新增 template_id（绑定游戏引擎中的奖品）和 reserved_quantity（已租借给
+各进程、尚未发出的数量）。
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("prizes", sa.Column("template_id", sa.String(length=50), nullable=True))
+    op.add_column(
+        "prizes",
+        sa.Column("reserved_quantity", sa.Integer(), server_default=sa.text("0"), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("prizes") as batch_op:
+        batch_op.drop_column("reserved_quantity")
+        batch_op.drop_column("template_id")
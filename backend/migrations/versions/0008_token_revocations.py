@@ -0,0 +1,46 @@
+"""访问令牌吊销表
+
+新建 token_revocations，验证令牌时不再按主键核对用户的令牌版本。此前通过递增
+令牌版本失效的令牌，按各用户的上一个版本补写吊销记录。
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "token_revocations",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("token_key", sa.String(length=64), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("(CURRENT_TIMESTAMP)"), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("token_key"),
+    )
+    op.create_index("ix_token_revocations_id", "token_revocations", ["id"])
+    op.create_index("ix_token_revocations_user_id", "token_revocations", ["user_id"])
+    op.create_index("ix_token_revocations_expires_at", "token_revocations", ["expires_at"])
+
+    # 访问令牌最长有效期不超过一天，过期后由后台任务清理
+    op.execute(
+        "INSERT INTO token_revocations (token_key, user_id, expires_at) "
+        "SELECT 'user:' || id || ':' || (token_version - 1), id, datetime('now', '+1 day') "
+        "FROM users WHERE token_version > 0"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_token_revocations_expires_at", table_name="token_revocations")
+    op.drop_index("ix_token_revocations_user_id", table_name="token_revocations")
+    op.drop_index("ix_token_revocations_id", table_name="token_revocations")
+    op.drop_table("token_revocations")
@@ -0,0 +1,28 @@
+"""每日系统统计定稿标记
+
+system_stats 新增 is_final。此前该表从未写入，已有数据（如有）视为未定稿，
+由后台汇总任务按游戏记录重算。
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "system_stats",
+        sa.Column("is_final", sa.Boolean(), server_default=sa.text("0"), nullable=False)
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("system_stats") as batch_op:
+        batch_op.drop_column("is_final")
@@ -0,0 +1,42 @@
+"""按小时预聚合的游戏统计
+
+新建 game_stats_hourly，并在回填进度表中记下当前最大游戏记录 id 作为截止点：
+之后的对局由结算实时累加，之前的由后台回填任务补齐。
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "game_stats_hourly",
+        sa.Column("hour_bucket", sa.String(length=13), nullable=False),
+        sa.Column("game_type", sa.String(length=50), nullable=False),
+        sa.Column("template_id", sa.String(length=50), nullable=False),
+        sa.Column("plays", sa.Integer(), nullable=False),
+        sa.Column("revenue", sa.BigInteger(), nullable=False),
+        sa.Column("payout", sa.BigInteger(), nullable=False),
+        sa.Column("winners", sa.Integer(), nullable=False),
+        sa.Column("players", sa.LargeBinary(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("(CURRENT_TIMESTAMP)"), nullable=True),
+        sa.PrimaryKeyConstraint("hour_bucket", "game_type", "template_id"),
+    )
+
+    op.execute(
+        "INSERT INTO backfill_checkpoints (name, high_water_mark, target_id, is_complete) "
+        "SELECT 'game_stats_hourly', 0, COALESCE(MAX(id), 0), 0 FROM game_records"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM backfill_checkpoints WHERE name LIKE 'game_stats_hourly%'")
+    op.drop_table("game_stats_hourly")
@@ -0,0 +1,24 @@
+"""game_result 改为压缩存储（标记版本，不修改表结构）
+
+模型中 game_records.game_result 改为 CompressedJSON（BLOB），库中的声明类型仍为 JSON。
+SQLite 按原样存储写入的字节，声明类型不影响读写：旧记录是 JSON 文本，新记录是压缩后的
+二进制，读取时都能解析。为此重建 game_records 会在启动时整表复制，因此不修改声明类型，
+自动生成迁移时由 env.py 的 compare_type 忽略这一差异。
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18
+"""
+
+revision = "0011"
+down_revision = "0010"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    pass
+
+
+def downgrade() -> None:
+    pass
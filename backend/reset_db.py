@@ -9,6 +9,7 @@ from pathlib import Path
 project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
 
+from sqlalchemy import text
 from app.database import engine, Base
 # 确保所有模型都被导入
 from app.models.user import User
@@ -22,13 +23,11 @@ def reset_database():
     try:
         print("正在删除所有表...")
         Base.metadata.drop_all(bind=engine)
+        with engine.begin() as conn:
+            conn.execute(text("DROP TABLE IF EXISTS alembic_version"))
         print("表删除成功")
         
-        print("正在创建新表...")
-        Base.metadata.create_all(bind=engine)
-        print("表创建成功")
-        
-        print("正在初始化数据...")
+        print("正在按迁移脚本创建新表并初始化数据...")
         init_database()
         print("数据初始化成功")
         
@@ -0,0 +1,34 @@
+"""
+测试配置
+
+在导入应用之前把数据库和归档目录指向临时目录，测试会话开始时按迁移脚本建表，
+与应用启动时的流程一致。
+"""
+import os
+import shutil
+import tempfile
+
+_TEST_DIR = tempfile.mkdtemp(prefix="entertainment-test-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_TEST_DIR}/test.db"
+os.environ["ARCHIVE_DIR"] = os.path.join(_TEST_DIR, "archive")
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+def migrated_database():
+    """按迁移脚本建表的临时数据库"""
+    from app.utils.migrate import upgrade_database
+    upgrade_database()
+    yield
+    from app.database import engine
+    engine.dispose()
+    shutil.rmtree(_TEST_DIR, ignore_errors=True)
+
+
+@pytest.fixture
+def db():
+    """数据库会话，测试结束后关闭（不回滚已提交的数据）"""
+    from app.database import SessionLocal
+    with SessionLocal() as session:
+        yield session
@@ -0,0 +1,27 @@
+"""
+BloomFilter：无漏判，误判率接近设定值
+"""
+from app.core.bloom import BloomFilter
+
+
+def test_no_false_negatives():
+    bloom = BloomFilter(capacity=5000, error_rate=0.001)
+    keys = [f"jti:{i}" for i in range(5000)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+    assert bloom.count == len(keys)
+
+
+def test_false_positive_rate():
+    bloom = BloomFilter(capacity=5000, error_rate=0.01)
+    for i in range(5000):
+        bloom.add(f"user:{i}:0")
+    false_positives = sum(f"user:{i}:1" in bloom for i in range(20000))
+    # 期望约 1%，留出统计波动的余量
+    assert false_positives / 20000 < 0.02
+
+
+def test_empty_filter_contains_nothing():
+    bloom = BloomFilter(capacity=0)
+    assert "anything" not in bloom
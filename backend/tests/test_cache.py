@@ -0,0 +1,113 @@
+"""
+SingleFlightCache：并发合并、过期后返回旧值、失效和错误处理
+"""
+import asyncio
+import pytest
+from app.core.cache import SingleFlightCache
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class _Loader:
+    """记录调用次数，可用 release 控制何时返回"""
+
+    def __init__(self):
+        self.calls = 0
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        return self.calls
+
+
+@pytest.mark.asyncio
+async def test_concurrent_gets_load_once():
+    cache = SingleFlightCache(maxsize=10)
+    loader = _Loader()
+    loader.release.clear()
+
+    gets = [asyncio.ensure_future(cache.get("k", loader, ttl=60)) for _ in range(10)]
+    await asyncio.sleep(0)
+    loader.release.set()
+    results = await asyncio.gather(*gets)
+
+    assert loader.calls == 1
+    assert all(result == (1, 0.0, SingleFlightCache.MISS) for result in results)
+    value, _, status = await cache.get("k", loader, ttl=60)
+    assert (value, status) == (1, SingleFlightCache.HIT)
+
+
+@pytest.mark.asyncio
+async def test_stale_while_revalidate():
+    clock = _Clock()
+    cache = SingleFlightCache(maxsize=10, clock=clock)
+    loader = _Loader()
+    await cache.get("k", loader, ttl=10, stale=5)
+
+    clock.now = 12
+    value, age, status = await cache.get("k", loader, ttl=10, stale=5)
+    assert (value, age, status) == (1, 12, SingleFlightCache.STALE)
+    # 后台刷新完成后返回新值
+    await asyncio.sleep(0)
+    assert await cache.get("k", loader, ttl=10, stale=5) == (2, 0, SingleFlightCache.HIT)
+
+    # 超过 ttl + stale 后等待重新计算
+    clock.now = 30
+    assert await cache.get("k", loader, ttl=10, stale=5) == (3, 0.0, SingleFlightCache.MISS)
+
+
+@pytest.mark.asyncio
+async def test_invalidate_drops_entries_and_inflight_results():
+    cache = SingleFlightCache(maxsize=10)
+    loader = _Loader()
+    await cache.get(("stats", 1), loader, ttl=60)
+    await cache.get(("stats", 2), loader, ttl=60)
+    assert cache.invalidate(lambda key: key[1] == 1) == 1
+    assert len(cache) == 1
+
+    # 计算进行中失效：已在等待的请求拿到结果，但结果不写入缓存
+    loader.release.clear()
+    pending = asyncio.ensure_future(cache.get(("stats", 1), loader, ttl=60))
+    await asyncio.sleep(0)
+    cache.invalidate(lambda key: key[1] == 1)
+    loader.release.set()
+    assert (await pending)[0] == 3
+    assert await cache.get(("stats", 1), loader, ttl=60) == (4, 0.0, SingleFlightCache.MISS)
+    assert loader.calls == 4
+
+
+@pytest.mark.asyncio
+async def test_errors_are_not_cached():
+    cache = SingleFlightCache(maxsize=10)
+    calls = 0
+
+    async def failing():
+        nonlocal calls
+        calls += 1
+        raise RuntimeError("boom")
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            await cache.get("k", failing, ttl=60)
+    assert calls == 2
+    assert len(cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_maxsize_evicts_least_recently_used():
+    cache = SingleFlightCache(maxsize=2)
+    loader = _Loader()
+    await cache.get("a", loader, ttl=60)
+    await cache.get("b", loader, ttl=60)
+    await cache.get("a", loader, ttl=60)
+    await cache.get("c", loader, ttl=60)
+    assert len(cache) == 2
+    assert (await cache.get("b", loader, ttl=60))[2] == SingleFlightCache.MISS
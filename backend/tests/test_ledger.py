@@ -0,0 +1,57 @@
+"""
+金额流水：balance_at 与逐条累加的余额一致（有无快照）
+"""
+import itertools
+import random
+from datetime import datetime, timedelta
+import pytest
+from app.models import User
+from app.models.credit import LedgerReason
+from app.services.ledger import append_entries, balance_at, ledger_entry, take_snapshots
+
+START = datetime(2024, 3, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def user_history(db):
+    """一个用户的 50 条流水，每分钟一条，返回 (用户ID, [(时间, 累计余额)])"""
+    user = User(
+        username=f"ledger-{random.randrange(10 ** 9)}",
+        email=f"ledger-{random.randrange(10 ** 9)}@example.com",
+        hashed_password="x",
+        credits=0
+    )
+    db.add(user)
+    db.flush()
+
+    rng = random.Random(7)
+    deltas = [1000] + [rng.choice([-10, -20, 30, 50, 100]) for _ in range(49)]
+    times = [START + timedelta(minutes=i) for i in range(len(deltas))]
+    entries = []
+    for delta, at in zip(deltas, times):
+        entry = ledger_entry(user.id, delta, LedgerReason.GAME_WIN)
+        entry["created_at"] = at
+        entries.append(entry)
+    append_entries(db, entries)
+    db.commit()
+    return user.id, list(zip(times, itertools.accumulate(deltas)))
+
+
+def _check(db, user_id, history):
+    assert balance_at(db, user_id, START - timedelta(seconds=1)) == 0
+    for at, balance in history:
+        assert balance_at(db, user_id, at) == balance
+        assert balance_at(db, user_id, at + timedelta(seconds=30)) == balance
+
+
+def test_balance_at_without_snapshots(db, user_history):
+    user_id, history = user_history
+    _check(db, user_id, history)
+
+
+def test_balance_at_with_snapshots(db, user_history):
+    user_id, history = user_history
+    # 每 7 条流水一张快照，快照前后的时刻都要正确
+    while take_snapshots(db, min_entries=7):
+        pass
+    _check(db, user_id, history)
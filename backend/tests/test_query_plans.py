@@ -0,0 +1,17 @@
+"""
+game_records 典型查询的索引命中检查（见 app.utils.query_plans）
+"""
+import pytest
+from app.database import engine
+from app.utils.query_plans import _endpoint_queries, check_game_record_query_plans
+
+
+@pytest.fixture(scope="module")
+def plan_results():
+    return {result["endpoint"]: result for result in check_game_record_query_plans(engine)}
+
+
+@pytest.mark.parametrize("endpoint", list(_endpoint_queries()))
+def test_query_uses_expected_index(plan_results, endpoint):
+    result = plan_results[endpoint]
+    assert result["ok"], f"期望索引 {result['expected_indexes']}，实际计划 {result['plan']}"
@@ -0,0 +1,128 @@
+"""
+PrizeSampler：权重换算、抽样、排除售罄奖品，以及游戏期望奖励与抽样器一致
+"""
+import pytest
+from app.games.sampler import PrizeSampler, draw
+from app.games.scratch_card import scratch_card_game
+from app.games.wheel_fortune import wheel_fortune_game
+
+GRID = 20000
+
+
+def _grid(sampler: PrizeSampler):
+    """在 [0, 1) 上等距取 rand，返回各次抽中的下标"""
+    return [sampler.sample(lambda: (i + 0.5) / GRID) for i in range(GRID)]
+
+
+def test_from_probabilities_exact():
+    sampler = PrizeSampler.from_probabilities([0.5, 0.3, 0.2])
+    assert sampler.weights == pytest.approx([0.5, 0.3, 0.2])
+    assert sampler.total == pytest.approx(1.0)
+
+
+def test_from_probabilities_drops_mass_past_one():
+    # 原先逐项累加概率：累加超过 1 之后的项永远抽不到
+    sampler = PrizeSampler.from_probabilities([0.6, 0.5, 0.3])
+    assert sampler.weights == pytest.approx([0.6, 0.4, 0.0])
+    assert sampler.total == pytest.approx(1.0)
+    assert 2 not in set(_grid(sampler))
+
+
+def test_from_probabilities_shortfall_goes_to_last():
+    sampler = PrizeSampler.from_probabilities([0.1, 0.2, 0.3])
+    assert sampler.weights == pytest.approx([0.1, 0.2, 0.7])
+
+
+def test_sample_boundaries():
+    sampler = PrizeSampler([1, 0, 3, 0])
+    assert sampler.sample(lambda: 0.0) == 0
+    assert sampler.sample(lambda: 0.2499) == 0
+    assert sampler.sample(lambda: 0.25) == 2
+    # 浮点越界时落到最后一个有效项，不会抽中末尾权重为 0 的项
+    assert sampler.sample(lambda: 1.0) == 2
+    counts = [_grid(sampler).count(i) for i in range(4)]
+    assert counts == [GRID // 4, 0, GRID * 3 // 4, 0]
+
+
+def test_sample_empty_raises():
+    with pytest.raises(ValueError):
+        PrizeSampler([0, 0]).sample()
+
+
+def test_excluding_renormalizes_and_caches():
+    sampler = PrizeSampler([1, 2, 3])
+    assert sampler.excluding(frozenset()) is sampler
+    excluded = sampler.excluding(frozenset({1}))
+    assert excluded.weights == [1, 0.0, 3]
+    assert excluded is sampler.excluding(frozenset({1}))
+    assert 1 not in set(_grid(excluded))
+
+
+class _Stock:
+    def __init__(self, remaining):
+        self.remaining = dict(remaining)
+
+    def sold_out(self, template_id):
+        return frozenset(name for name, count in self.remaining.items() if count <= 0)
+
+    def take(self, template_id, name):
+        if name not in self.remaining:
+            return True
+        if self.remaining[name] <= 0:
+            return False
+        self.remaining[name] -= 1
+        return True
+
+
+def test_draw_skips_sold_out_prizes():
+    sampler = PrizeSampler([10, 1])
+    names = ["大奖", "谢谢参与"]
+    stock = _Stock({"大奖": 2})
+    results = [names[draw(sampler, names, "t", stock)] for _ in range(200)]
+    assert results.count("大奖") == 2
+    assert stock.sold_out("t") == frozenset({"大奖"})
+
+
+def test_draw_retries_when_take_fails():
+    # 抽中时奖品刚好售罄：take 失败后 sold_out 才包含它，应排除后重新抽取
+    class LateStock(_Stock):
+        failed = False
+
+        def sold_out(self, template_id):
+            return super().sold_out(template_id) if self.failed else frozenset()
+
+        def take(self, template_id, name):
+            taken = super().take(template_id, name)
+            self.failed = self.failed or not taken
+            return taken
+
+    sampler = PrizeSampler([1000, 1])
+    names = ["大奖", "谢谢参与"]
+    stock = LateStock({"大奖": 0})
+    assert draw(sampler, names, "t", stock) == 1
+    assert stock.failed
+
+
+@pytest.mark.parametrize("template_id", list(scratch_card_game.templates))
+def test_scratch_card_expected_payout_matches_sampler(template_id):
+    prizes = scratch_card_game.templates[template_id].prizes
+    sampled = sum(prizes[i]["credits"] for i in _grid(scratch_card_game.samplers[template_id])) / GRID
+    assert scratch_card_game.expected_payout(template_id) == pytest.approx(sampled, rel=1e-3, abs=1e-3)
+
+
+@pytest.mark.parametrize("template_id", list(wheel_fortune_game.templates))
+def test_wheel_expected_payout_matches_sampler(monkeypatch, template_id):
+    # 不考虑特殊效果时，期望奖励应等于按抽样器实际抽中的扇形奖励（负积分按 0 计）的均值
+    template = wheel_fortune_game.templates[template_id]
+    monkeypatch.setattr(template, "special_features", {})
+    segments = template.segments
+    sampled = sum(max(segments[i].credits, 0) for i in _grid(wheel_fortune_game.samplers[template_id])) / GRID
+    assert wheel_fortune_game.expected_payout(template_id) == pytest.approx(sampled, rel=1e-3, abs=1e-3)
+
+
+def test_wheel_weights_follow_from_probabilities():
+    for template_id, template in wheel_fortune_game.templates.items():
+        probabilities = [segment.probability for segment in template.segments]
+        expected = PrizeSampler.from_probabilities(probabilities).weights
+        assert wheel_fortune_game.samplers[template_id].weights == pytest.approx(expected)
+        assert sum(expected) == pytest.approx(1.0)
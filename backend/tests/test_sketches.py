@@ -0,0 +1,80 @@
+"""
+HyperLogLog：估算精度、合并、序列化和 SQLite 函数
+"""
+import sqlite3
+import pytest
+from app.core.sketches import HyperLogLog, register_sqlite_functions
+
+
+def _sketch(values):
+    sketch = HyperLogLog()
+    for value in values:
+        sketch.add(value)
+    return sketch
+
+
+def test_empty():
+    assert HyperLogLog().count() == 0
+    assert HyperLogLog.from_bytes(None).count() == 0
+
+
+def test_small_cardinality_is_near_exact():
+    sketch = _sketch(list(range(50)) * 3)
+    assert sketch.count() == pytest.approx(50, abs=1)
+
+
+@pytest.mark.parametrize("cardinality", [1000, 20000])
+def test_estimate_within_error(cardinality):
+    # 标准误差约 2.3%，按 3 倍标准误差检查
+    sketch = _sketch(f"user:{i}" for i in range(cardinality))
+    assert sketch.count() == pytest.approx(cardinality, rel=0.07)
+
+
+def test_merge_equals_union():
+    a = _sketch(range(0, 3000))
+    b = _sketch(range(2000, 6000))
+    union = _sketch(range(0, 6000))
+    assert a.merge(b).to_bytes() == union.to_bytes()
+
+
+def test_merge_sparse_into_dense_and_back():
+    dense = _sketch(range(5000))
+    sparse = _sketch(range(4990, 5010))
+    expected = _sketch(range(5010)).to_bytes()
+    assert HyperLogLog.from_bytes(dense.to_bytes()).merge(sparse).to_bytes() == expected
+    assert HyperLogLog.from_bytes(sparse.to_bytes()).merge(dense).to_bytes() == expected
+
+
+@pytest.mark.parametrize("cardinality", [3, 5000])
+def test_bytes_roundtrip(cardinality):
+    sketch = _sketch(range(cardinality))
+    data = sketch.to_bytes()
+    assert HyperLogLog.from_bytes(data).to_bytes() == data
+    assert HyperLogLog.from_bytes(data).count() == sketch.count()
+
+
+def test_single_value_sketch_is_small():
+    assert len(_sketch([42]).to_bytes()) == 4
+
+
+def test_sqlite_functions():
+    connection = sqlite3.connect(":memory:")
+    register_sqlite_functions(connection)
+    connection.execute("CREATE TABLE plays (hour INTEGER, user_id INTEGER)")
+    connection.executemany(
+        "INSERT INTO plays VALUES (?, ?)",
+        [(hour, user_id) for hour in range(3) for user_id in range(hour * 100, hour * 100 + 150)]
+    )
+    connection.execute(
+        "CREATE TABLE hourly AS SELECT hour, hll_union_agg(hll_of(user_id)) AS sketch FROM plays GROUP BY hour"
+    )
+
+    total = connection.execute("SELECT hll_count(hll_union_agg(sketch)) FROM hourly").fetchone()[0]
+    assert total == pytest.approx(350, rel=0.03)
+
+    pair = connection.execute(
+        "SELECT hll_count(hll_union(a.sketch, b.sketch)) FROM hourly a, hourly b WHERE a.hour = 0 AND b.hour = 1"
+    ).fetchone()[0]
+    assert pair == pytest.approx(250, rel=0.03)
+    assert connection.execute("SELECT hll_of(NULL), hll_count(NULL)").fetchone() == (None, 0)
+    connection.close()
@@ -0,0 +1,59 @@
+"""
+IndexableSkipList：与有序列表对照
+"""
+import bisect
+import random
+import pytest
+from app.core.skiplist import IndexableSkipList
+
+
+def test_empty():
+    skiplist = IndexableSkipList()
+    assert len(skiplist) == 0
+    assert skiplist.count_less(0) == 0
+    assert list(skiplist.iter_from(0)) == []
+    assert skiplist.remove(1) is False
+    with pytest.raises(IndexError):
+        skiplist[0]
+
+
+def test_matches_sorted_list():
+    rng = random.Random(42)
+    skiplist = IndexableSkipList()
+    expected = []
+    for _ in range(3000):
+        key = rng.randrange(1000)
+        index = bisect.bisect_left(expected, key)
+        present = index < len(expected) and expected[index] == key
+        if present and rng.random() < 0.6:
+            assert skiplist.remove(key) is True
+            expected.pop(index)
+        elif not present:
+            skiplist.insert(key)
+            expected.insert(index, key)
+        else:
+            assert skiplist.remove(key + 0.5) is False
+
+    assert len(skiplist) == len(expected)
+    assert list(skiplist.iter_from(0)) == expected
+    for _ in range(200):
+        key = rng.randrange(-10, 1010)
+        assert skiplist.count_less(key) == bisect.bisect_left(expected, key)
+    for index in range(0, len(expected), 7):
+        assert skiplist[index] == expected[index]
+        assert list(skiplist.iter_from(index)) == expected[index:]
+    assert skiplist[-1] == expected[-1]
+
+
+def test_leaderboard_keys():
+    # 排行榜使用 (-分数, 用户ID)，分数相同时按用户ID排序
+    skiplist = IndexableSkipList()
+    for user_id, score in [(1, 100), (2, 300), (3, 100), (4, 200)]:
+        skiplist.insert((-score, user_id))
+    assert [user_id for _, user_id in skiplist.iter_from(0)] == [2, 4, 1, 3]
+    assert skiplist.count_less((-100, 3)) == 3
+
+    skiplist.remove((-100, 1))
+    skiplist.insert((-400, 1))
+    assert skiplist[0] == (-400, 1)
+    assert skiplist.count_less((-100, 3)) == 3